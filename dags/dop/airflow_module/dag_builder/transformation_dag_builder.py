@@ -2,16 +2,13 @@ import inspect
 import logging
 import os
 import sys
-from collections import defaultdict
 from pydoc import locate
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 import pendulum
-from airflow.models import Variable, DagRun
+from airflow.models import Variable
 from airflow.models.baseoperator import BaseOperator
-from airflow.operators.dummy_operator import DummyOperator
-from airflow.operators.python_operator import BranchPythonOperator
-from airflow.utils.state import State
+from airflow.sensors.external_task_sensor import ExternalTaskSensor
 
 # Add DOP DAG root path to PYTHONPATH
 if not os.getenv("DOP_DEVELOPER_MODE"):
@@ -28,20 +25,32 @@ from dop.airflow_module.operator import (  # noqa: E402
     dbt_k8_operator,
 )
 from dop.airflow_module.dag_builder import dag_builder_util  # noqa: E402
-from dop.component.transformation.common.parser.yaml_parser import (  # noqa: E402
-    yaml_to_dict,
+from dop.component.transformation.common.adapter.graph import TaskGraph  # noqa: E402
+from dop.component.transformation.common.executor.graph_executor import (  # noqa: E402
+    GraphExecutor,
 )
-from dop.component.transformation.runner.bigquery.adapter import impl  # noqa: E402
-from dop.component.transformation.runner.bigquery.adapter.impl import (  # noqa: E402
-    QueryRunner,
+from dop.component.transformation.common.parser import (  # noqa: E402
+    dag_artifact,
+    transformation_parser,
+)
+from dop.component.transformation.common.parser.parse_cache import (  # noqa: E402
+    ParseCache,
 )
-from dop.component.transformation.runner.bigquery.adapter.relation import (  # noqa: E402
-    BigQueryRelation as Relation,
+from dop.component.transformation.common.templating import (  # noqa: E402
+    render_cache,
 )
+from dop.component.transformation.runner.bigquery import (  # noqa: E402
+    lineage,
+    task_runner,
+)
+from dop.component.transformation.runner.bigquery.adapter import impl  # noqa: E402
 from dop.component.transformation.common.adapter import schema  # noqa: E402
 from dop.component.configuration.env import env_config  # noqa: E402
+from dop.component.util import dbt_project_lock  # noqa: E402
 
-SQL_PATH_TEMPLATE = "{path}/sql/{task_name}.sql"
+
+# Seconds between two checks of the DAG runs using the same DBT project(s)
+DBT_PROJECT_LOCK_POKE_INTERVAL = 60
 
 
 def locate_operator_class(namespaced_class: str):
@@ -72,6 +81,12 @@ def select_operator(task: schema.Task):
     else:
         task_type_operator_mapper[schema.TASK_KIND_DBT] = dbt_k8_operator.DbtK8Operator
 
+    if (
+        task.kind.action == schema.TASK_KIND_ASSERT
+        and task.kind.target == schema.ASSERTION_SENSOR_TARGET
+    ):
+        return common_operators.AssertSensorOperator
+
     if task.kind.action == schema.TASK_KIND_AIRFLOW_OPERATOR:
         task_type_operator_mapper[
             schema.TASK_KIND_AIRFLOW_OPERATOR
@@ -80,145 +95,98 @@ def select_operator(task: schema.Task):
     return task_type_operator_mapper[task.kind.action]
 
 
-def load_sql_from_file(path, task_name):
-    base_template = "{% from 'global.sql' import is_incremental with context %}"
-    with open(SQL_PATH_TEMPLATE.format(path=path, task_name=task_name)) as fp:
-        return base_template + "\n\n" + fp.read()
-
+def get_query_runner(task, airflow_context):
+    dry_run = task_runner.get_boolean_conf(airflow_context, key="dry_run")
+    logging.info(f"### IS DRY RUN ENABLED: {dry_run}")
 
-def create_relation_from_task(task):
-    relation = Relation(
-        database=task.database, schema=task.schema, identifier=task.identifier
+    return impl.get_query_runner(
+        options={
+            "project_id": task.database,
+            "location": env_config.location,
+            "dry_run": dry_run,
+            "metadata_cache_ttl": env_config.metadata_cache_ttl,
+            "metadata_backend": env_config.metadata_backend,
+        }
     )
 
-    return relation
-
-
-def exec_replace_or_upsert(task: schema.Task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    relation = create_relation_from_task(task=task)
-    sql = airflow_context["templates_dict"]["sql"]
 
-    dag_run_conf = (
-        airflow_context["dag_run"].conf if airflow_context["dag_run"].conf else {}
+def query_runner_callback(task, **kwargs):
+    runner = get_query_runner(task=task, airflow_context=kwargs)
+    sql = kwargs["templates_dict"]["sql"]
+    cache = render_cache.get_render_cache()
+    if (
+        cache is None
+        or sql is None
+        or task_runner.get_boolean_conf(kwargs, key="dry_run")
+    ):
+        task_runner.runner_caller(runner=runner, task=task, airflow_context=kwargs)
+        return
+
+    # A task is skipped when its rendered SQL is identical to the one of its last
+    # successful execution for the DAG run, if requested with `skip_unchanged`
+    execution_id = {
+        "dag_id": kwargs["ti"].dag_id,
+        "task_id": task.identifier,
+        "execution_date": kwargs["ts"],
+    }
+    execution = render_cache.execution_fingerprint(
+        sql=sql,
+        task=task,
+        full_refresh=task_runner.get_boolean_conf(kwargs, key="full_refresh"),
     )
-
-    full_refresh = dag_run_conf.get("full_refresh", False)
-
-    if type(full_refresh) != bool:
-        raise RuntimeError(
-            "Dag config `full_refresh` must be set to either `true` or `false` (as a boolean value)."
+    if (
+        task_runner.get_boolean_conf(kwargs, key="skip_unchanged")
+        and cache.get_execution(**execution_id) == execution
+    ):
+        logging.info(
+            f"### SKIPPED, identical to the last successful execution ({execution})"
         )
+        return
 
-    logging.info(f"### IS FULL REFRESH ENABLED: {full_refresh}")
-
-    runner.replace_or_upsert(
-        query=sql,
-        relation=relation,
-        options={
-            "partition_key": task.partitioning.field if task.partitioning else None,
-            "partition_data_type": task.partitioning.data_type
-            if task.partitioning
-            else None,
-            "full_refresh": full_refresh,
-        },
-    )
-
-
-def exec_recreate_stored_procedure(task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    relation = create_relation_from_task(task=task)
-    sql = airflow_context["templates_dict"]["sql"]
-
-    arguments = task.options.get("arguments", [])
-    runner.recreate_stored_procedure(arguments=arguments, query=sql, relation=relation)
-
-
-def exec_recreate_udf(task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    relation = create_relation_from_task(task=task)
-    sql = airflow_context["templates_dict"]["sql"]
-
-    arguments = task.options.get("arguments", [])
-    runner.recreate_udf(arguments=arguments, query=sql, relation=relation)
+    task_runner.runner_caller(runner=runner, task=task, airflow_context=kwargs)
+    cache.record_execution(**execution_id, execution=execution)
 
 
-def exec_recreate_view(task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    relation = create_relation_from_task(task=task)
-    sql = airflow_context["templates_dict"]["sql"]
+def assertion_sensor_callback(task, sql, context):
+    runner = get_query_runner(task=task, airflow_context=context)
+    return task_runner.poke_assertion(task=task, runner=runner, sql=sql)
 
-    runner.recreate_view(query=sql, relation=relation)
 
+def grouped_query_runner_callback(tasks, max_workers, **kwargs):
+    """
+    Run grouped tasks as soon as their dependencies within the group have completed,
+    no further task is started once one has failed
+    """
+    tasks_by_identifier = {task.identifier: task for task in tasks}
+    sql_by_task = kwargs["templates_dict"]
 
-def exec_call_stored_procedure(task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    sql = airflow_context["templates_dict"]["sql"]
-
-    runner.call_stored_procedure(query=sql)
-
-
-def exec_assertion(task, runner: QueryRunner, **kwargs):
-    airflow_context = kwargs["airflow_context"]
-    sql = airflow_context["templates_dict"]["sql"]
-
-    runner.assertion(query=sql)
-
-
-def exec_create_schema(task, runner: QueryRunner, **kwargs):
-    runner.create_schema(project_id=task.database, dataset_id=task.schema)
-
-
-def runner_caller(runner: QueryRunner, task: schema.Task, **kwargs):
-    func = None
-
-    if task.kind.action == schema.TASK_KIND_MATERI:
-        if task.kind.target == "table":
-            func = exec_replace_or_upsert
-        elif task.kind.target == "stored_procedure":
-            func = exec_recreate_stored_procedure
-        elif task.kind.target == "view":
-            func = exec_recreate_view
-        elif task.kind.target == "udf":
-            func = exec_recreate_udf
-        elif task.kind.target == "schema":
-            func = exec_create_schema
-        else:
-            raise NotImplementedError(
-                f"Task Kind: {task.kind.__dict__} is not supported"
-            )
-
-    elif task.kind.action == schema.TASK_KIND_INVOKE:
-        if task.kind.target == "stored_procedure":
-            func = exec_call_stored_procedure
-        else:
-            raise NotImplementedError(
-                f"Task Kind: {task.kind.__dict__} is not supported"
-            )
-
-    elif task.kind.action == schema.TASK_KIND_ASSERT:
-        if task.kind.target == "assertion":
-            func = exec_assertion
-        else:
-            raise NotImplementedError(
-                f"Task Kind: {task.kind.__dict__} is not supported"
-            )
-    else:
-        raise NotImplementedError(f"Task Kind: {task.kind.__dict__} is not supported")
-
-    func(task=task, runner=runner, **kwargs)
-
+    def run_task(identifier):
+        query_runner_callback(
+            task=tasks_by_identifier[identifier],
+            **dict(kwargs, templates_dict={"sql": sql_by_task.get(identifier)}),
+        )
 
-def query_runner_callback(task, **kwargs):
-    runner = impl.get_query_runner(
-        options={
-            "project_id": task.database,
-            "location": env_config.location,
-            "dry_run": False,
-        }
+    # Durations of the grouped tasks are returned, and pushed to XCom, by the previous run
+    task_instance = kwargs["ti"]
+    previous_durations = (
+        task_instance.xcom_pull(
+            task_ids=task_instance.task_id, include_prior_dates=True
+        )
+        or {}
     )
+    task_graph = TaskGraph.from_tasks(tasks)
+    critical_path, duration = task_graph.critical_path(durations=previous_durations)
+    if previous_durations:
+        logging.info(
+            f"### Critical path: {' -> '.join(critical_path)} ({duration:.1f}s last run)"
+        )
 
-    runner_caller(runner=runner, task=task, airflow_context=kwargs)
+    executor = GraphExecutor(
+        dependencies={task.identifier: task.dependencies for task in tasks},
+        max_workers=max_workers,
+        priorities=task_graph.remaining_durations(durations=previous_durations),
+    )
+    return executor.run(run_task)
 
 
 def retrieve_dynamic_params(dag_id, dynamic_params):
@@ -232,56 +200,88 @@ def retrieve_dynamic_params(dag_id, dynamic_params):
 
 
 def init_transformations(path_to_dags, config_extension="yaml") -> List[Dict[str, Any]]:
-    details = []
-    logging.debug("### Path to DAGs: {}".format(path_to_dags))
-    directories = [d for d in os.listdir(path_to_dags) if "." not in d]
-    logging.debug("### Scanning directories: {}".format(directories))
-
-    for t in directories:
-        t_path = os.path.join(path_to_dags, t)
-        config_file = os.path.join(t_path, "config." + config_extension)
-        logging.debug(f"### Unverified config file: {config_file}")
-        if not os.path.exists(config_file):
-            logging.debug("### Ignoring {}".format(config_file))
-            continue
-        with open(config_file) as config_fp:
-            details.append(
-                {
-                    "transformation": t,
-                    "path_to_transformation": t_path,
-                    "config": yaml_to_dict(config_fp.read()),
-                }
-            )
-
-    return details
+    database = impl.get_database()
+
+    # Transformations parsed when the deployment was built, unless the artifact is stale
+    if env_config.is_dag_artifact_enabled:
+        transformations = dag_artifact.load_artifact(
+            artifact_path=env_config.dag_artifact_path,
+            path_to_dags=path_to_dags,
+            database=database,
+            commit_hash=dag_artifact.read_commit_hash(
+                service_project_path=env_config.service_project_path
+            ),
+            config_extension=config_extension,
+        )
+        if transformations is not None:
+            return transformations
+
+    parse_cache = None
+    if env_config.is_parse_cache_enabled:
+        parse_cache = ParseCache(cache_path=env_config.parse_cache_path)
+
+    return transformation_parser.load_transformations(
+        path_to_dags=path_to_dags,
+        database=database,
+        parse_cache=parse_cache,
+        config_extension=config_extension,
+        workers=env_config.parse_workers,
+    )
 
 
 def build(**kwargs):
     dags = []
     exceptions = []
-    dbt_dags = defaultdict(set)
 
-    for details in init_transformations(path_to_dags=kwargs["path_to_dags"]):
+    transformations = init_transformations(path_to_dags=kwargs["path_to_dags"])
+    dbt_dags = dbt_project_lock.dbt_dags_by_project(transformations=transformations)
+    lineage_index = lineage.LineageIndex(transformations=transformations)
+
+    for details in transformations:
         logging.debug(f"### Dag Details: {details}")
         transformation = details["transformation"]
         path_to_transformation = details["path_to_transformation"]
-        config = details["config"]
 
         dag_id = "dop__{}".format(transformation)
-        try:
-            # default database should not be set manually in config
-            # but instead passed in based on implementation of each storage engine
-            config["database"] = impl.get_database()
-            dag_config = schema.load_dag_schema(payload=config)
-        except schema.InvalidDagConfig as e:
-            exceptions.append({"dag_id": dag_id, "e": e})
+        if "error" in details:
+            exceptions.append({"dag_id": dag_id, "e": details["error"]})
             continue
 
+        dag_config = details["dag_config"]
+        sql_by_task = details["sql"]
+
         # DAG will be excluded if disabled
         if not dag_config.enabled:
             logging.info(f"DAG {path_to_transformation} is disabled")
             continue
 
+        external_dependencies = {}
+        if dag_config.infer_dependencies:
+            try:
+                dag_config = lineage.with_inferred_dependencies(
+                    dag_config=dag_config,
+                    inferred=lineage_index.inferred_dependencies(transformation),
+                )
+            except schema.InvalidDagConfig as e:
+                exceptions.append({"dag_id": dag_id, "e": e})
+                continue
+            external_dependencies = lineage_index.external_dependencies(transformation)
+
+        task_graph = TaskGraph.from_tasks(dag_config.tasks)
+        if task_graph.missing:
+            exceptions.append(
+                {
+                    "dag_id": dag_id,
+                    "e": schema.DependencyException(
+                        "; ".join(
+                            f"Task `{identifier}` depends on undefined task(s) {dependencies}"
+                            for identifier, dependencies in task_graph.missing.items()
+                        )
+                    ),
+                }
+            )
+            continue
+
         common_template_path = os.path.join(
             definitions.ROOT_DIR,
             "component",
@@ -309,27 +309,53 @@ def build(**kwargs):
             "params": dag_config.params,
         }
 
-        # Indicates if the current DAG includes any DBT task
-        has_dbt_tasks = False
         # If the DAG includes DBT tasks, projects where the tasks will be run
-        # Used to ensure that only one DBT task is running per project
+        # Used to ensure that only one DAG is running DBT tasks per project
         dbt_projects = set()
 
+        grouped_tasks = set()
+        if dag_config.grouped_execution:
+            grouped_execution = dag_config.grouped_execution
+            grouped_tasks = set(grouped_execution.tasks)
+            grouped_task = common_operators.GroupedTransformationOperator(
+                dag=dag,
+                task_id=schema.GROUPED_EXECUTION_TASK_ID,
+                tasks=[t for t in dag_config.tasks if t.identifier in grouped_tasks],
+                sql_by_task=sql_by_task,
+                max_workers=grouped_execution.max_workers,
+                params={"params": dag_config.params},
+                python_callable=grouped_query_runner_callback,
+                provide_context=True,
+            )
+            for identifier in grouped_tasks:
+                transformation_tasks[identifier] = grouped_task
+
         for task in dag_config.tasks:
             logging.debug(f"### task: {task.__dict__}")
+            if task.identifier in grouped_tasks:
+                continue
+
             template_params["task"] = task.__dict__
             operator = select_operator(task=task)
 
-            if task.kind.action in schema.NATIVE_TASK_KIND:
-                if (
-                    task.kind.action == schema.TASK_KIND_MATERI
-                    and task.kind.target not in "schema"
-                ) or task.kind.action != schema.TASK_KIND_MATERI:
-                    sql = load_sql_from_file(
-                        path=path_to_transformation, task_name=task.identifier
-                    )
-                else:
-                    sql = None
+            if operator is common_operators.AssertSensorOperator:
+                sensor_options = {
+                    option: task.options.get(option, default)
+                    for option, default in schema.ASSERTION_SENSOR_OPTIONS.items()
+                    if option != "max_bytes_per_poke"
+                }
+                transformation_task = operator(
+                    dag=dag,
+                    task_id=task.identifier,
+                    task=task,
+                    sql=sql_by_task.get(task.identifier),
+                    params=template_params,
+                    poke_callable=assertion_sensor_callback,
+                    **sensor_options,
+                )
+                transformation_tasks[task.identifier] = transformation_task
+            elif task.kind.action in schema.NATIVE_TASK_KIND:
+                sql = sql_by_task.get(task.identifier)
                 transformation_task = operator(
                     dag=dag,
                     task_id=task.identifier,
@@ -353,8 +379,6 @@ def build(**kwargs):
                     provide_context=True,
                 )
                 transformation_tasks[task.identifier] = transformation_task
-                has_dbt_tasks = True
-                dbt_dags[dbt_project_name].add(dag_id)
                 dbt_projects.add(dbt_project_name)
             elif task.kind.action == schema.TASK_KIND_AIRFLOW_OPERATOR:
                 if task.options.get("arguments"):
@@ -374,76 +398,100 @@ def build(**kwargs):
             else:
                 raise NotImplementedError(f"Task Kind {task.kind} is not implemented")
 
-        for task in dag_config.tasks:
-            if len(task.dependencies) == 0:
-                continue
-            for dependency in task.dependencies:
-                if dependency not in transformation_tasks:
-                    raise RuntimeError("{}.sql does not exist".format(dependency))
+        for identifier, dependencies in task_graph.upstream.items():
+            for dependency in dependencies:
+                upstream_task = transformation_tasks[dependency]
+                downstream_task = transformation_tasks[identifier]
+                # Grouped tasks share a single operator, dependencies within the group
+                # are handled by the group itself
+                if (
+                    upstream_task is downstream_task
+                    or downstream_task.task_id in upstream_task.downstream_task_ids
+                ):
+                    continue
 
-                (
-                    transformation_tasks[dependency]
-                    >> transformation_tasks[task.identifier]
+                upstream_task >> downstream_task
+
+        # Tasks of other DAGs materializing relations read by the DAG are waited for
+        for identifier, upstream_tasks in external_dependencies.items():
+            for upstream in upstream_tasks:
+                external_sensor = external_dependency_sensor(
+                    dag=dag,
+                    lineage_index=lineage_index,
+                    transformation=transformation,
+                    upstream=upstream,
                 )
+                if external_sensor is None:
+                    continue
 
-        if has_dbt_tasks:
-            # Add extra tasks to the DAG to ensure that only one DBT task
-            # is running per project
-            check_running_dags = BranchPythonOperator(
+                transformation_tasks[external_sensor.task_id] = external_sensor
+                if (
+                    transformation_tasks[identifier].task_id
+                    not in external_sensor.downstream_task_ids
+                ):
+                    external_sensor >> transformation_tasks[identifier]
+
+        if dbt_projects:
+            # Runs of DAGs using the same DBT project(s) are queued, the DAG waits for
+            # the ones started earlier before running any task
+            wait_for_dbt_projects = common_operators.DbtProjectLockSensor(
                 dag=dag,
-                task_id="check_running_dags",
-                python_callable=check_running_dags_branching,
-                op_kwargs={
-                    "dbt_dags": dbt_dags,
-                    "projects": dbt_projects,
-                    "dag_id": dag_id,
-                },
+                task_id="wait_for_dbt_projects",
+                sibling_dag_ids=dbt_project_lock.sibling_dag_ids(
+                    dbt_dags=dbt_dags, dag_id=dag_id, dbt_projects=dbt_projects
+                ),
+                mode="reschedule",
+                poke_interval=DBT_PROJECT_LOCK_POKE_INTERVAL,
             )
 
-            start_execution = DummyOperator(dag=dag, task_id="start_execution")
-            skip_execution = DummyOperator(dag=dag, task_id="skip_execution")
-            check_running_dags >> [skip_execution, start_execution]
-
-            # Add start_execution upstream dependency to all tasks without upstream tasks
-            for task in transformation_tasks.values():
+            # Add the lock upstream of all tasks without upstream tasks
+            operators = {t.task_id: t for t in transformation_tasks.values()}
+            for task in operators.values():
                 if not task.upstream_task_ids:
-                    start_execution >> task
+                    wait_for_dbt_projects >> task
 
     return dags, exceptions
 
 
-def check_running_dags_branching(dbt_dags: dict, projects: set, dag_id: str):
+def external_dependency_sensor(
+    dag, lineage_index: lineage.LineageIndex, transformation, upstream
+) -> Optional[ExternalTaskSensor]:
     """
-    Check if there is any other DAG currently running in the same project(s) of the given DAG
-
-    dbt_dags is a dict where the keys are DBT projects and the values the DAGs using the project
-    {
-        "project1: ["dag1", "dag2"],
-        "project2: ["dag3"]
-    }
+    Sensor waiting for a task of another DAG in the run with the same execution date,
+    shared by all tasks of the DAG depending on it. DAGs not scheduled at the same time
+    can't be matched by execution date, the dependency is only logged
+    """
+    upstream_dag_id = "dop__{}".format(upstream.transformation)
+    if not lineage_index.is_aligned(transformation, upstream.transformation):
+        logging.warning(
+            f"DAG dop__{transformation} reads a relation materialized by "
+            f"{upstream_dag_id}.{upstream.identifier} which has another schedule, "
+            f"add a sensor to wait for it"
+        )
+        return None
+
+    # Grouped tasks are run by the group's own task
+    upstream_grouped_execution = lineage_index.dag_configs[
+        upstream.transformation
+    ].grouped_execution
+    upstream_task_id = (
+        schema.GROUPED_EXECUTION_TASK_ID
+        if upstream_grouped_execution
+        and upstream.identifier in upstream_grouped_execution.tasks
+        else upstream.identifier
+    )
 
-    DAGS using the same project are extracted from dbt_dags and for each of them is checked
-    if there is any running instance. If true execution is stopped
+    task_id = f"wait_for__{upstream.transformation}__{upstream_task_id}"
+    if dag.has_task(task_id):
+        return dag.get_task(task_id)
 
-    :param dbt_dags: Dict of projects and DAGs
-    :param projects: Set with the project used by the current DAG
-    :param dag_id: Name of the current DAG
-    """
-    dags_to_check = set()
-    for project in projects:
-        project_dags = dbt_dags[project]
-        project_dags.discard(dag_id)
-        if project_dags:
-            dags_to_check.update(project_dags)
-    logging.info(f"Dags with DBT steps in the same projects: {dags_to_check}")
-    for dag in dags_to_check:
-        logging.info(f"Checking DAG {dag}")
-        dag_runs = DagRun.find(dag_id=dag, state=State.RUNNING)
-        if dag_runs:
-            logging.info(f"DAG {dag} is running, skipping execution")
-            return "skip_execution"
-    logging.info("No other DAGs running in the same projects")
-    return "start_execution"
+    return ExternalTaskSensor(
+        dag=dag,
+        task_id=task_id,
+        external_dag_id=upstream_dag_id,
+        external_task_id=upstream_task_id,
+        mode="reschedule",
+    )
 
 
 dags, exceptions = build(path_to_dags=env_config.orchestration_path)
@@ -1,8 +1,45 @@
+from airflow.models import DagRun
+from airflow.models.taskreschedule import TaskReschedule
 from airflow.operators.python_operator import PythonOperator
 from airflow.sensors.base_sensor_operator import BaseSensorOperator
+from airflow.stats import Stats
+from airflow.utils import timezone
+from airflow.utils.db import provide_session
+from airflow.utils.state import State
 
+from dop.component.transformation.common.templating import render_cache
+from dop.component.transformation.runner.bigquery.task_runner import template_task
+from dop.component.util import dbt_project_lock
 
-class BasePythonOperator(PythonOperator):
+
+class RenderCacheMixin:
+    """
+    Templates rendered by a task are cached across its retries and re-runs, see `RenderCache`
+    """
+
+    def render_template(self, content, context, jinja_env=None, seen_oids=None):
+        cache = render_cache.get_render_cache()
+        if (
+            cache is None
+            or not isinstance(content, str)
+            or ("{{" not in content and "{%" not in content)
+        ):
+            return super(RenderCacheMixin, self).render_template(
+                content, context, jinja_env=jinja_env, seen_oids=seen_oids
+            )
+
+        jinja_env = jinja_env or self.get_template_env()
+        return cache.render(
+            environment=jinja_env,
+            source=content,
+            context=context,
+            render=lambda: super(RenderCacheMixin, self).render_template(
+                content, context, jinja_env=jinja_env, seen_oids=seen_oids
+            ),
+        )
+
+
+class BasePythonOperator(RenderCacheMixin, PythonOperator):
     def __init__(
         self,
         python_callable,
@@ -12,7 +49,7 @@ class BasePythonOperator(PythonOperator):
         templates_dict=None,
         templates_exts=None,
         *args,
-        **kwargs
+        **kwargs,
     ):
         if kwargs.get("priority_weight") is None:
             kwargs["priority_weight"] = 1
@@ -25,11 +62,11 @@ class BasePythonOperator(PythonOperator):
             templates_dict=templates_dict,
             templates_exts=templates_exts,
             *args,
-            **kwargs
+            **kwargs,
         )
 
 
-class AbstractBaseSensorOperator(BaseSensorOperator):
+class AbstractBaseSensorOperator(RenderCacheMixin, BaseSensorOperator):
     def __init__(self, *args, **kwargs):
         super(AbstractBaseSensorOperator, self).__init__(*args, **kwargs)
 
@@ -55,7 +92,7 @@ class TransformationOperator(BasePythonOperator):
         templates_dict=None,
         templates_exts=None,
         *args,
-        **kwargs
+        **kwargs,
     ):
         super(TransformationOperator, self).__init__(
             python_callable=python_callable,
@@ -65,7 +102,7 @@ class TransformationOperator(BasePythonOperator):
             templates_dict=templates_dict,
             templates_exts=templates_exts,
             *args,
-            **kwargs
+            **kwargs,
         )
         task = op_kwargs["task"]
         self.action = task.kind.action
@@ -99,13 +136,160 @@ class AssertOperator(BasePythonOperator):
         provide_context=False,
         templates_dict=None,
         *args,
-        **kwargs
+        **kwargs,
     ):
         super(AssertOperator, self).__init__(
             python_callable=python_callable,
             provide_context=provide_context,
             templates_dict=templates_dict,
             *args,
-            **kwargs
+            **kwargs,
         )
         self.assertion_sql = templates_dict["sql"]
+
+
+class GroupedTransformationOperator(BasePythonOperator):
+    """
+    Run several native tasks within a single Airflow task, the SQL of each task is rendered
+    with the task's own parameters before the group is executed
+    """
+
+    ui_color = "#d9f2e6"
+    template_fields = ("templates_dict",)
+
+    def __init__(
+        self,
+        python_callable,
+        tasks,
+        sql_by_task,
+        max_workers,
+        provide_context=False,
+        *args,
+        **kwargs,
+    ):
+        super(GroupedTransformationOperator, self).__init__(
+            python_callable=python_callable,
+            op_kwargs={"tasks": tasks, "max_workers": max_workers},
+            provide_context=provide_context,
+            *args,
+            **kwargs,
+        )
+        self.tasks = tasks
+        self.sql_by_task = sql_by_task
+        self.max_workers = max_workers
+
+    def execute(self, context):
+        self.templates_dict = {
+            task.identifier: self.render_template(
+                content=self.sql_by_task[task.identifier],
+                context=dict(
+                    context,
+                    params=dict(context["params"], task=task.__dict__),
+                    task=template_task(task),
+                ),
+            )
+            for task in self.tasks
+            if self.sql_by_task.get(task.identifier) is not None
+        }
+
+        return super(GroupedTransformationOperator, self).execute(context)
+
+
+class AssertSensorOperator(AbstractBaseSensorOperator):
+    """
+    Evaluate an assertion until it succeeds. The poke interval grows exponentially after each
+    failed evaluation, and the sensor releases its worker slot between pokes in `reschedule`
+    mode
+    """
+
+    ui_color = "#fde3d6"
+    template_fields = ("assertion_sql",)
+
+    def __init__(
+        self,
+        poke_callable,
+        sql,
+        task,
+        backoff=2,
+        max_poke_interval=3600,
+        *args,
+        **kwargs,
+    ):
+        super(AssertSensorOperator, self).__init__(*args, **kwargs)
+        self.poke_callable = poke_callable
+        self.assertion_sql = sql
+        self.task_config = task
+        self.backoff = backoff
+        self.max_poke_interval = max_poke_interval
+        self._initial_poke_interval = self.poke_interval
+        self._pokes = 0
+
+    def poke(self, context):
+        if self.poke_callable(
+            task=self.task_config, sql=self.assertion_sql, context=context
+        ):
+            return True
+
+        self.poke_interval = self.next_poke_interval(context=context)
+        self.log.info(f"Assertion failed, next poke in {self.poke_interval}s")
+
+        return False
+
+    def next_poke_interval(self, context):
+        if self.reschedule:
+            # The operator is created again for each poke, previous pokes are rescheduled
+            pokes = len(TaskReschedule.find_for_task_instance(context["ti"])) + 1
+        else:
+            self._pokes += 1
+            pokes = self._pokes
+
+        return min(
+            self._initial_poke_interval * self.backoff ** (pokes - 1),
+            self.max_poke_interval,
+        )
+
+
+class DbtProjectLockSensor(AbstractBaseSensorOperator):
+    """
+    Wait until no run of another DAG using the same DBT project(s), started before the
+    current run, is still running. Runs of DAGs sharing a DBT project are queued in the order
+    they started rather than skipped, and the time spent waiting is sent to StatsD
+    """
+
+    ui_color = "#FF694B"
+
+    def __init__(self, sibling_dag_ids, *args, **kwargs):
+        """
+        :param sibling_dag_ids: DAGs running DBT tasks in the same project(s)
+        """
+        super(DbtProjectLockSensor, self).__init__(*args, **kwargs)
+        self.sibling_dag_ids = sorted(sibling_dag_ids)
+
+    @provide_session
+    def poke(self, context, session=None):
+        dag_run = context["dag_run"]
+        earlier_runs = []
+        if self.sibling_dag_ids:
+            # A single query for all sibling DAGs
+            running = (
+                session.query(DagRun.dag_id, DagRun.run_id, DagRun.start_date)
+                .filter(
+                    DagRun.dag_id.in_(self.sibling_dag_ids),
+                    DagRun.state == State.RUNNING,
+                )
+                .all()
+            )
+            earlier_runs = dbt_project_lock.earlier_runs(
+                running=running, dag_run=dag_run
+            )
+
+        if earlier_runs:
+            self.log.info(f"Waiting for DAG runs started earlier: {earlier_runs}")
+            Stats.incr(f"dop.dbt_project_lock.{self.dag_id}.blocked")
+            return False
+
+        wait_time = timezone.utcnow() - dag_run.start_date
+        self.log.info(f"DBT project(s) available after {wait_time}")
+        Stats.timing(f"dop.dbt_project_lock.{self.dag_id}.wait_time", wait_time)
+
+        return True
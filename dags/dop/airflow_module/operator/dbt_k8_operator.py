@@ -7,6 +7,7 @@ from airflow.contrib.operators.kubernetes_pod_operator import KubernetesPodOpera
 from airflow.sensors.base_sensor_operator import apply_defaults
 from dop.component.configuration.env import env_config
 from dop.airflow_module.operator import dbt_operator_helper
+from dop.component.util import dbt_state
 
 # List of files generated by dbt docs generate
 # https://docs.getdbt.com/reference/commands/cmd-docs
@@ -86,6 +87,8 @@ class DbtK8Operator(KubernetesPodOperator):
         self.action = task.kind.action
         self.target = task.kind.target
         self.dbt_arguments = dbt_arguments
+        self.partial_parse = task.options.get("partial_parse", False)
+        self.only_modified = task.options.get("only_modified", False)
         self.gcr_pull_secret_name = env_config.gcr_pull_secret_name
         self.image_tag = retrieve_commit_hash()
 
@@ -150,11 +153,19 @@ class DbtK8Operator(KubernetesPodOperator):
                 dbt_arguments=self.dbt_arguments
             )
 
+        cmd_to_restore_state = ""
+        cmd_to_store_state = ""
+        if self.partial_parse or self.only_modified:
+            cmd_to_restore_state, cmd_to_store_state = self.state_commands()
+
         cmd_to_run_dbt = (
-            f"pipenv run dbt --no-use-colors {self.target} --project-dir ./{self.dbt_project_name}"
+            f"{cmd_to_restore_state}"
+            f"pipenv run dbt --no-use-colors{' --partial-parse' if self.partial_parse else ''} {self.target} --project-dir ./{self.dbt_project_name}"
             f" --vars {dbt_operator_helper.parsed_cmd_airflow_context_vars(context=context)}"
             f" {cmd_for_additional_arguments}"
-            f" {full_refresh_cmd};"
+            f" {dbt_operator_helper.state_selection_arguments(target=self.target) if self.only_modified else ''}"
+            f" {full_refresh_cmd}"
+            f"{cmd_to_store_state};"
             f" gsutil cp /home/{DBT_USER}/{self.dbt_project_name}/{DBT_RUN_RESULTS_PATH} gs://{os.getenv('GCS_BUCKET')}/dbt/{DBT_RUN_RESULTS_PATH}"
         )
 
@@ -165,6 +176,41 @@ class DbtK8Operator(KubernetesPodOperator):
 
         return cmd_to_run_dbt
 
+    def state_commands(self):
+        """
+        Generate the commands restoring the manifest and parse results of the previous
+        successful run from GCS, next to the run results, and storing them once DBT has
+        succeeded. DBT_STATE is emptied when there is no previous manifest
+
+        :return: The commands run before and after DBT
+        """
+        state_url = (
+            f"gs://{os.getenv('GCS_BUCKET')}/dbt/state/{self.dbt_project_name}"
+            f"/{self.target.replace(' ', '_')}"
+        )
+        target_path = f"/home/{DBT_USER}/{self.dbt_project_name}/{DBT_DOC_FOLDER}"
+
+        restore_command = (
+            f"DBT_STATE=$(mktemp -d); mkdir -p {target_path};"
+            f" gsutil -q cp '{state_url}/*' $DBT_STATE/;"
+            f" [ -f $DBT_STATE/{dbt_state.MANIFEST_FILE} ] || DBT_STATE='';"
+        )
+        if self.partial_parse:
+            restore_command += (
+                f' [ -n "$DBT_STATE" ] && [ -f $DBT_STATE/{dbt_state.PARTIAL_PARSE_FILE} ]'
+                f" && cp $DBT_STATE/{dbt_state.PARTIAL_PARSE_FILE} {target_path}/;"
+            )
+
+        store_command = "".join(
+            [
+                f" && ( [ ! -f {target_path}/{state_file} ]"
+                f" || gsutil -q cp {target_path}/{state_file} {state_url}/{state_file} )"
+                for state_file in dbt_state.STATE_FILES
+            ]
+        )
+
+        return f"{restore_command} ", store_command
+
     def copy_docs_to_gcs_command(self):
         """
         Generate gsutil command line to copy doc files generated with dbt docs generate to GCS
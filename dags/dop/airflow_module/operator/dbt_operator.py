@@ -51,6 +51,8 @@ class DbtOperator(BashOperator):
         self.action = task.kind.action
         self.target = task.kind.target
         self.dbt_arguments = dbt_arguments
+        self.partial_parse = task.options.get("partial_parse", False)
+        self.only_modified = task.options.get("only_modified", False)
 
         self._full_refresh = (
             False  # used to trigger DBT full refresh, modified via execute() override
@@ -76,7 +78,9 @@ class DbtOperator(BashOperator):
 
     def parse_bash_command(self, context=None):
         """
-        Create a virtualenv and run DBT. Virtualenv is removed regardless if the script is successful or not
+        Run DBT in the cached virtualenv of its version, which is only built the first time the
+        version is used on the host. The temporary folder holding the DBT profile is removed
+        regardless if the script is successful or not
         """
 
         full_refresh_cmd = ""
@@ -94,17 +98,16 @@ class DbtOperator(BashOperator):
         trap = """
         trap 'catch $? $LINENO' ERR
         catch() {
-          echo "Script errored, removing virtualenv"
+          echo "Script errored, removing temporary folder"
           rm -rf $TMP_DIR
           exit 1
         }
         """
         cmd_for_tmp_dir = "export TMP_DIR=$(mktemp -d)"
         cmd_to_print_tmp_dir = "echo TMP_DIR is: $TMP_DIR"
-        cmd_for_virtualenv = "virtualenv -p python3 $TMP_DIR"
+        cmd_for_virtualenv = f"DBT_ENV=$(PYTHONPATH={env_config.dag_path} python {env_config.dag_path}/dop/component/helper/dbt_env.py --dbt_version={self.dbt_version})"
         dbt_init = f"PYTHONPATH={env_config.dag_path} python {env_config.dag_path}/dop/component/helper/dbt_init.py --tmp_dir=$TMP_DIR --project_name={self.dbt_project_name}"
-        cmd_for_activating_virtualenv = "source $TMP_DIR/bin/activate"
-        install_pip_deps = f"pip install dbt=={self.dbt_version}"
+        cmd_for_activating_virtualenv = "source $DBT_ENV/bin/activate"
 
         cmd_for_additional_arguments = ""
 
@@ -114,13 +117,33 @@ class DbtOperator(BashOperator):
                 dbt_arguments=self.dbt_arguments
             )
 
-        cmd_to_run_dbt = (
-            f"dbt clean --project-dir {self.dbt_project_path} --profiles-dir $TMP_DIR/.dbt"
+        # Packages are only installed with `dbt deps` when packages.yml or the DBT version
+        # have changed and they are not cached yet
+        dbt_deps_cache = f"PYTHONPATH={env_config.dag_path} python {env_config.dag_path}/dop/component/helper/dbt_deps.py --project_dir={self.dbt_project_path} --dbt_version={self.dbt_version}"
+        cmd_to_install_deps = (
+            f"{dbt_deps_cache} restore"
+            f" || (dbt clean --project-dir {self.dbt_project_path} --profiles-dir $TMP_DIR/.dbt"
             f" && dbt deps --project-dir {self.dbt_project_path}"
-            f" && dbt --no-use-colors {self.target} --project-dir {self.dbt_project_path}"
+            f" && {dbt_deps_cache} store)"
+        )
+
+        # The manifest and parse results of the previous successful run are restored when
+        # parsing is partial or only modified models are run, DBT_STATE is empty on the first run
+        dbt_state = f"PYTHONPATH={env_config.dag_path} python {env_config.dag_path}/dop/component/helper/dbt_state.py --project_dir={self.dbt_project_path} --project_name={self.dbt_project_name} --target='{self.target}'"
+        is_stateful = self.partial_parse or self.only_modified
+        cmd_to_restore_state = (
+            f"DBT_STATE=$({dbt_state} restore{' --partial_parse' if self.partial_parse else ''})"
+            if is_stateful
+            else ""
+        )
+        cmd_to_store_state = f"{dbt_state} store" if is_stateful else ""
+
+        cmd_to_run_dbt = (
+            f"dbt --no-use-colors{' --partial-parse' if self.partial_parse else ''} {self.target} --project-dir {self.dbt_project_path}"
             f" --profiles-dir $TMP_DIR/.dbt"
             f" --vars {dbt_operator_helper.parsed_cmd_airflow_context_vars(context=context)}"
             f" {cmd_for_additional_arguments}"
+            f" {dbt_operator_helper.state_selection_arguments(target=self.target) if self.only_modified else ''}"
             f" {full_refresh_cmd}"
         )
 
@@ -135,8 +158,10 @@ class DbtOperator(BashOperator):
                 cmd_for_virtualenv,
                 dbt_init,  # setup dbt profiles.yml & service account secret from Secret Manager
                 cmd_for_activating_virtualenv,
-                install_pip_deps,
+                cmd_to_install_deps,
+                cmd_to_restore_state,
                 cmd_to_run_dbt,
+                cmd_to_store_state,
                 cmd_to_remove_tmp_dir,
             ]
         )
@@ -1,15 +1,27 @@
-import io
+import atexit
 import json
 import logging
+import os
 import pathlib
+import tempfile
+import threading
+
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
 
 from google.cloud import bigquery
-from google.cloud import storage
 from urllib.parse import urlparse
-from google.cloud.exceptions import NotFound
 
-DBT_RUN_RESULTS_TABLE = "run_results"
-DBT_RUN_RESULTS_SCHEMA_FILE = "run_results_schema.json"
+from dop.component.util import client_registry, dbt_artifact, dbt_state
+
+DBT_RUN_RESULTS_TABLE = "run_result_nodes"
+DBT_RUN_RESULTS_SCHEMA_FILE = "run_result_nodes_schema.json"
+# Buffered rows are loaded once this many rows are waiting
+RUN_RESULTS_MAX_BUFFERED_ROWS = 50000
+# Buffered rows are kept in memory up to this size, then written to disk
+RUN_RESULTS_SPOOL_SIZE = 8 * 1024 * 1024
+
+_schemas: Dict[str, List[bigquery.SchemaField]] = {}
 
 
 def implode_arguments(dbt_arguments, filter_func=None):
@@ -43,6 +55,19 @@ def parsed_cmd_airflow_context_vars(context):
     return cmd
 
 
+def state_selection_arguments(target, state_variable="DBT_STATE"):
+    """
+    Select the models modified since the previous successful run, and defer to its relations
+    for their unmodified parents. Every model is selected when the shell variable holding the
+    path of the previous state is empty, i.e. on the first run
+    """
+    defer = " --defer" if target == "run" else ""
+    return (
+        f"${{{state_variable}:+-m {dbt_state.MODIFIED_SELECTOR}{defer}"
+        f" --state ${state_variable}}}"
+    )
+
+
 def extract_argument(dbt_arguments: list, name: str, default_value: str = None):
     """
     Extract an argument from the argument list. Format is
@@ -61,63 +86,226 @@ def extract_argument(dbt_arguments: list, name: str, default_value: str = None):
         default_value,
     )
 
-def save_run_results_in_bq(project_id, dbt_project_name, run_results_path):
+
+class RunResultsBuffer:
     """
-    Load run_results json file in BigQuery. As a first step is checked if the table
-    already exists in the schema and if not, it's created.
+    Rows of run results waiting to be loaded into BigQuery, shared by the DBT tasks run by a
+    process. Rows are written as NDJSON to a spooled temporary file per table and loaded with
+    a single load job once `max_rows` rows are buffered or when flushed.
 
-    To fit BQ schema, the field metadata.env (JSON object) must be serialised
-    and results.message converted to string,
-    because depending on the task it can be an integer or a string
+    Tables are created by the load jobs when they don't exist, rows buffered by a process
+    are discarded by the processes it forks so that they are only loaded once.
     """
-    table_id = f"{project_id}.{dbt_project_name}.{DBT_RUN_RESULTS_TABLE}"
-    client = bigquery.Client(project=project_id)
-    check_run_results_table(client, table_id)
-
-    run_results = {}
-    if run_results_path.startswith("gs://"):
-        storage_client = storage.Client()
-        bucket, path = _parse_gcs_url(run_results_path)
-        bucket = storage_client.get_bucket(bucket)
-        blob = bucket.blob(path)
-        run_results = json.loads(blob.download_as_string())
-    else:
-        with open(run_results_path) as run_results_file:
-            run_results = json.load(run_results_file)
 
-    if run_results["metadata"]["env"]:
-        run_results["metadata"]["env"] = json.dumps(run_results["metadata"]["env"])
-    else:
-        del run_results["metadata"]["env"]
-    for item in run_results["results"]:
-        item["message"] = str(item["message"])
+    def __init__(self, max_rows: int = RUN_RESULTS_MAX_BUFFERED_ROWS):
+        self._max_rows = max_rows
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        # (project id, table id) -> [NDJSON file, number of rows]
+        self._pending: Dict[Tuple[str, str], list] = {}
+
+    def _reset_if_forked(self):
+        if self._pid != os.getpid():
+            self._pending = {}
+            self._pid = os.getpid()
+
+    def add(self, project_id, table_id, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        :param rows: Rows to buffer, which may be decoded lazily
+        :return: The number of rows added
+        """
+        with self._lock:
+            self._reset_if_forked()
+            pending = self._pending.setdefault(
+                (project_id, table_id),
+                [tempfile.SpooledTemporaryFile(max_size=RUN_RESULTS_SPOOL_SIZE), 0],
+            )
+            start = pending[0].tell()
+            row_count = 0
+            try:
+                for row in rows:
+                    pending[0].write(json.dumps(row).encode())
+                    pending[0].write(b"\n")
+                    row_count += 1
+            except BaseException:
+                # Rows of an artifact are either all buffered or not at all
+                pending[0].seek(start)
+                pending[0].truncate()
+                raise
+            pending[1] += row_count
+            is_full = pending[1] >= self._max_rows
+
+        if is_full:
+            self.flush()
+
+        return row_count
+
+    def flush(self) -> int:
+        """
+        Load the buffered rows, one load job per table. Rows of a failed load job are logged
+        and discarded, as run results are not worth failing a DBT task that succeeded
+
+        :return: The number of rows loaded
+        """
+        with self._lock:
+            self._reset_if_forked()
+            pending, self._pending = self._pending, {}
+
+        loaded_rows = 0
+        for (project_id, table_id), (fp, row_count) in pending.items():
+            with fp:
+                fp.seek(0)
+                loaded_rows += load_run_result_rows(
+                    project_id=project_id,
+                    table_id=table_id,
+                    fp=fp,
+                    row_count=row_count,
+                )
+
+        return loaded_rows
 
-    data_as_file = io.StringIO(json.dumps(run_results))
+
+def load_run_result_rows(project_id, table_id, fp, row_count) -> int:
+    """
+    Append NDJSON rows to a run results table, which is created partitioned by
+    `generated_at` if it does not exist
+
+    :return: The number of rows loaded
+    """
+    client = client_registry.get_bigquery_client(project_id=project_id)
     job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        schema=run_result_nodes_schema(client),
+        create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        time_partitioning=bigquery.TimePartitioning(field="generated_at"),
+        # fields added by newer DBT versions are not loaded rather than failing the job
+        ignore_unknown_values=True,
     )
-    job = client.load_table_from_file(data_as_file, table_id, job_config=job_config)
+    job = None
     try:
+        job = client.load_table_from_file(fp, table_id, job_config=job_config)
         result = job.result()  # Waits for table load to complete.
-        logging.info("Pushed {} rows into run_results table".format(result.output_rows))
     except Exception:
-        logging.info(f"Error loading run_results to BigQuery: {job.errors}")
+        logging.exception(
+            f"Error loading {row_count} rows into {table_id}, job errors:"
+            f" {job.errors if job else None}"
+        )
+        return 0
 
+    logging.info(f"Pushed {result.output_rows} rows into {table_id}")
+    return result.output_rows
 
-def check_run_results_table(client, table_id):
-    """
-    Check if run_results table exists in BigQuery, and if not create it
-    """
-    try:
-        client.get_table(table_id)
-    except NotFound:
-        print("Table {} is not found.".format(table_id))
+
+def run_result_nodes_schema(client) -> List[bigquery.SchemaField]:
+    if DBT_RUN_RESULTS_SCHEMA_FILE not in _schemas:
         current_folder = pathlib.Path(__file__).parent.absolute()
-        schema = client.schema_from_json(
+        _schemas[DBT_RUN_RESULTS_SCHEMA_FILE] = client.schema_from_json(
             f"{current_folder}/{DBT_RUN_RESULTS_SCHEMA_FILE}"
         )
-        table = bigquery.Table(table_id, schema=schema)
-        client.create_table(table)
+
+    return _schemas[DBT_RUN_RESULTS_SCHEMA_FILE]
+
+
+def run_result_rows(
+    run_results: Dict[str, Any], results: Iterable[Dict[str, Any]], dbt_project_name
+) -> Iterator[Dict[str, Any]]:
+    """
+    One row per node of a `run_results.json` artifact, along with the metadata of the
+    invocation. Objects whose fields depend on the DBT command or version are serialised,
+    and `message` converted to string because depending on the task it can be an integer
+    or a string
+
+    :param run_results: Top-level fields of the artifact other than `results`
+    :param results: Results of the artifact, which may be decoded lazily
+    """
+    metadata = run_results.get("metadata") or {}
+    invocation = {
+        "dbt_project": dbt_project_name,
+        "invocation_id": metadata.get("invocation_id"),
+        "generated_at": metadata.get("generated_at"),
+        "dbt_version": metadata.get("dbt_version"),
+        "dbt_schema_version": metadata.get("dbt_schema_version"),
+        "env": json.dumps(metadata["env"]) if metadata.get("env") else None,
+        "args": json.dumps(run_results["args"]) if run_results.get("args") else None,
+        "elapsed_time": run_results.get("elapsed_time"),
+    }
+
+    for result in results:
+        row = dict(invocation)
+        row.update(
+            {
+                "unique_id": result.get("unique_id"),
+                "status": result.get("status"),
+                "message": None
+                if result.get("message") is None
+                else str(result["message"]),
+                "failures": result.get("failures"),
+                "thread_id": result.get("thread_id"),
+                "execution_time": result.get("execution_time"),
+                "timing": result.get("timing") or [],
+                "adapter_response": result.get("adapter_response") or None,
+            }
+        )
+        yield row
+
+
+@contextmanager
+def open_artifact(path) -> Iterator[BinaryIO]:
+    """
+    Open a DBT artifact, local or in GCS. Artifacts in GCS are downloaded in chunks to a
+    temporary file rather than in memory
+    """
+    if not path.startswith("gs://"):
+        with open(path, "rb") as fp:
+            yield fp
+        return
+
+    storage_client = client_registry.get_storage_client()
+    bucket, blob_path = _parse_gcs_url(path)
+    with tempfile.TemporaryFile() as fp:
+        storage_client.bucket(bucket).blob(blob_path).download_to_file(fp)
+        fp.seek(0)
+        yield fp
+
+
+def save_run_results_in_bq(project_id, dbt_project_name, run_results_path, flush=True):
+    """
+    Load the results of each node of a run_results json file in BigQuery, as one row per
+    node in the `run_result_nodes` table of the DBT project dataset.
+
+    :param flush: If the rows are loaded right away, otherwise they are buffered and loaded
+    with the rows of the following DBT tasks of the process. Airflow runs each task in a
+    process which exits without running exit handlers, rows must be flushed by the task.
+    """
+    table_id = f"{project_id}.{dbt_project_name}.{DBT_RUN_RESULTS_TABLE}"
+    try:
+        # Results are streamed, the other fields are read first as they come after them
+        with open_artifact(run_results_path) as fp:
+            run_results = dbt_artifact.read_fields(fp, skipped_keys=["results"])
+            fp.seek(0)
+            row_count = run_results_buffer.add(
+                project_id=project_id,
+                table_id=table_id,
+                rows=run_result_rows(
+                    run_results,
+                    results=dbt_artifact.iter_items(fp, "results"),
+                    dbt_project_name=dbt_project_name,
+                ),
+            )
+    except Exception:
+        logging.exception(f"Error reading run results from {run_results_path}")
+        return
+
+    logging.info(f"Buffered {row_count} run results rows for {table_id}")
+
+    if flush:
+        run_results_buffer.flush()
+
+
+run_results_buffer = RunResultsBuffer()
+# Rows left by processes that do not flush after each DBT task
+atexit.register(run_results_buffer.flush)
 
 
 def _parse_gcs_url(gsurl):
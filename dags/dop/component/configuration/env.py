@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 DOP_DBT_USER = "dop-dbt-user"
 DOP_DOCKER_USER = "dop-docker-user"
@@ -58,5 +59,139 @@ class EnvConfig:
         """
         return self.service_project_path
 
+    @property
+    def dbt_env_cache_path(self):
+        """
+        Where virtual environments with DBT installed are kept between DBT tasks
+        :return:
+        """
+        return os.environ.get(
+            "DOP_DBT_ENV_CACHE_PATH",
+            os.path.sep.join([self.cache_path, "dbt_envs"]),
+        )
+
+    @property
+    def dbt_env_cache_max_size(self):
+        """
+        Size budget of the DBT virtual environments in bytes, 2GB by default
+        :return:
+        """
+        return int(os.environ.get("DOP_DBT_ENV_CACHE_MAX_SIZE_MB", 2048)) * 1024 * 1024
+
+    @property
+    def dbt_deps_cache_path(self):
+        """
+        Where the packages installed by `dbt deps` are cached, by `packages.yml` and DBT version
+        :return:
+        """
+        return os.environ.get(
+            "DOP_DBT_DEPS_CACHE_PATH",
+            os.path.sep.join([self.cache_path, "dbt_deps"]),
+        )
+
+    @property
+    def dbt_state_path(self):
+        """
+        Where the manifest and parse results of successful DBT runs are kept, by DBT project and command
+        :return:
+        """
+        return os.environ.get(
+            "DOP_DBT_STATE_PATH",
+            os.path.sep.join([self.cache_path, "dbt_state"]),
+        )
+
+    @property
+    def cache_path(self):
+        """
+        Private directory of the caches of DOP on a host, created by the user running Airflow
+        and only accessible by them
+        :return:
+        """
+        return os.environ.get(
+            "DOP_CACHE_PATH",
+            os.path.sep.join([tempfile.gettempdir(), f"dop-{os.getuid()}"]),
+        )
+
+    @property
+    def is_parse_cache_enabled(self):
+        return not bool(os.environ.get("DOP_PARSE_CACHE_DISABLED", False))
+
+    @property
+    def parse_cache_path(self):
+        """
+        Where parsed transformations are persisted between DAG file processing runs
+        :return:
+        """
+        return os.environ.get(
+            "DOP_PARSE_CACHE_PATH",
+            os.path.sep.join([self.cache_path, "parse_cache.pickle"]),
+        )
+
+    @property
+    def is_render_cache_enabled(self):
+        return not bool(os.environ.get("DOP_RENDER_CACHE_DISABLED", False))
+
+    @property
+    def render_cache_path(self):
+        """
+        Where rendered SQL is persisted between retries and re-runs of a task
+        :return:
+        """
+        return os.environ.get(
+            "DOP_RENDER_CACHE_PATH",
+            os.path.sep.join([self.cache_path, "render_cache"]),
+        )
+
+    @property
+    def is_dag_artifact_enabled(self):
+        return not bool(os.environ.get("DOP_DAG_ARTIFACT_DISABLED", False))
+
+    @property
+    def dag_artifact_path(self):
+        """
+        Where the transformations parsed at build time are read from, next to the commit hash
+        of the deployment by default
+        :return:
+        """
+        return os.environ.get(
+            "DOP_DAG_ARTIFACT_PATH",
+            os.path.sep.join([self.service_project_path, ".dop-dag-artifact.pickle"]),
+        )
+
+    @property
+    def parse_workers(self):
+        """
+        Number of processes used to parse orchestration configs, 0 or 1 parses them serially
+        :return:
+        """
+        return int(os.environ.get("DOP_PARSE_WORKERS", 0))
+
+    @property
+    def metadata_cache_ttl(self):
+        """
+        When set, relation metadata is shared across tasks run by the same process for up to
+        this number of seconds
+        :return:
+        """
+        ttl = os.environ.get("DOP_METADATA_CACHE_TTL")
+        return float(ttl) if ttl else None
+
+    @property
+    def metadata_backend(self):
+        """
+        How table metadata is looked up by native transformations,
+        either `information_schema` (default) or `tables_api`
+        :return:
+        """
+        return os.environ.get("DOP_METADATA_BACKEND", "information_schema")
+
+    @property
+    def jinja_bytecode_cache_path(self):
+        """
+        When set, compiled runner templates are also cached in this directory
+        :return:
+        """
+        return os.environ.get("DOP_JINJA_BYTECODE_CACHE_PATH")
+
 
 env_config = EnvConfig()
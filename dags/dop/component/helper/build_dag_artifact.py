@@ -0,0 +1,64 @@
+import argparse
+import logging
+import os
+import sys
+
+from dop.component.transformation.common.parser import dag_artifact
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Parse and validate DOP transformations once, when a deployment is built"
+    )
+    parser.add_argument(
+        "--service_project_path",
+        required=True,
+        type=str,
+        help="the service project, where `.commit-hash` has been written",
+    )
+    parser.add_argument(
+        "--database",
+        default=os.environ.get("DOP_PROJECT_ID"),
+        type=str,
+        help="the GCP project ID where DOP persists data, defaults to DOP_PROJECT_ID",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        type=str,
+        help="where the artifact is written, defaults to the service project",
+    )
+
+    args = parser.parse_args()
+
+    commit_hash = dag_artifact.read_commit_hash(
+        service_project_path=args.service_project_path
+    )
+    if not commit_hash:
+        sys.exit(f"No commit hash found in {args.service_project_path}")
+
+    if not args.database:
+        sys.exit("--database or DOP_PROJECT_ID must be set")
+
+    artifact_path = args.output or os.path.sep.join(
+        [args.service_project_path, dag_artifact.ARTIFACT_FILE]
+    )
+    transformations = dag_artifact.build_artifact(
+        path_to_dags=os.path.sep.join(
+            [args.service_project_path, "embedded_dop", "orchestration"]
+        ),
+        database=args.database,
+        commit_hash=commit_hash,
+        artifact_path=artifact_path,
+    )
+
+    for details in transformations:
+        if "error" in details:
+            logging.warning(
+                f"Invalid transformation {details['transformation']}: {details['error']}"
+            )
+
+    logging.info(
+        f"Built {artifact_path} with {len(transformations)} transformation(s) "
+        f"for commit {commit_hash}"
+    )
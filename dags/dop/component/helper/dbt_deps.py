@@ -0,0 +1,62 @@
+import argparse
+import logging
+import os
+import sys
+
+from dop.component.configuration.env import env_config
+from dop.component.util import dbt_deps_cache, files
+
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Restore or store the packages installed by `dbt deps`"
+    )
+    parser.add_argument("action", choices=["restore", "store"])
+    parser.add_argument(
+        "--project_dir", required=True, type=str, help="the DBT project folder"
+    )
+    parser.add_argument(
+        "--dbt_version", required=True, type=str, help="the DBT version of the project"
+    )
+
+    args = parser.parse_args()
+
+    # Cached packages are run by DBT, a cache writable by other users is not used
+    cache_path = env_config.dbt_deps_cache_path
+    try:
+        files.private_directory(cache_path)
+    except PermissionError as e:
+        logging.warning(f"Ignoring the DBT packages cache: {e}")
+        cache_path = None
+
+    if args.action == "restore":
+        # Exits with 1 when the packages must be installed with `dbt deps`
+        restored = dbt_deps_cache.restore(
+            project_path=args.project_dir,
+            dbt_version=args.dbt_version,
+            cache_paths=[
+                path
+                for path in [
+                    cache_path,
+                    # Packages committed to the service project to seed the cache
+                    os.path.sep.join(
+                        [
+                            env_config.service_project_path,
+                            "embedded_dop",
+                            "executor_config",
+                            "dbt",
+                            "deps_cache",
+                        ]
+                    ),
+                ]
+                if path
+            ],
+        )
+        sys.exit(0 if restored else 1)
+
+    if cache_path:
+        dbt_deps_cache.store(
+            project_path=args.project_dir,
+            dbt_version=args.dbt_version,
+            cache_path=cache_path,
+        )
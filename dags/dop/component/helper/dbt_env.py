@@ -0,0 +1,24 @@
+import argparse
+import logging
+import sys
+
+from dop.component.configuration.env import env_config
+from dop.component.util.dbt_env_cache import DbtEnvCache
+
+if __name__ == "__main__":
+    # Logs are written to stderr, stdout only holds the path of the environment
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Print the path of a virtual environment with DBT installed"
+    )
+    parser.add_argument(
+        "--dbt_version", required=True, type=str, help="the DBT version to install"
+    )
+
+    args = parser.parse_args()
+
+    cache = DbtEnvCache(
+        cache_path=env_config.dbt_env_cache_path,
+        max_size=env_config.dbt_env_cache_max_size,
+    )
+    print(cache.get(dbt_version=args.dbt_version))
@@ -0,0 +1,56 @@
+import argparse
+import logging
+import sys
+
+from dop.component.configuration.env import env_config
+from dop.component.util import dbt_state, files
+
+if __name__ == "__main__":
+    # Logs are written to stderr, stdout only holds the path of the previous state
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Restore or store the manifest and parse results of a DBT project"
+    )
+    parser.add_argument("action", choices=["restore", "store"])
+    parser.add_argument(
+        "--project_dir", required=True, type=str, help="the DBT project folder"
+    )
+    parser.add_argument(
+        "--project_name", required=True, type=str, help="the DBT project name"
+    )
+    parser.add_argument(
+        "--target", required=True, type=str, help="the DBT command, i.e. `run`"
+    )
+    parser.add_argument(
+        "--partial_parse",
+        action="store_true",
+        help="restore the parse results of the previous successful run",
+    )
+
+    args = parser.parse_args()
+
+    path = dbt_state.state_path(
+        cache_path=env_config.dbt_state_path,
+        project_name=args.project_name,
+        target=args.target,
+    )
+
+    # The state decides which models are run, a state writable by other users is not used
+    try:
+        files.private_directory(env_config.dbt_state_path)
+    except PermissionError as e:
+        logging.warning(f"Ignoring the DBT state: {e}")
+        print("")
+        sys.exit(0)
+
+    if args.action == "restore":
+        print(
+            dbt_state.restore(
+                project_path=args.project_dir,
+                state_path=path,
+                partial_parse=args.partial_parse,
+            )
+            or ""
+        )
+    else:
+        dbt_state.store(project_path=args.project_dir, state_path=path)
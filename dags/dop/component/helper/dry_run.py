@@ -0,0 +1,296 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import jinja2
+
+from dop import definitions
+from dop.component.configuration.env import env_config
+from dop.component.transformation.common.adapter import schema
+from dop.component.transformation.common.parser import transformation_parser
+from dop.component.transformation.runner.bigquery import task_runner
+from dop.component.transformation.runner.bigquery.adapter import impl
+
+COMMON_TEMPLATE_PATH = os.path.join(
+    definitions.ROOT_DIR,
+    "component",
+    "transformation",
+    "common",
+    "templating",
+    "template",
+)
+
+
+@dataclass
+class DryRunResult:
+    dag_id: str
+    task_id: str
+    kind: str
+    bytes_processed: int = 0
+    error: Optional[str] = None
+
+
+def ds_add(ds, days):
+    date = datetime.datetime.strptime(ds, "%Y-%m-%d") + datetime.timedelta(days=days)
+    return date.strftime("%Y-%m-%d")
+
+
+def ds_format(ds, input_format, output_format):
+    return datetime.datetime.strptime(ds, input_format).strftime(output_format)
+
+
+def mock_airflow_context(
+    dag_config: schema.DagConfig,
+    task: schema.Task,
+    execution_date: datetime.datetime,
+    dag_run_conf: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    The subset of the Airflow template context used by transformations, as it would be
+    for a DAG run at `execution_date`
+    """
+    ds = execution_date.strftime("%Y-%m-%d")
+
+    return {
+        "ds": ds,
+        "ds_nodash": ds.replace("-", ""),
+        "ts": execution_date.isoformat(),
+        "ts_nodash": execution_date.strftime("%Y%m%dT%H%M%S"),
+        "execution_date": execution_date,
+        "prev_ds": ds_add(ds, -1),
+        "next_ds": ds_add(ds, 1),
+        "yesterday_ds": ds_add(ds, -1),
+        "tomorrow_ds": ds_add(ds, 1),
+        "dag_run": SimpleNamespace(conf=dag_run_conf),
+        "params": {"params": dag_config.params, "task": task.__dict__},
+        "task": task_runner.template_task(task),
+        "macros": SimpleNamespace(
+            ds_add=ds_add,
+            ds_format=ds_format,
+            datetime=datetime.datetime,
+            timedelta=datetime.timedelta,
+        ),
+    }
+
+
+def dry_run_task(
+    dag_id, path_to_transformation, dag_config, task, sql, execution_date, dag_run_conf
+) -> DryRunResult:
+    result = DryRunResult(
+        dag_id=dag_id,
+        task_id=task.identifier,
+        kind=f"{task.kind.action}:{task.kind.target}",
+    )
+
+    try:
+        airflow_context = mock_airflow_context(
+            dag_config=dag_config,
+            task=task,
+            execution_date=execution_date,
+            dag_run_conf=dag_run_conf,
+        )
+        # Rendered the same way as Airflow renders `templates_dict`
+        environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(
+                [path_to_transformation, COMMON_TEMPLATE_PATH]
+            ),
+            extensions=["jinja2.ext.do"],
+        )
+        rendered_sql = (
+            environment.from_string(sql).render(**airflow_context) if sql else None
+        )
+
+        runner = impl.get_query_runner(
+            options={
+                "project_id": task.database,
+                "location": env_config.location,
+                "dry_run": True,
+                "metadata_backend": env_config.metadata_backend,
+            }
+        )
+        task_runner.runner_caller(
+            runner=runner,
+            task=task,
+            airflow_context=dict(airflow_context, templates_dict={"sql": rendered_sql}),
+        )
+        result.bytes_processed = runner.total_bytes_processed
+    except Exception as e:
+        logging.warning(f"Dry run of {dag_id}.{task.identifier} failed: {e}")
+        result.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+
+    return result
+
+
+def dry_run_transformations(
+    path_to_dags,
+    execution_date: datetime.datetime,
+    dag_run_conf: Dict[str, Any],
+    dag_ids: Optional[List[str]] = None,
+    workers=8,
+) -> List[DryRunResult]:
+    """
+    Render and dry run every native task of every enabled transformation concurrently.
+    Tasks are estimated independently, a task reading a table created by an upstream task
+    fails if that table does not exist yet
+    """
+    transformations = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database=impl.get_database()
+    )
+
+    results = []
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for details in transformations:
+            dag_id = "dop__{}".format(details["transformation"])
+            if dag_ids and dag_id not in dag_ids:
+                continue
+
+            if "error" in details:
+                results.append(
+                    DryRunResult(
+                        dag_id=dag_id,
+                        task_id="-",
+                        kind="-",
+                        error=str(details["error"]),
+                    )
+                )
+                continue
+
+            dag_config = details["dag_config"]
+            if not dag_config.enabled:
+                continue
+
+            for task in dag_config.tasks:
+                if task.kind.action not in schema.NATIVE_TASK_KIND:
+                    continue
+
+                futures.append(
+                    executor.submit(
+                        dry_run_task,
+                        dag_id=dag_id,
+                        path_to_transformation=details["path_to_transformation"],
+                        dag_config=dag_config,
+                        task=task,
+                        sql=details["sql"].get(task.identifier),
+                        execution_date=execution_date,
+                        dag_run_conf=dag_run_conf,
+                    )
+                )
+
+    return results + [future.result() for future in futures]
+
+
+def format_bytes(num_bytes) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num_bytes < 1024:
+            return f"{num_bytes:.2f} {unit}"
+        num_bytes /= 1024
+
+    return f"{num_bytes:.2f} TB"
+
+
+def format_table(rows: List[List[str]]) -> str:
+    """
+    Left align every column but the last one, which is right aligned
+    """
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            [cell.ljust(width) for cell, width in zip(row[:-1], widths)]
+            + [row[-1].rjust(widths[-1])]
+        )
+        for row in rows
+    )
+
+
+def format_report(results: List[DryRunResult]) -> str:
+    task_rows = [["DAG", "TASK", "KIND", "ESTIMATED"]]
+    dag_totals: Dict[str, int] = {}
+    errors = []
+    for result in results:
+        task_rows.append(
+            [
+                result.dag_id,
+                result.task_id,
+                result.kind,
+                "ERROR" if result.error else format_bytes(result.bytes_processed),
+            ]
+        )
+        dag_totals[result.dag_id] = (
+            dag_totals.get(result.dag_id, 0) + result.bytes_processed
+        )
+        if result.error:
+            errors.append(f"{result.dag_id}.{result.task_id}: {result.error}")
+
+    dag_rows = [["DAG", "ESTIMATED"]]
+    dag_rows += [[dag_id, format_bytes(total)] for dag_id, total in dag_totals.items()]
+    dag_rows.append(["TOTAL", format_bytes(sum(dag_totals.values()))])
+
+    report = format_table(task_rows) + "\n\n" + format_table(dag_rows)
+    if errors:
+        report += "\n\nErrors:\n" + "\n".join(errors)
+
+    return report
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(
+        description="Estimate the bytes processed by the native tasks of DOP DAGs"
+    )
+    parser.add_argument(
+        "--path_to_dags",
+        default=None,
+        type=str,
+        help="the orchestration folder, defaults to the one of the service project",
+    )
+    parser.add_argument(
+        "--dag_id",
+        action="append",
+        default=None,
+        help="a DAG to estimate, i.e. `dop__example_covid19`, can be repeated",
+    )
+    parser.add_argument(
+        "--execution_date",
+        default=datetime.date.today().isoformat(),
+        type=str,
+        help="the execution date used to render the SQL, formatted as YYYY-MM-DD",
+    )
+    parser.add_argument(
+        "--conf",
+        default="{}",
+        type=str,
+        help='the DAG run configuration as JSON, i.e. `{"full_refresh": true}`',
+    )
+    parser.add_argument(
+        "--workers", default=8, type=int, help="number of concurrent dry runs"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the results as JSON lines"
+    )
+
+    args = parser.parse_args()
+
+    results = dry_run_transformations(
+        path_to_dags=args.path_to_dags or env_config.orchestration_path,
+        execution_date=datetime.datetime.strptime(args.execution_date, "%Y-%m-%d"),
+        dag_run_conf=json.loads(args.conf),
+        dag_ids=args.dag_id,
+        workers=args.workers,
+    )
+
+    if args.json:
+        for result in results:
+            print(json.dumps(asdict(result)))
+    else:
+        print(format_report(results=results))
+
+    sys.exit(1 if any(result.error for result in results) else 0)
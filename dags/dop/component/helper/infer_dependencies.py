@@ -0,0 +1,93 @@
+import argparse
+import logging
+
+from typing import Any, Dict, List
+
+from dop.component.configuration.env import env_config
+from dop.component.transformation.common.parser import transformation_parser
+from dop.component.transformation.runner.bigquery import lineage
+from dop.component.transformation.runner.bigquery.adapter import impl
+
+EXTERNAL_TASK_SENSOR = "ExternalTaskSensor"
+
+
+def suggest_dependencies(transformations: List[Dict[str, Any]]) -> List[str]:
+    """
+    Dependencies inferred from the relations read by each task, for every transformation
+    which does not already infer them
+    """
+    lineage_index = lineage.LineageIndex(transformations=transformations)
+    suggestions = []
+
+    for transformation, dag_config in lineage_index.dag_configs.items():
+        dag_id = f"dop__{transformation}"
+        upstream_dag_ids = set()
+
+        for identifier, dependencies in lineage_index.inferred_dependencies(
+            transformation
+        ).items():
+            if not dag_config.infer_dependencies:
+                suggestions.append(
+                    f"{dag_id}.{identifier}: add dependencies {dependencies}"
+                )
+
+        for identifier, upstream_tasks in lineage_index.external_dependencies(
+            transformation
+        ).items():
+            for upstream in upstream_tasks:
+                upstream_dag_id = f"dop__{upstream.transformation}"
+                upstream_dag_ids.add(upstream_dag_id)
+                if not lineage_index.is_aligned(
+                    transformation, upstream.transformation
+                ):
+                    suggestions.append(
+                        f"{dag_id}.{identifier}: reads a relation materialized by "
+                        f"{upstream_dag_id}.{upstream.identifier}, which has another "
+                        f"schedule"
+                    )
+                elif not dag_config.infer_dependencies:
+                    suggestions.append(
+                        f"{dag_id}.{identifier}: wait for "
+                        f"{upstream_dag_id}.{upstream.identifier}"
+                    )
+
+        # Sensors declared by hand waiting for a DAG the transformation already waits for
+        for task in dag_config.tasks:
+            arguments = task.options.get("arguments") or {}
+            if (
+                task.kind.target.endswith(EXTERNAL_TASK_SENSOR)
+                and arguments.get("external_dag_id") in upstream_dag_ids
+                and lineage_index.is_aligned(
+                    transformation,
+                    arguments["external_dag_id"][len("dop__") :],
+                )
+            ):
+                suggestions.append(
+                    f"{dag_id}.{task.identifier}: can be replaced by "
+                    f"`infer_dependencies: true`"
+                )
+
+    return suggestions
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(
+        description="Suggest dependencies between DOP tasks from the relations they read"
+    )
+    parser.add_argument(
+        "--path_to_dags",
+        default=None,
+        type=str,
+        help="the orchestration folder, defaults to the one of the service project",
+    )
+
+    args = parser.parse_args()
+
+    for suggestion in suggest_dependencies(
+        transformations=transformation_parser.load_transformations(
+            path_to_dags=args.path_to_dags or env_config.orchestration_path,
+            database=impl.get_database(),
+        )
+    ):
+        print(suggestion)
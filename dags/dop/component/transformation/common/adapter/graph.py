@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Weight of a task without a known duration
+DEFAULT_TASK_DURATION = 1.0
+
+
+class CyclicDependencyError(ValueError):
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super(CyclicDependencyError, self).__init__(
+            "Tasks depend on each other: {}".format(" -> ".join(cycle))
+        )
+
+
+class TaskGraph:
+    """
+    Adjacency index of a graph of tasks, built once from the dependencies of each task.
+    Tasks are always returned in the order they were supplied in, so DAGs built from the
+    graph don't change between two parses
+    """
+
+    def __init__(self, dependencies: Dict[str, List[str]]):
+        """
+        :param dependencies: Identifiers of the tasks and, for each of them, the identifiers
+        of the tasks it depends on. Dependencies outside of the graph are reported by
+        `missing` and otherwise ignored
+        """
+        self.upstream: Dict[str, List[str]] = {}
+        self.downstream: Dict[str, List[str]] = {
+            identifier: [] for identifier in dependencies
+        }
+        self.missing: Dict[str, List[str]] = {}
+
+        for identifier, task_dependencies in dependencies.items():
+            self.upstream[identifier] = []
+            for dependency in task_dependencies:
+                if dependency not in dependencies:
+                    self.missing.setdefault(identifier, []).append(dependency)
+                elif dependency not in self.upstream[identifier]:
+                    self.upstream[identifier].append(dependency)
+                    self.downstream[dependency].append(identifier)
+
+    @classmethod
+    def from_tasks(cls, tasks) -> "TaskGraph":
+        return cls({task.identifier: task.dependencies for task in tasks})
+
+    def find_cycle(self) -> Optional[List[str]]:
+        """
+        :return: The identifiers of tasks depending on each other, starting and ending with
+        the same task, or None if the graph is acyclic
+        """
+        visited: Set[str] = set()
+
+        for root in self.upstream:
+            if root in visited:
+                continue
+
+            # Iterative depth first search, `path` holds the tasks being visited
+            path = [root]
+            on_path = {root}
+            iterators = [iter(self.downstream[root])]
+            visited.add(root)
+            while iterators:
+                identifier = next(iterators[-1], None)
+                if identifier is None:
+                    on_path.discard(path.pop())
+                    iterators.pop()
+                elif identifier in on_path:
+                    return path[path.index(identifier) :] + [identifier]
+                elif identifier not in visited:
+                    visited.add(identifier)
+                    path.append(identifier)
+                    on_path.add(identifier)
+                    iterators.append(iter(self.downstream[identifier]))
+
+        return None
+
+    def topological_levels(self) -> List[List[str]]:
+        """
+        Group tasks by the length of the longest chain of dependencies leading to them,
+        tasks of a level only depend on tasks of the previous levels
+
+        :raises CyclicDependencyError: if tasks depend on each other
+        """
+        remaining = {
+            identifier: len(dependencies)
+            for identifier, dependencies in self.upstream.items()
+        }
+        levels = []
+        level = [identifier for identifier, count in remaining.items() if count == 0]
+        while level:
+            levels.append(level)
+            for identifier in level:
+                del remaining[identifier]
+                for downstream_identifier in self.downstream[identifier]:
+                    remaining[downstream_identifier] -= 1
+
+            level = [
+                identifier for identifier, count in remaining.items() if count == 0
+            ]
+
+        if remaining:
+            raise CyclicDependencyError(cycle=self.find_cycle())
+
+        return levels
+
+    def topological_order(self) -> List[str]:
+        return [
+            identifier for level in self.topological_levels() for identifier in level
+        ]
+
+    def descendants(self, identifiers: Iterable[str]) -> Set[str]:
+        """
+        :return: Tasks depending directly or indirectly on any of `identifiers`
+        """
+        descendants = set()
+        stack = [d for identifier in identifiers for d in self.downstream[identifier]]
+        while stack:
+            identifier = stack.pop()
+            if identifier not in descendants:
+                descendants.add(identifier)
+                stack.extend(self.downstream[identifier])
+
+        return descendants
+
+    def remaining_durations(
+        self,
+        durations: Optional[Dict[str, float]] = None,
+        default_duration: float = DEFAULT_TASK_DURATION,
+    ) -> Dict[str, float]:
+        """
+        For each task, the duration of the longest chain of tasks starting with it. Running
+        the tasks with the longest remaining duration first shortens the total runtime when
+        there are more tasks ready to run than workers
+
+        :param durations: Known duration of each task, i.e. of its previous run
+        :param default_duration: Duration of a task without a known duration
+        """
+        durations = durations or {}
+        remaining = {}
+        for identifier in reversed(self.topological_order()):
+            remaining[identifier] = durations.get(identifier, default_duration) + max(
+                [remaining[d] for d in self.downstream[identifier]], default=0
+            )
+
+        return remaining
+
+    def critical_path(
+        self,
+        durations: Optional[Dict[str, float]] = None,
+        default_duration: float = DEFAULT_TASK_DURATION,
+    ) -> Tuple[List[str], float]:
+        """
+        The chain of tasks bounding the runtime of the graph, however many tasks can run
+        concurrently
+
+        :return: The tasks of the chain, in order, and its total duration
+        """
+        remaining = self.remaining_durations(
+            durations=durations, default_duration=default_duration
+        )
+        if not remaining:
+            return [], 0
+
+        # max() returns the first task in case of a tie, so the path is deterministic
+        roots = [
+            identifier for identifier in self.upstream if not self.upstream[identifier]
+        ]
+        path = [max(roots, key=lambda i: remaining[i])]
+        while self.downstream[path[-1]]:
+            path.append(max(self.downstream[path[-1]], key=lambda i: remaining[i]))
+
+        return path, remaining[path[0]]
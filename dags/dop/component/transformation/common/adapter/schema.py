@@ -8,6 +8,11 @@ from decimal import Decimal
 
 from marshmallow import validate, post_load, Schema, fields
 
+from dop.component.transformation.common.adapter.graph import (
+    CyclicDependencyError,
+    TaskGraph,
+)
+
 TASK_KIND_MATERI = "materialization"
 TASK_KIND_ASSERT = "assertion"
 TASK_KIND_INVOKE = "invocation"
@@ -17,6 +22,29 @@ TASK_KIND_DBT = "dbt"
 NATIVE_TASK_KIND = [TASK_KIND_MATERI, TASK_KIND_ASSERT, TASK_KIND_INVOKE]
 CUSTOM_TASK_KIND = [TASK_KIND_DBT]
 
+GROUPED_EXECUTION_TASK_ID = "grouped_execution"
+
+INCREMENTAL_STRATEGY_MERGE = "merge"
+INCREMENTAL_STRATEGY_INSERT_OVERWRITE = "insert_overwrite"
+INCREMENTAL_STRATEGIES = [
+    INCREMENTAL_STRATEGY_MERGE,
+    INCREMENTAL_STRATEGY_INSERT_OVERWRITE,
+]
+
+# Task options of assertions, see `QueryRunner.assertion`
+ASSERTION_OPTIONS = ["max_failures", "sample_size", "page_size", "aggregate"]
+
+ASSERTION_SENSOR_TARGET = "assertion_sensor"
+# Task options of assertion sensors and their default value
+ASSERTION_SENSOR_OPTIONS = {
+    "mode": "reschedule",
+    "poke_interval": 60,
+    "max_poke_interval": 3600,
+    "backoff": 2,
+    "timeout": 60 * 60 * 24,
+    "max_bytes_per_poke": None,
+}
+
 
 def dbt_argument_validation_mapper(option, value):
     allowed_options = [
@@ -28,6 +56,10 @@ def dbt_argument_validation_mapper(option, value):
         "--full-refresh",
         "--bucket",
         "--bucket-path",
+        "-s",
+        "--select",
+        "--defer",
+        "--state",
     ]
     if option not in allowed_options:
         raise DbtTaskException(
@@ -62,6 +94,38 @@ def dbt_validation_func(task):
                 option=argument.get("option"), value=argument.get("value")
             )
 
+        # `dbt run` only supports `--select` from DBT 0.21
+        select_options = [
+            argument.get("option")
+            for argument in arguments
+            if argument.get("option") in ["-s", "--select"]
+        ]
+        if select_options and Decimal(f"{v_minor}.{v_patch}") < Decimal("21.0"):
+            raise DbtTaskException(
+                f"DBT version must be >= 0.21.0 to use {select_options}, {dbt_version} is supplied"
+            )
+
+    for option in ["partial_parse", "only_modified"]:
+        if not isinstance(task.options.get(option, False), bool):
+            raise DbtTaskException(f"DBT option `{option}` must be a boolean")
+
+    # models are selected with the state of the previous successful run
+    if task.options.get("only_modified"):
+        if task.kind.target not in ["run", "test"]:
+            raise DbtTaskException(
+                f"DBT option `only_modified` is only supported by `run` and `test`, `{task.kind.target}` supplied"
+            )
+
+        selection_options = [
+            argument.get("option")
+            for argument in arguments or []
+            if argument.get("option") in ["-m", "-s", "--select", "--defer", "--state"]
+        ]
+        if selection_options:
+            raise DbtTaskException(
+                f"DBT option `only_modified` can't be used with {selection_options}"
+            )
+
 
 def materialization_validation_func(task):
     allowed_options = ["table", "view", "udf", "stored_procedure", "schema"]
@@ -70,14 +134,78 @@ def materialization_validation_func(task):
             f"Materialization task.kind.target must be one of {allowed_options}, `{task.kind.target}`supplied"
         )
 
+    incremental_strategy = task.options.get("incremental_strategy")
+    if incremental_strategy is None:
+        return
+
+    if task.kind.target != "table":
+        raise MaterializationTaskException(
+            f"`incremental_strategy` is only supported by table materializations, "
+            f"`{task.kind.target}` supplied"
+        )
+
+    if incremental_strategy not in INCREMENTAL_STRATEGIES:
+        raise MaterializationTaskException(
+            f"`incremental_strategy` must be one of {INCREMENTAL_STRATEGIES}, "
+            f"`{incremental_strategy}` supplied"
+        )
+
+    if (
+        incremental_strategy == INCREMENTAL_STRATEGY_INSERT_OVERWRITE
+        and task.partitioning is None
+    ):
+        raise MaterializationTaskException(
+            f"`{INCREMENTAL_STRATEGY_INSERT_OVERWRITE}` requires `partitioning` to be set "
+            f"for task `{task.identifier}`"
+        )
+
 
 def assertion_validation_func(task):
-    allowed_options = ["assertion", "assertion_sensor"]
+    allowed_options = ["assertion", ASSERTION_SENSOR_TARGET]
     if task.kind.target not in allowed_options:
         raise AssertionTaskException(
             f"Assertion task.kind.target must be one of {allowed_options}, {task.kind.target} supplied"
         )
 
+    for option in ["max_failures", "sample_size", "page_size"]:
+        value = task.options.get(option)
+        if value is not None and (type(value) != int or value < 1):
+            raise AssertionTaskException(
+                f"Assertion option `{option}` must be a positive integer, `{value}` supplied"
+            )
+
+    if type(task.options.get("aggregate", False)) != bool:
+        raise AssertionTaskException(
+            "Assertion option `aggregate` must be set to either `true` or `false`"
+        )
+
+    if task.kind.target != ASSERTION_SENSOR_TARGET:
+        return
+
+    if task.options.get("mode", "reschedule") not in ["poke", "reschedule"]:
+        raise AssertionTaskException(
+            f"Assertion sensor option `mode` must be `poke` or `reschedule`, "
+            f"`{task.options.get('mode')}` supplied"
+        )
+
+    for option in [
+        "poke_interval",
+        "max_poke_interval",
+        "timeout",
+        "max_bytes_per_poke",
+    ]:
+        value = task.options.get(option)
+        if value is not None and (type(value) != int or value < 1):
+            raise AssertionTaskException(
+                f"Assertion sensor option `{option}` must be a positive integer, `{value}` supplied"
+            )
+
+    backoff = task.options.get("backoff")
+    if backoff is not None and (type(backoff) not in (int, float) or backoff < 1):
+        raise AssertionTaskException(
+            f"Assertion sensor option `backoff` must be a number >= 1, `{backoff}` supplied"
+        )
+
 
 def invocation_validation_func(task):
     allowed_options = ["stored_procedure"]
@@ -87,6 +215,70 @@ def invocation_validation_func(task):
         )
 
 
+def is_groupable(task) -> bool:
+    """
+    Native tasks can be run by grouped execution, except sensors which wait rather than run
+    """
+    return (
+        task.kind.action in NATIVE_TASK_KIND
+        and task.kind.target != ASSERTION_SENSOR_TARGET
+    )
+
+
+def grouped_execution_validation_func(dag_config):
+    """
+    Grouped tasks run inside a single Airflow task, they must be native tasks and the group
+    must not depend on a task outside of the group which itself depends on the group
+    """
+    tasks = {task.identifier: task for task in dag_config.tasks}
+    grouped_execution = dag_config.grouped_execution
+
+    if GROUPED_EXECUTION_TASK_ID in tasks:
+        raise GroupedExecutionException(
+            f"`{GROUPED_EXECUTION_TASK_ID}` is reserved when grouped execution is enabled"
+        )
+
+    for identifier in grouped_execution.tasks:
+        if identifier not in tasks:
+            raise GroupedExecutionException(
+                f"Grouped task `{identifier}` is not defined in the configuration"
+            )
+        if not is_groupable(tasks[identifier]):
+            raise GroupedExecutionException(
+                f"Only tasks of kind {NATIVE_TASK_KIND} other than sensors can be grouped, "
+                f"`{identifier}` is of kind `{tasks[identifier].kind.__dict__}`"
+            )
+
+    grouped = set(grouped_execution.tasks)
+    task_graph = TaskGraph.from_tasks(dag_config.tasks)
+
+    # A task outside of the group, depending on the group, which the group depends on
+    # means the group would have to run both before and after that task
+    outside = [
+        identifier
+        for identifier in task_graph.descendants(grouped)
+        if identifier not in grouped
+    ]
+    for identifier in outside:
+        for downstream_identifier in task_graph.downstream[identifier]:
+            if downstream_identifier in grouped:
+                raise GroupedExecutionException(
+                    f"Grouped task `{downstream_identifier}` depends on `{identifier}` "
+                    f"which depends on another grouped task, add it to the group or "
+                    f"remove it from the dependencies"
+                )
+
+
+def dependency_validation_func(dag_config):
+    """
+    Tasks must not depend on each other, directly or through other tasks
+    """
+    try:
+        TaskGraph.from_tasks(dag_config.tasks).topological_levels()
+    except CyclicDependencyError as e:
+        raise DependencyException(str(e))
+
+
 def data_validation_mapper(task):
     if task.kind.action == TASK_KIND_DBT:
         return dbt_validation_func
@@ -120,6 +312,14 @@ class InvocationTaskException(InvalidDagConfig):
     pass
 
 
+class GroupedExecutionException(InvalidDagConfig):
+    pass
+
+
+class DependencyException(InvalidDagConfig):
+    pass
+
+
 class IsValidCron(validate.Validator):
     default_message = "Not a valid Cron Expression"
 
@@ -189,6 +389,17 @@ class TaskSchema(Schema):
     options = fields.Dict(required=False, missing={})
 
 
+@dataclass
+class GroupedExecution:
+    max_workers: int
+    tasks: List[str]
+
+
+class GroupedExecutionSchema(Schema):
+    max_workers = fields.Int(validate=validate.Range(min=1), missing=4)
+    tasks = fields.List(cls_or_instance=fields.Str(), missing=None)
+
+
 @dataclass
 class DagConfig:
     enabled: bool
@@ -198,6 +409,8 @@ class DagConfig:
     database: str
     schema: str
     tasks: List[Task]
+    grouped_execution: Optional[GroupedExecution] = None
+    infer_dependencies: bool = False
 
 
 class DagConfigSchema(Schema):
@@ -208,6 +421,10 @@ class DagConfigSchema(Schema):
     database = fields.Str(required=True)
     schema = fields.Str(required=True)
     tasks = fields.List(cls_or_instance=fields.Nested(TaskSchema), required=True)
+    grouped_execution = fields.Nested(
+        GroupedExecutionSchema, required=False, missing=None
+    )
+    infer_dependencies = fields.Bool(required=False, missing=False)
 
     @post_load
     def make_dag_config(self, data, **kwargs):
@@ -239,7 +456,24 @@ class DagConfigSchema(Schema):
             tasks.append(task_entity)
 
         data_with_objects["tasks"] = tasks
-        return DagConfig(**data_with_objects)
+
+        grouped_execution = data_with_objects.get("grouped_execution")
+        if grouped_execution is not None:
+            # All native tasks are grouped unless a subset is selected
+            if grouped_execution["tasks"] is None:
+                grouped_execution["tasks"] = [
+                    task.identifier for task in tasks if is_groupable(task)
+                ]
+            data_with_objects["grouped_execution"] = GroupedExecution(
+                **grouped_execution
+            )
+
+        dag_config = DagConfig(**data_with_objects)
+        dependency_validation_func(dag_config)
+        if dag_config.grouped_execution is not None:
+            grouped_execution_validation_func(dag_config)
+
+        return dag_config
 
 
 def load_dag_schema(payload) -> DagConfig:
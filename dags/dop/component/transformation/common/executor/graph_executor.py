@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+_current_task = threading.local()
+
+
+class TaskExecutionError(RuntimeError):
+    def __init__(self, failures: Dict[str, BaseException], not_run: List[str]):
+        self.failures = failures
+        self.not_run = not_run
+        super(TaskExecutionError, self).__init__(
+            f"Task(s) {sorted(failures)} failed, task(s) {not_run} were not run"
+        )
+
+
+class TaskLogFilter(logging.Filter):
+    """
+    Prefix log records with the identifier of the task being run by the current thread
+    """
+
+    def filter(self, record):
+        task_id = getattr(_current_task, "task_id", None)
+        if task_id and not getattr(record, "dop_task_id", None):
+            record.dop_task_id = task_id
+            record.msg = f"[{task_id}] {record.msg}"
+
+        return True
+
+
+class GraphExecutor:
+    """
+    Run a graph of tasks with a thread pool. Tasks whose dependencies have completed are
+    started as soon as a worker is free, highest priority first, and no new task is started
+    once one has failed (tasks already running are waited for, as the jobs they submitted
+    can't be recalled)
+    """
+
+    def __init__(
+        self,
+        dependencies: Dict[str, List[str]],
+        max_workers: int = 4,
+        priorities: Optional[Dict[str, float]] = None,
+    ):
+        """
+        :param dependencies: Identifiers of the tasks to run and, for each of them, the
+        identifiers of the tasks it depends on. Dependencies outside of the graph are ignored
+        :param max_workers: Maximum number of tasks run concurrently
+        :param priorities: Priority of each task, i.e. the duration of the longest chain of
+        tasks starting with it. Tasks ready at the same time are started in their order in
+        `dependencies` by default
+        """
+        self._dependencies = {
+            identifier: [d for d in task_dependencies if d in dependencies]
+            for identifier, task_dependencies in dependencies.items()
+        }
+        self._max_workers = max_workers
+        self._priorities = priorities or {}
+
+    def run(self, func: Callable[[str], None]) -> Dict[str, float]:
+        """
+        :param func: Called with the identifier of each task, from a worker thread
+        :return: The duration of each task in seconds
+        :raises TaskExecutionError: if any task failed
+        """
+        remaining_dependencies = {
+            identifier: set(task_dependencies)
+            for identifier, task_dependencies in self._dependencies.items()
+        }
+        order = {
+            identifier: index for index, identifier in enumerate(self._dependencies)
+        }
+        failures = {}
+        running = {}
+        durations = {}
+
+        log_filter = TaskLogFilter()
+        handlers = list(logging.getLogger().handlers)
+        for handler in handlers:
+            handler.addFilter(log_filter)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                while True:
+                    if not failures:
+                        ready = sorted(
+                            [
+                                identifier
+                                for identifier, task_dependencies in remaining_dependencies.items()
+                                if not task_dependencies
+                            ],
+                            key=lambda i: (-self._priorities.get(i, 0), order[i]),
+                        )
+                        # Tasks are only submitted to free workers, so a task becoming
+                        # ready later can still run before lower priority ones
+                        for identifier in ready[: self._max_workers - len(running)]:
+                            del remaining_dependencies[identifier]
+                            running[
+                                executor.submit(self._run_task, func, identifier)
+                            ] = identifier
+
+                    if not running:
+                        break
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        identifier = running.pop(future)
+                        if future.exception() is not None:
+                            failures[identifier] = future.exception()
+                            continue
+
+                        durations[identifier] = future.result()
+
+                        for task_dependencies in remaining_dependencies.values():
+                            task_dependencies.discard(identifier)
+        finally:
+            for handler in handlers:
+                handler.removeFilter(log_filter)
+
+        if failures or remaining_dependencies:
+            raise TaskExecutionError(
+                failures=failures, not_run=list(remaining_dependencies)
+            )
+
+        return durations
+
+    @staticmethod
+    def _run_task(func: Callable[[str], None], identifier: str) -> float:
+        _current_task.task_id = identifier
+        started_at = time.monotonic()
+        logging.info(f"### Starting task {identifier}")
+        try:
+            func(identifier)
+        except BaseException:
+            logging.exception(
+                f"### Task {identifier} failed after {time.monotonic() - started_at:.1f}s"
+            )
+            raise
+        else:
+            duration = time.monotonic() - started_at
+            logging.info(f"### Task {identifier} completed in {duration:.1f}s")
+            return duration
+        finally:
+            _current_task.task_id = None
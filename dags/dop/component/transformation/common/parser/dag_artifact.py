@@ -0,0 +1,140 @@
+import logging
+import os
+import pickle
+import time
+
+from typing import Any, Dict, List, Optional
+
+from dop.component.transformation.common.parser import transformation_parser
+from dop.component.util import files
+
+# Bump this whenever the shape of the artifact changes
+ARTIFACT_VERSION = 1
+# Protocol 4 can still be read by the Python 3.6 interpreter of Composer workers,
+# whichever version of Python the artifact is built with
+ARTIFACT_PICKLE_PROTOCOL = 4
+
+COMMIT_HASH_FILE = ".commit-hash"
+ARTIFACT_FILE = ".dop-dag-artifact.pickle"
+
+
+def read_commit_hash(service_project_path) -> Optional[str]:
+    """
+    The commit hash written in the service project by the build, None if there is none
+    (i.e. when running locally)
+    """
+    commit_hash_file = os.path.sep.join([service_project_path, COMMIT_HASH_FILE])
+    if not os.path.isfile(commit_hash_file):
+        return None
+
+    with open(commit_hash_file) as fp:
+        return fp.read().strip() or None
+
+
+def _relative_paths(details: Dict[str, Any], path_to_dags) -> Dict[str, Any]:
+    return {
+        **details,
+        "path_to_transformation": os.path.relpath(
+            details["path_to_transformation"], path_to_dags
+        ),
+        "config_file": os.path.relpath(details["config_file"], path_to_dags),
+    }
+
+
+def _absolute_paths(details: Dict[str, Any], path_to_dags) -> Dict[str, Any]:
+    return {
+        **details,
+        "path_to_transformation": os.path.join(
+            path_to_dags, details["path_to_transformation"]
+        ),
+        "config_file": os.path.join(path_to_dags, details["config_file"]),
+    }
+
+
+def build_artifact(
+    path_to_dags, database, commit_hash, artifact_path, config_extension="yaml"
+) -> List[Dict[str, Any]]:
+    """
+    Parse and validate every transformation under `path_to_dags` and persist the result,
+    so DAG file processing runs of the same deployment don't have to do it again.
+    Invalid transformations are stored with their error, the same way they are returned
+    by live parsing
+
+    :param path_to_dags: The orchestration folder
+    :param database: Default database of the storage engine
+    :param commit_hash: Commit hash of the deployment the artifact is built for
+    :param artifact_path: Where the artifact is written
+    :return: The parsed transformations
+    """
+    transformations = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database=database, config_extension=config_extension
+    )
+
+    payload = {
+        "version": ARTIFACT_VERSION,
+        "commit_hash": commit_hash,
+        "database": database,
+        "parser_fingerprint": transformation_parser.parser_fingerprint(),
+        "config_extension": config_extension,
+        # The orchestration folder is not at the same path where the artifact is built
+        # and where it is loaded
+        "transformations": [
+            _relative_paths(details=details, path_to_dags=path_to_dags)
+            for details in transformations
+        ],
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(artifact_path)), exist_ok=True)
+    with files.atomic_write(artifact_path) as fp:
+        pickle.dump(payload, fp, protocol=ARTIFACT_PICKLE_PROTOCOL)
+
+    return transformations
+
+
+def load_artifact(
+    artifact_path, path_to_dags, database, commit_hash, config_extension="yaml"
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Load the transformations persisted by `build_artifact`
+
+    :return: The parsed transformations, in the same shape as
+    `transformation_parser.load_transformations`, or None if there is no artifact or it is
+    stale, i.e. built for another commit, database or version of the parser
+    """
+    if not commit_hash or not os.path.isfile(artifact_path):
+        return None
+
+    started_at = time.monotonic()
+    try:
+        with open(artifact_path, "rb") as fp:
+            payload = pickle.load(fp)
+    except Exception as e:
+        logging.warning(f"Ignoring DAG artifact `{artifact_path}`: {e}")
+        return None
+
+    expected = {
+        "version": ARTIFACT_VERSION,
+        "commit_hash": commit_hash,
+        "database": database,
+        "parser_fingerprint": transformation_parser.parser_fingerprint(),
+        "config_extension": config_extension,
+    }
+    stale = [
+        key
+        for key, value in expected.items()
+        if not isinstance(payload, dict) or payload.get(key) != value
+    ]
+    if stale:
+        logging.info(f"### DAG artifact `{artifact_path}` is stale: {stale} differ")
+        return None
+
+    transformations = [
+        _absolute_paths(details=details, path_to_dags=path_to_dags)
+        for details in payload["transformations"]
+    ]
+    logging.info(
+        f"### Loaded {len(transformations)} transformation(s) from the DAG artifact in "
+        f"{time.monotonic() - started_at:.2f}s"
+    )
+
+    return transformations
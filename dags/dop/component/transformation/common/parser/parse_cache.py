@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import pickle
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from dop.component.util import files
+
+# Bump this whenever the shape of the cached values changes
+CACHE_VERSION = 1
+
+
+def stat_files(files: List[str]) -> Tuple:
+    """
+    Cheap fingerprint of a list of files based on their path, size and mtime
+
+    :param files: Absolute paths of the files
+    :return: A hashable fingerprint
+    """
+    stats = []
+    for file in sorted(files):
+        file_stat = os.stat(file)
+        stats.append((file, file_stat.st_size, file_stat.st_mtime_ns))
+
+    return tuple(stats)
+
+
+def hash_files(files: List[str]) -> str:
+    """
+    Content fingerprint of a list of files, used when the cheap fingerprint has changed
+
+    :param files: Absolute paths of the files
+    :return: A sha256 hex digest of the file names and contents
+    """
+    digest = hashlib.sha256()
+    for file in sorted(files):
+        digest.update(file.encode("utf-8"))
+        with open(file, "rb") as fp:
+            digest.update(hashlib.sha256(fp.read()).digest())
+
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    A persistent cache of parsed transformations.
+
+    Entries are keyed by a path and validated against the files they were built from,
+    first by path + size + mtime and, when those differ, by content hash. An entry built
+    with a different `salt` (i.e. a different default database or parser version) is
+    never returned.
+    """
+
+    def __init__(self, cache_path: str):
+        self._cache_path = cache_path
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.isfile(self._cache_path):
+            return {}
+
+        # The cache is unpickled, it is only trusted if no other user can have written it
+        cache_dir = os.path.dirname(os.path.abspath(self._cache_path))
+        if not files.is_private(cache_dir) or not files.is_private(self._cache_path):
+            logging.warning(
+                f"Ignoring parse cache `{self._cache_path}`, it is writable by other users"
+            )
+            return {}
+
+        try:
+            with open(self._cache_path, "rb") as fp:
+                payload = pickle.load(fp)
+        except Exception as e:
+            # A corrupted or incompatible cache is simply rebuilt
+            logging.warning(f"Ignoring parse cache `{self._cache_path}`: {e}")
+            return {}
+
+        if not isinstance(payload, dict) or payload.get("version") != CACHE_VERSION:
+            return {}
+
+        return payload["entries"]
+
+    def get(self, key: str, files: List[str], salt: str) -> Optional[Any]:
+        """
+        Return the cached value for `key` if none of `files` has changed since it was stored
+
+        :param key: Cache key, usually the path of the parsed directory
+        :param files: Files the cached value was built from
+        :param salt: Any other input the cached value depends on
+        :return: The cached value or None
+        """
+        stats = stat_files(files)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry["salt"] == salt:
+            if entry["stats"] == stats:
+                self.hits += 1
+                return entry["value"]
+
+            digest = hash_files(files)
+            if entry["digest"] == digest:
+                # Files were touched but not modified, refresh the cheap fingerprint
+                entry["stats"] = stats
+                self._dirty = True
+                self.hits += 1
+                return entry["value"]
+        else:
+            digest = hash_files(files)
+
+        # Fingerprints are taken before the caller parses the files, so a file modified
+        # in between is detected again on the next lookup
+        self._pending[key] = {"stats": stats, "digest": digest}
+        self.misses += 1
+        return None
+
+    def set(self, key: str, files: List[str], salt: str, value: Any):
+        """
+        Store a value for `key`, `files` and `salt` must be the same as the ones used for `get`
+        """
+        fingerprint = self._pending.pop(key, None)
+        if fingerprint is None:
+            fingerprint = {"stats": stat_files(files), "digest": hash_files(files)}
+
+        self._entries[key] = {
+            "salt": salt,
+            "stats": fingerprint["stats"],
+            "digest": fingerprint["digest"],
+            "value": value,
+        }
+        self._dirty = True
+
+    def discard(self, key: str):
+        self._pending.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """
+        Persist the cache atomically, nothing is written if the cache has not changed
+        """
+        if not self._dirty:
+            return
+
+        files.private_directory(os.path.dirname(os.path.abspath(self._cache_path)))
+        with files.atomic_write(self._cache_path) as fp:
+            pickle.dump(
+                {"version": CACHE_VERSION, "entries": self._entries},
+                fp,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+
+        self._dirty = False
@@ -0,0 +1,60 @@
+import re
+
+from typing import List, Tuple
+
+# Jinja expressions are replaced by a marker so that relations built from variables,
+# i.e. `{{ task['schema'] }}.my_table`, are not mistaken for another relation
+JINJA_MARKER = "\x00"
+JINJA_STATEMENT_PATTERN = re.compile(r"{#.*?#}|{%.*?%}", re.DOTALL)
+JINJA_EXPRESSION_PATTERN = re.compile(r"{{.*?}}", re.DOTALL)
+COMMENT_OR_STRING_PATTERN = re.compile(
+    r"--[^\n]*|#[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"", re.DOTALL
+)
+
+SEGMENT = r"(?:`[^`]*`|[A-Za-z_\x00][\w\-\x00]*)"
+SEGMENT_PARTS_PATTERN = re.compile(r"`([^`]*)`|([^\s.`]+)")
+# A relation read by a query, the path is followed by `(` when it is a function
+REFERENCE_PATTERN = re.compile(
+    rf"\b(?:FROM|JOIN|USING)\s+({SEGMENT}(?:\s*\.\s*{SEGMENT})*)(\s*\()?",
+    re.IGNORECASE,
+)
+
+
+def strip_sql(sql: str) -> str:
+    """
+    Remove Jinja tags, comments and string literals, which may contain anything that looks
+    like a relation
+    """
+    sql = JINJA_STATEMENT_PATTERN.sub(" ", sql)
+    sql = JINJA_EXPRESSION_PATTERN.sub(JINJA_MARKER, sql)
+
+    return COMMENT_OR_STRING_PATTERN.sub(" ", sql)
+
+
+def extract_relations(sql: str, default_database: str) -> List[Tuple[str, str, str]]:
+    """
+    Fully qualified relations read by a query, before it is rendered. Relations qualified
+    with a dataset only are read from `default_database`, unqualified names (i.e. CTEs) and
+    relations whose name depends on a Jinja expression are ignored
+
+    :return: Sorted and unique (database, schema, identifier) tuples
+    """
+    relations = set()
+    for match in REFERENCE_PATTERN.finditer(strip_sql(sql)):
+        if match.group(2):
+            continue
+
+        parts = []
+        for quoted, unquoted in SEGMENT_PARTS_PATTERN.findall(match.group(1)):
+            # i.e. `project.dataset.table`
+            parts.extend(quoted.split(".") if quoted else [unquoted])
+
+        if any(not part or JINJA_MARKER in part for part in parts):
+            continue
+
+        if len(parts) == 2:
+            relations.add((default_database, parts[0], parts[1]))
+        elif len(parts) == 3:
+            relations.add((parts[0], parts[1], parts[2]))
+
+    return sorted(relations)
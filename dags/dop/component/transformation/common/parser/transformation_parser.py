@@ -0,0 +1,266 @@
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import Dict, Any, List, Optional
+
+from dop.component.transformation.common.adapter import graph, schema
+from dop.component.transformation.common.parser import sql_reference
+from dop.component.transformation.common.parser.parse_cache import ParseCache
+from dop.component.transformation.common.parser.yaml_parser import yaml_to_dict
+
+SQL_PATH_TEMPLATE = "{path}/sql/{task_name}.sql"
+SQL_BASE_TEMPLATE = "{% from 'global.sql' import is_incremental with context %}"
+
+
+def parser_fingerprint() -> str:
+    """
+    Fingerprint of the code producing parsed transformations, cached entries built by
+    a different version of the parser or the schema are not reused
+    """
+    digest = hashlib.sha256()
+    for module_path in [
+        schema.__file__,
+        graph.__file__,
+        sql_reference.__file__,
+        __file__,
+    ]:
+        with open(module_path, "rb") as fp:
+            digest.update(fp.read())
+
+    return digest.hexdigest()
+
+
+def load_sql_from_file(path, task_name):
+    with open(SQL_PATH_TEMPLATE.format(path=path, task_name=task_name)) as fp:
+        return SQL_BASE_TEMPLATE + "\n\n" + fp.read()
+
+
+def task_requires_sql(task: schema.Task) -> bool:
+    if task.kind.action not in schema.NATIVE_TASK_KIND:
+        return False
+
+    return (
+        task.kind.action == schema.TASK_KIND_MATERI and task.kind.target not in "schema"
+    ) or task.kind.action != schema.TASK_KIND_MATERI
+
+
+def load_sql_for_tasks(
+    path_to_transformation, dag_config: schema.DagConfig
+) -> Dict[str, str]:
+    return {
+        task.identifier: load_sql_from_file(
+            path=path_to_transformation, task_name=task.identifier
+        )
+        for task in dag_config.tasks
+        if task_requires_sql(task=task)
+    }
+
+
+def list_source_files(path_to_transformation, config_file) -> List[str]:
+    """
+    All files a parsed transformation depends on, the config file and the SQL files
+    """
+    sql_files = glob.glob(
+        SQL_PATH_TEMPLATE.format(path=path_to_transformation, task_name="*")
+    )
+    return [config_file] + sorted(sql_files)
+
+
+def discover_transformations(
+    path_to_dags, config_extension="yaml"
+) -> List[Dict[str, Any]]:
+    details = []
+    logging.debug("### Path to DAGs: {}".format(path_to_dags))
+    # sorted so that DAGs are always built in the same order
+    directories = sorted(d for d in os.listdir(path_to_dags) if "." not in d)
+    logging.debug("### Scanning directories: {}".format(directories))
+
+    for t in directories:
+        t_path = os.path.join(path_to_dags, t)
+        config_file = os.path.join(t_path, "config." + config_extension)
+        logging.debug(f"### Unverified config file: {config_file}")
+        if not os.path.exists(config_file):
+            logging.debug("### Ignoring {}".format(config_file))
+            continue
+        details.append(
+            {
+                "transformation": t,
+                "path_to_transformation": t_path,
+                "config_file": config_file,
+            }
+        )
+
+    return details
+
+
+def parse_transformation(
+    path_to_transformation, config_file, database
+) -> Dict[str, Any]:
+    """
+    Read and validate a transformation config and load the SQL of its tasks
+
+    :param path_to_transformation: Directory of the transformation
+    :param config_file: Path to the config file of the transformation
+    :param database: Default database of the storage engine
+    :return: The validated DagConfig, the SQL of each task that requires one and the
+    relations read by each of these tasks
+    """
+    with open(config_file) as config_fp:
+        config = yaml_to_dict(config_fp.read())
+
+    # default database should not be set manually in config
+    # but instead passed in based on implementation of each storage engine
+    config["database"] = database
+    dag_config = schema.load_dag_schema(payload=config)
+
+    # SQL files are not required for disabled DAGs
+    sql = (
+        load_sql_for_tasks(
+            path_to_transformation=path_to_transformation, dag_config=dag_config
+        )
+        if dag_config.enabled
+        else {}
+    )
+
+    references = {
+        task.identifier: sql_reference.extract_relations(
+            sql=sql[task.identifier], default_database=task.database
+        )
+        for task in dag_config.tasks
+        if task.identifier in sql
+    }
+
+    return {"dag_config": dag_config, "sql": sql, "references": references}
+
+
+def _parse_transformation_or_error(details: Dict[str, Any], database) -> Dict[str, Any]:
+    try:
+        return parse_transformation(
+            path_to_transformation=details["path_to_transformation"],
+            config_file=details["config_file"],
+            database=database,
+        )
+    except schema.InvalidDagConfig as e:
+        return {"error": e}
+
+
+def _parse_in_worker(args) -> Dict[str, Any]:
+    details, database = args
+    return _parse_transformation_or_error(details=details, database=database)
+
+
+def parse_transformations(
+    transformations: List[Dict[str, Any]], database, workers=0
+) -> List[Dict[str, Any]]:
+    """
+    Parse transformations serially or, when `workers` > 1, across a process pool.
+    Results are returned in the same order as `transformations` either way
+
+    :param transformations: Transformation details as returned by `discover_transformations`
+    :param database: Default database of the storage engine
+    :param workers: Number of worker processes, 0 or 1 to parse serially
+    :return: The parsed transformation or an `error` for each transformation
+    """
+    if workers > 1 and len(transformations) > 1:
+        if multiprocessing.current_process().daemon:
+            # i.e. Airflow DAG file processors, daemonic processes can't have children
+            logging.warning(
+                "Parallel parsing is not available in a daemonic process, parsing serially"
+            )
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(
+                    executor.map(
+                        _parse_in_worker,
+                        [(details, database) for details in transformations],
+                    )
+                )
+
+    return [
+        _parse_transformation_or_error(details=details, database=database)
+        for details in transformations
+    ]
+
+
+def load_transformations(
+    path_to_dags,
+    database,
+    parse_cache: Optional[ParseCache] = None,
+    config_extension="yaml",
+    workers=0,
+) -> List[Dict[str, Any]]:
+    """
+    Discover and parse every transformation under `path_to_dags`.
+
+    Each entry holds `transformation`, `path_to_transformation` and `config_file` and either
+    `dag_config`, `sql` and `references` or, when the config is invalid, `error`. When a
+    parse cache is supplied only transformations with modified files are parsed again, and
+    these are parsed across `workers` processes when `workers` > 1.
+    """
+    started_at = time.monotonic()
+    salt = f"{database}:{parser_fingerprint()}" if parse_cache else None
+    transformations = discover_transformations(
+        path_to_dags=path_to_dags, config_extension=config_extension
+    )
+
+    parsed_transformations: List[Optional[Dict[str, Any]]] = [None] * len(
+        transformations
+    )
+    source_files: Dict[int, List[str]] = {}
+    if parse_cache:
+        for index, details in enumerate(transformations):
+            source_files[index] = list_source_files(
+                path_to_transformation=details["path_to_transformation"],
+                config_file=details["config_file"],
+            )
+            parsed_transformations[index] = parse_cache.get(
+                key=details["path_to_transformation"],
+                files=source_files[index],
+                salt=salt,
+            )
+
+    indexes_to_parse = [
+        index for index, parsed in enumerate(parsed_transformations) if parsed is None
+    ]
+    for index, parsed in zip(
+        indexes_to_parse,
+        parse_transformations(
+            transformations=[transformations[index] for index in indexes_to_parse],
+            database=database,
+            workers=workers,
+        ),
+    ):
+        parsed_transformations[index] = parsed
+        if not parse_cache:
+            continue
+
+        key = transformations[index]["path_to_transformation"]
+        if "error" in parsed:
+            parse_cache.discard(key=key)
+        else:
+            parse_cache.set(key=key, files=source_files[index], salt=salt, value=parsed)
+
+    if parse_cache:
+        logging.info(
+            f"### Parse cache: {parse_cache.hits} hit(s), {parse_cache.misses} miss(es)"
+        )
+        try:
+            parse_cache.save()
+        except OSError as e:
+            logging.warning(f"Unable to persist the parse cache: {e}")
+
+    logging.info(
+        f"### Parsed {len(transformations)} transformation(s) in "
+        f"{time.monotonic() - started_at:.2f}s"
+    )
+
+    return [
+        {**details, **parsed}
+        for details, parsed in zip(transformations, parsed_transformations)
+    ]
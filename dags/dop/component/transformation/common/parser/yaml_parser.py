@@ -17,7 +17,8 @@ def dict_to_yaml(dct: dict) -> str:
     :param dct: Dictionary to be converted
     :return: serialised dictionary in YAML format
     """
-    yml: dict = yaml.load(json.dumps(dct), Loader=Loader)
+    # Values JSON can't serialise, i.e. dates returned by a query, are converted to strings
+    yml: dict = yaml.load(json.dumps(dct, default=str), Loader=Loader)
     return yaml.dump(yml)
 
 
@@ -1,8 +1,20 @@
 import os
 import logging
-
-from jinja2 import FileSystemLoader, Environment
+import threading
+
+from functools import lru_cache
+from typing import Optional
+
+from jinja2 import (
+    BytecodeCache,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+)
 from dop import definitions
+from dop.component.configuration.env import env_config
+from dop.component.util import files
 
 
 def log(msg, info=False):
@@ -17,6 +29,49 @@ def raise_error(error):
     raise RuntimeError(error)
 
 
+class RunnerBytecodeCache(BytecodeCache):
+    """
+    Keeps compiled templates in memory and, when a directory is supplied, on disk so they
+    survive across processes. Buckets are keyed by template name and source checksum,
+    so modified templates are always recompiled
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._bytecode = {}
+        self._lock = threading.Lock()
+        self._filesystem_cache = None
+        if directory:
+            # Bytecode is executed, a directory writable by other users is not used
+            try:
+                files.private_directory(directory)
+                self._filesystem_cache = FileSystemBytecodeCache(directory=directory)
+            except PermissionError as e:
+                logging.warning(f"Caching compiled templates in memory only: {e}")
+
+    def load_bytecode(self, bucket):
+        with self._lock:
+            bytecode = self._bytecode.get((bucket.key, bucket.checksum))
+
+        if bytecode is not None:
+            bucket.bytecode_from_string(bytecode)
+        elif self._filesystem_cache is not None:
+            self._filesystem_cache.load_bytecode(bucket)
+
+    def dump_bytecode(self, bucket):
+        with self._lock:
+            self._bytecode[(bucket.key, bucket.checksum)] = bucket.bytecode_to_string()
+
+        if self._filesystem_cache is not None:
+            self._filesystem_cache.dump_bytecode(bucket)
+
+    def clear(self):
+        with self._lock:
+            self._bytecode.clear()
+
+        if self._filesystem_cache is not None:
+            self._filesystem_cache.clear()
+
+
 class RunnerEnvironment:
     def __init__(self, runner):
         if runner not in definitions.SUPPORTED_TRANSFORMATION_RUNNERS:
@@ -54,9 +109,13 @@ class RunnerEnvironment:
 
         return [common_template_path, runner_base_path]
 
-    def get_env(self):
+    def get_env(self, bytecode_cache: Optional[BytecodeCache] = None):
         template_loader = FileSystemLoader(self._get_runner_template_paths())
-        runner_env = Environment(loader=template_loader, extensions=["jinja2.ext.do"])
+        runner_env = Environment(
+            loader=template_loader,
+            extensions=["jinja2.ext.do"],
+            bytecode_cache=bytecode_cache,
+        )
 
         runner_env.globals["log"] = log
         runner_env.globals["raise"] = raise_error
@@ -64,5 +123,19 @@ class RunnerEnvironment:
         return runner_env
 
 
+@lru_cache(maxsize=None)
 def get_runner_environment(runner):
-    return RunnerEnvironment(runner=runner).get_env()
+    """
+    One environment per runner and process, templates loaded by the environment
+    (i.e. materialization macros) are compiled once and kept by its template cache
+    """
+    bytecode_cache = RunnerBytecodeCache(directory=env_config.jinja_bytecode_cache_path)
+    return RunnerEnvironment(runner=runner).get_env(bytecode_cache=bytecode_cache)
+
+
+@lru_cache(maxsize=64)
+def get_template_from_string(environment: Environment, source: str) -> Template:
+    """
+    Compile a template from a string once per environment
+    """
+    return environment.from_string(source)
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from jinja2 import Environment, Undefined, meta, nodes
+from jinja2.defaults import DEFAULT_NAMESPACE
+from jinja2.filters import FILTERS
+
+from dop.component.configuration.env import env_config
+from dop.component.util import files
+
+# Bump this whenever the shape of the cached values or of the keys changes
+CACHE_VERSION = 2
+# Entries written before this period are removed
+MAX_AGE_IN_SECONDS = 7 * 24 * 3600
+
+# Context variables which only depend on the DAG run being rendered, a template referencing
+# any other variable (i.e. `macros`, `var`, `ti`) is rendered every time
+CACHEABLE_CONTEXT_VARIABLES = {
+    "dag_run",
+    "ds",
+    "ds_nodash",
+    "execution_date",
+    "next_ds",
+    "next_ds_nodash",
+    "next_execution_date",
+    "params",
+    "prev_ds",
+    "prev_ds_nodash",
+    "prev_execution_date",
+    "run_id",
+    "task",
+    "tomorrow_ds",
+    "tomorrow_ds_nodash",
+    "ts",
+    "ts_nodash",
+    "ts_nodash_with_tz",
+    "yesterday_ds",
+    "yesterday_ds_nodash",
+}
+# Context variables which are objects, i.e. the DAG run and the operator, only the
+# attributes a template reads from them are part of its key
+ATTRIBUTE_CONTEXT_VARIABLES = {"dag_run", "task"}
+CACHEABLE_GLOBALS = set(DEFAULT_NAMESPACE) - {"lipsum"}
+NON_DETERMINISTIC_FILTERS = {"random"}
+
+RENDERED_FOLDER = "rendered"
+ANALYSIS_FOLDER = "analysis"
+EXECUTIONS_FOLDER = "executions"
+
+
+def fingerprint(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def execution_fingerprint(sql: str, task, full_refresh: bool) -> str:
+    """
+    Fingerprint of what a task execution does, two executions with the same fingerprint
+    run the same statements against the same relation
+    """
+    return fingerprint(
+        json.dumps(
+            {
+                "sql": fingerprint(sql),
+                "task": task.__dict__,
+                "full_refresh": full_refresh,
+            },
+            sort_keys=True,
+            default=str,
+        )
+    )
+
+
+def _read_attributes(ast: nodes.Template) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Attributes of `ATTRIBUTE_CONTEXT_VARIABLES` read by a template, i.e. `("dag_run",
+    "conf")` for `dag_run.conf`. The attribute is None when the variable is used as a
+    whole or indexed by an expression
+    """
+    read = set()
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        if not (
+            isinstance(node.node, nodes.Name)
+            and node.node.name in ATTRIBUTE_CONTEXT_VARIABLES
+        ):
+            continue
+
+        read.add(id(node.node))
+        if isinstance(node, nodes.Getattr):
+            yield node.node.name, node.attr
+        elif isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str):
+            yield node.node.name, node.arg.value
+        else:
+            yield node.node.name, None
+
+    for node in ast.find_all(nodes.Name):
+        if (
+            node.name in ATTRIBUTE_CONTEXT_VARIABLES
+            and node.ctx == "load"
+            and id(node) not in read
+        ):
+            yield node.name, None
+
+
+def _attribute_values(
+    environment: Environment, value: Any, attributes: List[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    The attributes of a context value read by a template, None if any of them is a method
+    as what it returns is unknown, i.e. `dag_run.get_state()`
+    """
+    values = {}
+    for attribute in attributes:
+        attribute_value = environment.getattr(value, attribute)
+        if isinstance(attribute_value, Undefined):
+            attribute_value = None
+        elif callable(attribute_value):
+            return None
+
+        values[attribute] = attribute_value
+
+    return values
+
+
+def _write_json(path: str, value: Any):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with files.atomic_write(path, mode="w") as fp:
+        json.dump(value, fp, default=str)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # A corrupted entry is simply rebuilt
+        logging.warning(f"Ignoring render cache entry `{path}`: {e}")
+        return None
+
+
+class RenderCache:
+    """
+    A persistent cache of rendered SQL, so that retries and re-runs of a task don't render
+    its SQL again.
+
+    Entries are keyed by the content of the template and of the templates it imports,
+    and by the values of the context variables they reference (i.e. `ds`, `params`), only
+    the attributes they read being used for the DAG run and the task (i.e. `dag_run.conf`).
+    Templates referencing any other variable, or rendered with a non-deterministic
+    filter, are never cached. Which variables a template references is
+    itself cached, so a hit does not parse the template.
+    """
+
+    def __init__(self, cache_path: str):
+        self._cache_path = cache_path
+        self._analyses: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, folder, key) -> str:
+        return os.path.join(self._cache_path, folder, f"{key}.json")
+
+    def _template_fingerprints(self, environment: Environment, names) -> Dict[str, str]:
+        return {
+            name: fingerprint(environment.loader.get_source(environment, name)[0])
+            for name in names
+        }
+
+    def _analyse(self, environment: Environment, source: str) -> Dict[str, Any]:
+        """
+        Context variables referenced by a template and by the templates it imports
+        """
+        variables = set()
+        attributes = defaultdict(set)
+        templates = set()
+        pending = [source]
+        while pending:
+            ast = environment.parse(pending.pop())
+            variables |= meta.find_undeclared_variables(ast)
+            if any(
+                node.name not in FILTERS or node.name in NON_DETERMINISTIC_FILTERS
+                for node in ast.find_all(nodes.Filter)
+            ):
+                return {"cacheable": False, "templates": {}}
+
+            for variable, attribute in _read_attributes(ast):
+                if attribute is None:
+                    return {"cacheable": False, "templates": {}}
+
+                attributes[variable].add(attribute)
+
+            for name in meta.find_referenced_templates(ast):
+                if name is None:
+                    # The template name is only known when rendering
+                    return {"cacheable": False, "templates": {}}
+
+                if name not in templates:
+                    templates.add(name)
+                    pending.append(environment.loader.get_source(environment, name)[0])
+
+        return {
+            "cacheable": variables <= CACHEABLE_CONTEXT_VARIABLES | CACHEABLE_GLOBALS,
+            "variables": sorted(variables - CACHEABLE_GLOBALS),
+            "attributes": {
+                variable: sorted(attributes[variable])
+                for variable in variables & ATTRIBUTE_CONTEXT_VARIABLES
+            },
+            "templates": self._template_fingerprints(environment, templates),
+        }
+
+    def _get_analysis(
+        self, environment: Environment, source_fingerprint: str, source: str
+    ) -> Dict[str, Any]:
+        analysis = self._analyses.get(source_fingerprint)
+        if analysis is None:
+            analysis = _read_json(self._path(ANALYSIS_FOLDER, source_fingerprint))
+
+        # Imported templates may have changed since the template was analysed
+        if analysis is None or analysis.get("version") != CACHE_VERSION:
+            stale = True
+        else:
+            try:
+                stale = analysis["templates"] != self._template_fingerprints(
+                    environment, analysis["templates"]
+                )
+            except Exception:
+                stale = True
+
+        if stale:
+            analysis = dict(self._analyse(environment, source), version=CACHE_VERSION)
+            _write_json(self._path(ANALYSIS_FOLDER, source_fingerprint), analysis)
+
+        self._analyses[source_fingerprint] = analysis
+        return analysis
+
+    def key(
+        self, environment: Environment, source: str, context: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        :return: The key of the rendered template, None if it can't be cached
+        """
+        source_fingerprint = fingerprint(source)
+        analysis = self._get_analysis(environment, source_fingerprint, source)
+        if not analysis["cacheable"]:
+            return None
+
+        values = {}
+        for variable in analysis["variables"]:
+            values[variable] = context.get(variable)
+            if variable in analysis["attributes"]:
+                values[variable] = _attribute_values(
+                    environment, values[variable], analysis["attributes"][variable]
+                )
+                if values[variable] is None:
+                    return None
+
+        return fingerprint(
+            json.dumps(
+                {
+                    "version": CACHE_VERSION,
+                    "source": source_fingerprint,
+                    "templates": analysis["templates"],
+                    "context": values,
+                },
+                sort_keys=True,
+                default=str,
+            )
+        )
+
+    def render(
+        self,
+        environment: Environment,
+        source: str,
+        context: Dict[str, Any],
+        render: Callable[[], str],
+    ) -> str:
+        """
+        Return the rendered template, only calling `render` on a cache miss
+        """
+        try:
+            key = self.key(environment, source, context)
+        except Exception as e:
+            logging.warning(f"Rendering a template which can't be cached: {e}")
+            key = None
+
+        if key is None:
+            return render()
+
+        entry = _read_json(self._path(RENDERED_FOLDER, key))
+        # The fingerprint guards against truncated or tampered entries
+        if entry is not None and fingerprint(entry["rendered"]) == entry["fingerprint"]:
+            self.hits += 1
+            return entry["rendered"]
+
+        self.misses += 1
+        rendered = render()
+        _write_json(
+            self._path(RENDERED_FOLDER, key),
+            {"rendered": rendered, "fingerprint": fingerprint(rendered)},
+        )
+        return rendered
+
+    def _execution_key(self, dag_id, task_id, execution_date) -> str:
+        return fingerprint(f"{dag_id}/{task_id}/{execution_date}")
+
+    def get_execution(self, dag_id, task_id, execution_date) -> Optional[str]:
+        """
+        :return: The fingerprint of the last successful execution of a task for a DAG run
+        """
+        entry = _read_json(
+            self._path(
+                EXECUTIONS_FOLDER, self._execution_key(dag_id, task_id, execution_date)
+            )
+        )
+        return entry["fingerprint"] if entry else None
+
+    def record_execution(self, dag_id, task_id, execution_date, execution: str):
+        _write_json(
+            self._path(
+                EXECUTIONS_FOLDER, self._execution_key(dag_id, task_id, execution_date)
+            ),
+            {"fingerprint": execution},
+        )
+
+    def prune(self, max_age: float = MAX_AGE_IN_SECONDS):
+        """
+        Remove entries written more than `max_age` seconds ago, i.e. for past DAG runs
+        """
+        expired_at = time.time() - max_age
+        for folder in (RENDERED_FOLDER, ANALYSIS_FOLDER, EXECUTIONS_FOLDER):
+            try:
+                entries = list(os.scandir(os.path.join(self._cache_path, folder)))
+            except FileNotFoundError:
+                continue
+
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < expired_at:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+@lru_cache(maxsize=None)
+def get_render_cache() -> Optional[RenderCache]:
+    """
+    One render cache per process, entries of past DAG runs are removed when it is created
+    """
+    if not env_config.is_render_cache_enabled:
+        return None
+
+    # Rendered SQL is run as is, a cache writable by other users is not used
+    try:
+        files.private_directory(env_config.render_cache_path)
+    except PermissionError as e:
+        logging.warning(f"Rendering SQL without cache: {e}")
+        return None
+
+    render_cache = RenderCache(cache_path=env_config.render_cache_path)
+    render_cache.prune()
+    return render_cache
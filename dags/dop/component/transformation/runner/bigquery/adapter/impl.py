@@ -1,14 +1,24 @@
+import hashlib
 import logging
+import threading
+
 import jinja2
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from google.cloud import bigquery
 from google.cloud.exceptions import GoogleCloudError, NotFound
 
 from dop.component.configuration import env
+from dop.component.transformation.common.adapter import schema
 from dop.component.transformation.common.parser import yaml_parser
 from dop.component.transformation.common.templating import jinja
+from dop.component.transformation.runner.bigquery.adapter.job import (
+    run_blocking,
+    run_coroutine,
+    wait_for_job,
+)
 from dop.component.transformation.runner.bigquery.adapter.model import (
+    AssertionSummary,
     TableOptionsConfig,
     PartitionConfig,
     UDFArgument,
@@ -17,8 +27,33 @@ from dop.component.transformation.runner.bigquery.adapter.model import (
 from dop.component.transformation.runner.bigquery.adapter.relation import (
     BigQueryRelation as Relation,
     RelationHelper,
+    RelationMetadataCache,
+    get_shared_metadata_cache,
+    METADATA_BACKEND_INFORMATION_SCHEMA,
 )
-from dop.component.util import auth
+from dop.component.util import auth, client_registry
+
+TEMPLATE_TABLE_CREATE_OR_REPLACE = """
+            {% import 'materialization/table_create_or_replace.sql' as materialise_table %}
+            {{ materialise_table.create_or_replace(query, relation_helper, options) }}
+        """
+
+TEMPLATE_TABLE_UPSERT = """
+                    {% import 'materialization/table_upsert.sql' as materialise_table %}
+                    {{ materialise_table.upsert(query, relation_helper, options) }}
+                """
+
+TEMPLATE_TABLE_INSERT_OVERWRITE = """
+                    {% import 'materialization/table_insert_overwrite.sql' as materialise_table %}
+                    {{ materialise_table.insert_overwrite(query, relation_helper, options) }}
+                """
+
+# Rows logged and fetched per page by assertions, unless set in the task options
+ASSERTION_SAMPLE_SIZE = 20
+ASSERTION_PAGE_SIZE = 1000
+
+_estimated_bytes: Dict[Tuple[str, str], int] = {}
+_estimated_bytes_lock = threading.Lock()
 
 
 def get_query_job_config(
@@ -44,6 +79,10 @@ def execute_job_with_error_logging(job):
     try:
         job.result()
         logging.info("Affected: {} rows".format(job.num_dml_affected_rows))
+        logging.info(
+            f"Processed: {job.total_bytes_processed} bytes, "
+            f"billed: {job.total_bytes_billed} bytes"
+        )
         logging.info("Job completed...")
     except GoogleCloudError as e:
         logging.error(e)
@@ -52,13 +91,60 @@ def execute_job_with_error_logging(job):
         raise e
 
 
+def to_assertion_result(row) -> Dict[str, Any]:
+    reserved_keys = ["success", "description"]
+    return {
+        "success": row["success"],
+        "description": row["description"],
+        "other_asserted_values": {
+            key: value for key, value in row.items() if key not in reserved_keys
+        },
+    }
+
+
+def summarise_assertion(
+    rows, max_failures: Optional[int] = None, sample_size=ASSERTION_SAMPLE_SIZE
+) -> AssertionSummary:
+    """
+    Count passed and failed assertion rows as they are read, keeping a bounded sample of
+    each. A null `success` is a failure
+    """
+    summary = AssertionSummary()
+    for row in rows:
+        if row["success"]:
+            summary.passed += 1
+            if len(summary.passed_sample) < sample_size:
+                summary.passed_sample.append(to_assertion_result(row))
+            continue
+
+        summary.failed += 1
+        if len(summary.failed_sample) < sample_size:
+            summary.failed_sample.append(to_assertion_result(row))
+
+        if max_failures and summary.failed >= max_failures:
+            summary.truncated = True
+            break
+
+    return summary
+
+
+def summarise_aggregated_assertion(rows) -> AssertionSummary:
+    row = next(iter(rows))
+    return AssertionSummary(
+        passed=row["passed"],
+        failed=row["failed"],
+        failed_sample=[to_assertion_result(r) for r in row["failed_sample"] or []],
+    )
+
+
 def get_database():
     return env.env_config.project_id
 
 
 def get_bq_client(project_id, location, credentials):
-    return bigquery.client.Client(
-        project=project_id, location=location, credentials=credentials
+    # Clients are shared by all tasks run by the process to reuse connections
+    return client_registry.get_bigquery_client(
+        project_id=project_id, location=location, credentials=credentials
     )
 
 
@@ -83,8 +169,22 @@ def get_query_runner(options: Optional[Dict[str, Any]]):
         project_id=project_id, location=location, credentials=credentials
     )
     jinja_environment = jinja.get_runner_environment(runner="bigquery")
+
+    # Metadata is only shared across runners when it is allowed to expire
+    metadata_cache_ttl = options.get("metadata_cache_ttl")
+    metadata_cache = (
+        get_shared_metadata_cache(ttl=metadata_cache_ttl)
+        if metadata_cache_ttl
+        else None
+    )
+
     return QueryRunner(
-        client=client, jinja_environment=jinja_environment, dry_run=dry_run
+        client=client,
+        jinja_environment=jinja_environment,
+        dry_run=dry_run,
+        metadata_cache=metadata_cache,
+        metadata_backend=options.get("metadata_backend")
+        or METADATA_BACKEND_INFORMATION_SCHEMA,
     )
 
 
@@ -94,25 +194,108 @@ class QueryRunner:
         client: bigquery.client.Client,
         jinja_environment: jinja2.Environment,
         dry_run=True,
+        metadata_cache: Optional[RelationMetadataCache] = None,
+        metadata_backend: str = METADATA_BACKEND_INFORMATION_SCHEMA,
     ):
         self._client = client
         self._jinja_environment = jinja_environment
         self._dry_run = dry_run
-        self._relation_helper = RelationHelper(client=self._client)
+        self._relation_helper = RelationHelper(
+            client=self._client,
+            metadata_cache=metadata_cache,
+            metadata_backend=metadata_backend,
+        )
+        # Bytes processed by all jobs run by this runner, estimated in dry run mode
+        self.total_bytes_processed = 0
+
+    def execute_job(self, query_job):
+        execute_job_with_error_logging(job=query_job)
+        self.total_bytes_processed += query_job.total_bytes_processed or 0
+
+    def submit_query(self, query, job_config: Optional[bigquery.QueryJobConfig] = None):
+        """
+        Submit a query job without waiting for it to complete
+        """
+        if job_config is None:
+            job_config = bigquery.QueryJobConfig(dry_run=self._dry_run)
+
+        return self._client.query(query=query, job_config=job_config)
+
+    async def execute_async(
+        self,
+        query,
+        relations: Optional[List[Relation]] = None,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+    ):
+        """
+        Submit a query job and wait for it from the event loop, so that many jobs can be in
+        flight at once without holding a thread per job. The cached metadata of `relations`
+        is invalidated once the job is done, even if it failed as a script may have
+        partially completed
+
+        :param query: SQL statement or script
+        :param relations: Relations the statement may create, alter or drop
+        :param job_config: Defaults to a dry run config when the runner is in dry run mode
+        :return: The completed job
+        """
+        query_job = await run_blocking(
+            self.submit_query, query=query, job_config=job_config
+        )
+
+        try:
+            await wait_for_job(job=query_job)
+            await run_blocking(self.execute_job, query_job=query_job)
+        finally:
+            if relations and not query_job.dry_run:
+                self._relation_helper.invalidate(relations=relations)
+
+        return query_job
+
+    def execute_ddl(self, query, relations: List[Relation]):
+        """
+        Run a statement altering `relations` and invalidate their cached metadata,
+        even if the statement fails as a script may have partially completed
+
+        :param query: SQL statement or script
+        :param relations: Relations the statement may create, alter or drop
+        """
+        return run_coroutine(self.execute_async(query=query, relations=relations))
 
     def write_append(self, query, relation):
         job_config = get_query_job_config(
             destination=relation,
             write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
         )
+        job_config.dry_run = self._dry_run
 
         logging.info(f"Appending data to {relation} using query: {query}")
 
         query_job = self._client.query(query=query, job_config=job_config)
-        execute_job_with_error_logging(job=query_job)
+        try:
+            self.execute_job(query_job=query_job)
+        finally:
+            if not self._dry_run:
+                self._relation_helper.invalidate(relations=[relation])
 
     def replace_or_upsert(
         self, query: str, relation: Relation, options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        This does a full replacement or an upsert to the target relation, see
+        `replace_or_upsert_async`
+
+        :param query: SQL Query
+        :param relation: BigQuery relation to write truncate
+        :param options: For options such as specifying partitions, forcing full refresh etc
+        """
+        return run_coroutine(
+            self.replace_or_upsert_async(
+                query=query, relation=relation, options=options
+            )
+        )
+
+    async def replace_or_upsert_async(
+        self, query: str, relation: Relation, options: Optional[Dict[str, Any]] = None
     ):
         """
         TODO: this has quite a bit of duplication, needs tidying up
@@ -121,6 +304,9 @@ class QueryRunner:
         1. When the target table does not exist, it creates the table using schema inferred by the query results
         2. If the target table is already there, it writes into a temp table first and then merge to the target table so the process is atomic and will break if the schema is changed
 
+        Both statements depend on each other and are run one after the other, several
+        relations can however be materialized concurrently from the same event loop
+
         :param query: SQL Query
         :param relation: BigQuery relation to write truncate
         :param options: For options such as specifying partitions, forcing full refresh etc
@@ -130,6 +316,12 @@ class QueryRunner:
         Date based Partition:
         options={'partition_key': 'key', 'partition_data_type': 'datetime'}
 
+        Existing data is replaced with one of the following `incremental_strategy` options
+        merge (default): A merge deleting the partitions found in the temp table, the partitions
+        are only known at run time so the target table is scanned in full
+        insert_overwrite: The partitions of the temp table are read from INFORMATION_SCHEMA and
+        deleted with a literal filter, only the replaced partitions are touched
+
         """
 
         def query_cleaned(q):
@@ -146,6 +338,9 @@ class QueryRunner:
 
         options = {} if not options else options
         full_refresh = options.get("full_refresh", False)
+        incremental_strategy = (
+            options.get("incremental_strategy") or schema.INCREMENTAL_STRATEGY_MERGE
+        )
 
         tmp_relation = Relation(
             database=relation.database,
@@ -153,11 +348,9 @@ class QueryRunner:
             identifier="_tmp_" + relation.identifier,
         )
 
-        template_create_or_replace = self._jinja_environment.from_string(
-            """
-            {% import 'materialization/table_create_or_replace.sql' as materialise_table %}
-            {{ materialise_table.create_or_replace(query, relation_helper, options) }}
-        """
+        template_create_or_replace = jinja.get_template_from_string(
+            environment=self._jinja_environment,
+            source=TEMPLATE_TABLE_CREATE_OR_REPLACE,
         )
 
         table_options_config = TableOptionsConfig(
@@ -167,10 +360,22 @@ class QueryRunner:
         )
 
         partition_config = PartitionConfig.create(options=options)
+        if (
+            incremental_strategy == schema.INCREMENTAL_STRATEGY_INSERT_OVERWRITE
+            and partition_config is None
+        ):
+            raise RuntimeError(
+                f"`{incremental_strategy}` requires partition options, none supplied"
+            )
+
+        # Metadata of both relations is fetched at once, the macros only read the snapshot
+        relation_metadata = await run_blocking(
+            self._relation_helper.snapshot, relations=[relation, tmp_relation]
+        )
 
         rendered_create_or_replace = template_create_or_replace.render(
             query=query,
-            relation_helper=self._relation_helper,
+            relation_helper=relation_metadata,
             options={
                 "relation": relation,
                 "tmp_relation": tmp_relation,
@@ -182,37 +387,61 @@ class QueryRunner:
 
         logging.info("Running Query: {}".format(rendered_create_or_replace))
 
-        job_config = bigquery.QueryJobConfig(dry_run=self._dry_run)
-        query_job = self._client.query(
-            query=rendered_create_or_replace, job_config=job_config
+        await self.execute_async(
+            query=rendered_create_or_replace, relations=[relation, tmp_relation]
         )
 
-        execute_job_with_error_logging(job=query_job)
+        if self._dry_run:
+            # The upsert reads the temp table, which is not created by a dry run
+            logging.info("Dry run, the upsert is not estimated")
+            return
 
-        template_upsert = self._jinja_environment.from_string(
-            """
-                    {% import 'materialization/table_upsert.sql' as materialise_table %}
-                    {{ materialise_table.upsert(query, relation_helper, options) }}
-                """
+        template_upsert = jinja.get_template_from_string(
+            environment=self._jinja_environment,
+            source=TEMPLATE_TABLE_INSERT_OVERWRITE
+            if incremental_strategy == schema.INCREMENTAL_STRATEGY_INSERT_OVERWRITE
+            else TEMPLATE_TABLE_UPSERT,
         )
 
+        # The previous statement may have created or replaced either relation
+        relation_metadata = await run_blocking(
+            self._relation_helper.snapshot, relations=[relation, tmp_relation]
+        )
+
+        # Partitions are only looked up when the temp table is merged into the target
+        partitions = []
+        if (
+            incremental_strategy == schema.INCREMENTAL_STRATEGY_INSERT_OVERWRITE
+            and relation_metadata.check_relation_exists(relation)
+            and relation_metadata.check_relation_exists(tmp_relation)
+            and not full_refresh
+        ):
+            partitions = await run_blocking(
+                self._relation_helper.fetch_partition_ids, relation=tmp_relation
+            )
+            logging.info(f"Partitions to be replaced: {partitions}")
+
         rendered_upsert = template_upsert.render(
             query=query,
-            relation_helper=self._relation_helper,
+            relation_helper=relation_metadata,
             options={
                 "relation": relation,
                 "tmp_relation": tmp_relation,
                 "partition_config": partition_config,
+                "partitions": partitions,
                 "full_refresh": full_refresh,
             },
         )
 
         logging.info("Running the Upsert Query: {}".format(rendered_upsert))
 
-        job_config = bigquery.QueryJobConfig(dry_run=self._dry_run)
-        query_job = self._client.query(query=rendered_upsert, job_config=job_config)
+        await self.execute_async(
+            query=rendered_upsert, relations=[relation, tmp_relation]
+        )
 
-        execute_job_with_error_logging(job=query_job)
+        logging.info(
+            f"### Relation metadata cache: {self._relation_helper.metadata_cache.stats()}"
+        )
 
     def recreate_view(self, query, relation: Relation):
         full_table_id = f"{relation.database}.{relation.schema}.{relation.identifier}"
@@ -221,6 +450,11 @@ class QueryRunner:
 
         logging.info("Executing query: {}".format(query))
 
+        if self._dry_run:
+            # Creating a view is free, the query is only validated
+            execute_job_with_error_logging(job=self.submit_query(query=query))
+            return
+
         try:
             self._client.delete_table(view)
         except NotFound:
@@ -230,6 +464,7 @@ class QueryRunner:
             pass
 
         self._client.create_table(view)
+        self._relation_helper.invalidate(relations=[relation])
 
         logging.info("View: {} has been created".format(relation))
 
@@ -238,6 +473,10 @@ class QueryRunner:
         full_dataset_id = f"{project_id}.{dataset_id}"
         dataset = bigquery.dataset.Dataset(dataset_ref=full_dataset_id)
 
+        if self._dry_run:
+            logging.info(f"Dry run, dataset {full_dataset_id} is not created")
+            return
+
         self._client.create_dataset(dataset=dataset, exists_ok=exists_ok)
         logging.info(
             "New Dataset {} already exists or has been created".format(full_dataset_id)
@@ -255,10 +494,8 @@ class QueryRunner:
         )
         logging.info("Creating the UDF using: {}".format(query))
 
-        job_config = bigquery.QueryJobConfig(dry_run=self._dry_run)
-        query_job = self._client.query(query=query, job_config=job_config)
-
-        execute_job_with_error_logging(job=query_job)
+        query_job = self.submit_query(query=query)
+        self.execute_job(query_job=query_job)
 
         logging.info("UDF: {} has been created".format(relation))
 
@@ -274,9 +511,8 @@ class QueryRunner:
         )
         logging.info(f"Creating the Stored Procedure using query: {query}")
 
-        job_config = bigquery.QueryJobConfig()
-        query_job = self._client.query(query=query, job_config=job_config)
-        execute_job_with_error_logging(job=query_job)
+        query_job = self.submit_query(query=query)
+        self.execute_job(query_job=query_job)
 
         logging.info("Stored Procedure: {} has been created".format(relation))
 
@@ -320,58 +556,119 @@ END;
 
         return rendered_query
 
-    def assertion(self, query):
-        def compile_assertion_results(rows):
-            assertion_results = []
-            has_failure = False
-            reserved_keys = ["success", "description"]
-            for row in rows:
-                assertion_result = {
-                    "success": None,
-                    "description": None,
-                    "other_asserted_values": {},
-                }
-                if not row["success"]:
-                    has_failure = True
+    def assertion(self, query, options: Optional[Dict[str, Any]] = None):
+        """
+        Evaluate an assertion query and fail if any of its rows did not succeed,
+        see `evaluate_assertion` for the options
+        """
+        summary = self.evaluate_assertion(query=query, options=options)
 
-                assertion_result["success"] = row["success"]
-                assertion_result["description"] = row["description"]
-                for key, value in row.items():
-                    if key not in reserved_keys:
-                        assertion_result["other_asserted_values"][key] = value
+        if summary is not None and summary.failed:
+            raise AssertionError(
+                'Assertion failed, check the "ASSERTION RESULTS" section for more details'
+            )
 
-                assertion_results.append(assertion_result)
+    def evaluate_assertion(
+        self, query, options: Optional[Dict[str, Any]] = None
+    ) -> Optional[AssertionSummary]:
+        """
+        Evaluate an assertion query returning `success` and `description` columns.
+        Rows are read page by page and only counted, a sample of them is logged
+
+        :param query: Assertion query
+        :param options: Optional
+        max_failures: Stop reading rows once this number of failures is reached
+        sample_size: Maximum number of failed (and passed) rows logged
+        page_size: Number of rows fetched per page
+        aggregate: Count and sample rows in BigQuery, only a single row is fetched
+        :return: The summary of the assertion, None in dry run mode
+        """
+        options = {} if not options else options
+        sample_size = options.get("sample_size", ASSERTION_SAMPLE_SIZE)
+        aggregate = options.get("aggregate", False)
 
-            return {"has_failure": has_failure, "assertion_results": assertion_results}
+        if aggregate:
+            query = self.render_aggregate_assertion_query(
+                query=query, sample_size=sample_size
+            )
 
-        job_config = bigquery.QueryJobConfig()
-        query_job = self._client.query(query=query, job_config=job_config)
+        query_job = self.submit_query(query=query)
 
         logging.info("Running assertion using query: {}".format(query))
 
-        try:
-            results = compile_assertion_results(rows=query_job.result())
+        if self._dry_run:
+            self.execute_job(query_job=query_job)
+            return None
 
-            logging.info(
-                "\n\n#### Assertion Report ####\n\n"
-                + yaml_parser.dict_to_yaml(results["assertion_results"])
-                + "\n\n#### Assertion Report ####\n\n"
-            )
-
-            if results["has_failure"]:
-                raise AssertionError(
-                    'Assertion failed, check the "ASSERTION RESULTS" section for more details'
+        try:
+            if aggregate:
+                summary = summarise_aggregated_assertion(rows=query_job.result())
+            else:
+                summary = summarise_assertion(
+                    rows=query_job.result(
+                        page_size=options.get("page_size", ASSERTION_PAGE_SIZE)
+                    ),
+                    max_failures=options.get("max_failures"),
+                    sample_size=sample_size,
                 )
-
         except GoogleCloudError as e:
             logging.error(e)
             logging.error(query_job.error_result)
             logging.error(query_job.errors)
             raise e
 
-    def call_stored_procedure(self, query):
-        job_config = bigquery.QueryJobConfig()
+        logging.info(
+            "\n\n#### Assertion Report ####\n\n"
+            + yaml_parser.dict_to_yaml(
+                {
+                    "passed": summary.passed,
+                    "failed": summary.failed,
+                    "stopped_at_max_failures": summary.truncated,
+                    "sample_of_failed_assertions": summary.failed_sample,
+                    "sample_of_passed_assertions": summary.passed_sample,
+                }
+            )
+            + "\n\n#### Assertion Report ####\n\n"
+        )
+
+        return summary
+
+    def estimate_bytes(self, query) -> int:
+        """
+        Bytes a query would process, estimated with a dry run. Estimates are cached for the
+        lifetime of the process so that a query evaluated repeatedly is only estimated once
+        """
+        key = (self._client.project, hashlib.sha256(query.encode("utf-8")).hexdigest())
+        with _estimated_bytes_lock:
+            if key in _estimated_bytes:
+                return _estimated_bytes[key]
+
+        query_job = self.submit_query(
+            query=query,
+            job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False),
+        )
+        estimated_bytes = query_job.total_bytes_processed or 0
 
+        with _estimated_bytes_lock:
+            _estimated_bytes[key] = estimated_bytes
+
+        return estimated_bytes
+
+    @staticmethod
+    def render_aggregate_assertion_query(query, sample_size):
+        return f"""
+SELECT
+    COUNTIF(COALESCE(assertion.success, FALSE)) AS passed,
+    COUNTIF(NOT COALESCE(assertion.success, FALSE)) AS failed,
+    ARRAY_AGG(
+        IF(COALESCE(assertion.success, FALSE), NULL, assertion) IGNORE NULLS LIMIT {int(sample_size)}
+    ) AS failed_sample
+FROM (
+{query}
+) AS assertion
+"""
+
+    def call_stored_procedure(self, query):
         sp = f"""
             BEGIN
                 {query}
@@ -379,5 +676,5 @@ END;
             """
         logging.info(f"Calling Stored Procedure(s) :{query}")
 
-        query_job = self._client.query(query=sp, job_config=job_config)
-        execute_job_with_error_logging(job=query_job)
+        query_job = self.submit_query(query=sp)
+        self.execute_job(query_job=query_job)
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional
+
+from dop.component.util import client_registry
+
+JOB_POLL_INITIAL_DELAY = 0.5
+JOB_POLL_MAX_DELAY = 10.0
+JOB_POLL_MULTIPLIER = 1.5
+
+JOB_STATE_DONE = "DONE"
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_pid = None
+_io_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Threads used to make blocking BigQuery API calls (submitting a job, polling its state)
+    from an event loop. A thread is only held for the duration of an API call, not for the
+    lifetime of a job, so it is sized like the HTTP connection pool of the shared clients
+    """
+    global _io_executor, _io_executor_pid
+
+    with _io_executor_lock:
+        # Threads are not carried over to a forked process
+        if _io_executor is None or _io_executor_pid != os.getpid():
+            _io_executor = ThreadPoolExecutor(
+                max_workers=client_registry.HTTP_POOL_MAXSIZE
+            )
+            _io_executor_pid = os.getpid()
+
+        return _io_executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking call in the IO executor without blocking the event loop
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        get_io_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def wait_for_job(
+    job,
+    initial_delay: float = JOB_POLL_INITIAL_DELAY,
+    max_delay: float = JOB_POLL_MAX_DELAY,
+    multiplier: float = JOB_POLL_MULTIPLIER,
+):
+    """
+    Wait for a BigQuery job to complete, polling its state with an exponential backoff.
+    Errors are not raised here, the job is returned as soon as it is done
+
+    :param job: A submitted BigQuery job
+    :param initial_delay: Seconds to wait before polling the job for the first time
+    :param max_delay: Maximum number of seconds between two polls
+    :param multiplier: Factor applied to the delay after each poll
+    :return: The completed job
+    """
+    delay = initial_delay
+    # Dry run jobs are never persisted, they are complete as soon as they are submitted
+    while not job.dry_run and job.state != JOB_STATE_DONE:
+        await asyncio.sleep(delay)
+        delay = min(delay * multiplier, max_delay)
+        await run_blocking(job.reload)
+
+    return job
+
+
+async def gather_with_limit(
+    awaitables: List[Awaitable], max_in_flight: Optional[int] = None
+) -> List[Any]:
+    """
+    Await all `awaitables` with at most `max_in_flight` of them running at once
+
+    :return: Results in the same order as `awaitables`, the first exception is raised
+    """
+    if not max_in_flight:
+        return await asyncio.gather(*awaitables)
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def limited(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*[limited(awaitable) for awaitable in awaitables])
+
+
+def run_coroutine(coroutine: Awaitable) -> Any:
+    """
+    Run a coroutine to completion from synchronous code, in a new event loop so it can be
+    called from any thread (i.e. grouped execution workers)
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
 
 from dop.component.transformation.common.adapter.model import Argument
 
@@ -20,6 +20,39 @@ class PartitionConfig:
         else:
             return column
 
+    def render_partition_filter(
+        self, partition_ids: List[str], alias: Optional[str] = None
+    ) -> str:
+        """
+        Render a predicate matching the given daily partitions with literals only, so that
+        BigQuery prunes partitions statically
+
+        :param partition_ids: Partition ids as reported by INFORMATION_SCHEMA.PARTITIONS
+        :param alias: Optional alias of the relation
+        """
+        column: str = self.field
+        if alias:
+            column = f"{alias}.{self.field}"
+
+        # Daily partitions only, as tables are partitioned by date(<field>)
+        dates = [
+            f"{p[:4]}-{p[4:6]}-{p[6:8]}"
+            for p in partition_ids
+            if len(p) == 8 and p.isdigit()
+        ]
+        data_type = self.data_type.lower()
+        if data_type in ("timestamp", "datetime"):
+            column = f"{data_type}_trunc({column}, day)"
+
+        predicates = []
+        if dates:
+            literals = ", ".join(f"{data_type} '{d}'" for d in dates)
+            predicates.append(f"{column} in ({literals})")
+        if "__NULL__" in partition_ids:
+            predicates.append(f"{column} is null")
+
+        return " or ".join(predicates) if predicates else "false"
+
     @staticmethod
     def create(options):
         if not options.get("partition_key") or not options.get("partition_data_type"):
@@ -61,3 +94,38 @@ class UDFArgument(Argument):
 @dataclass(frozen=True)
 class StoredProcedureArgument(Argument):
     pass
+
+
+@dataclass(frozen=True)
+class ColumnMetadata:
+    name: str
+    data_type: Optional[str] = None
+    is_nullable: Optional[str] = None
+    is_partitioning_column: Optional[str] = None
+
+    @property
+    def schema_identifier(self):
+        return "".join(
+            [
+                self.name or "",
+                self.is_nullable or "",
+                self.data_type or "",
+                self.is_partitioning_column or "",
+            ]
+        )
+
+
+@dataclass(frozen=True)
+class RelationMetadata:
+    exists: bool
+    columns: Tuple[ColumnMetadata, ...] = ()
+
+
+@dataclass
+class AssertionSummary:
+    passed: int = 0
+    failed: int = 0
+    # True when evaluation stopped at `max_failures` before reading every row
+    truncated: bool = False
+    failed_sample: List[Dict[str, Any]] = field(default_factory=list)
+    passed_sample: List[Dict[str, Any]] = field(default_factory=list)
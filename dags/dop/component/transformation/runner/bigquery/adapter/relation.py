@@ -3,10 +3,77 @@ from dop.component.transformation.common.adapter.relation import (
     RelationValueError,
 )
 
+import logging
+import threading
+import time
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import GoogleAPICallError
 from google.cloud import bigquery
+from google.cloud.exceptions import NotFound
 from dataclasses import dataclass
 
-from dop.component.transformation.runner.bigquery.adapter.model import PartitionConfig
+from dop.component.transformation.runner.bigquery.adapter.model import (
+    ColumnMetadata,
+    PartitionConfig,
+    RelationMetadata,
+)
+
+METADATA_BACKEND_INFORMATION_SCHEMA = "information_schema"
+METADATA_BACKEND_TABLES_API = "tables_api"
+METADATA_BACKENDS = [METADATA_BACKEND_INFORMATION_SCHEMA, METADATA_BACKEND_TABLES_API]
+
+# Legacy SQL types returned by the tables API and their Standard SQL names,
+# as reported by INFORMATION_SCHEMA.COLUMNS
+STANDARD_SQL_TYPES = {
+    "INTEGER": "INT64",
+    "FLOAT": "FLOAT64",
+    "BOOLEAN": "BOOL",
+    "RECORD": "STRUCT",
+}
+
+
+def standard_sql_type(field: bigquery.SchemaField) -> str:
+    """
+    Render the type of a schema field the way INFORMATION_SCHEMA.COLUMNS does,
+    i.e. `ARRAY<STRUCT<a INT64, b STRING>>`
+    """
+    field_type = STANDARD_SQL_TYPES.get(field.field_type, field.field_type)
+
+    if field_type == "STRUCT":
+        field_type = "STRUCT<{}>".format(
+            ", ".join(f"{f.name} {standard_sql_type(f)}" for f in field.fields)
+        )
+
+    if field.mode == "REPEATED":
+        field_type = f"ARRAY<{field_type}>"
+
+    return field_type
+
+
+def relation_metadata_from_table(table: bigquery.Table) -> RelationMetadata:
+    partitioning_columns = set()
+    if table.time_partitioning is not None:
+        partitioning_columns.add(table.time_partitioning.field)
+    if table.range_partitioning is not None:
+        partitioning_columns.add(table.range_partitioning.field)
+
+    return RelationMetadata(
+        exists=True,
+        columns=tuple(
+            ColumnMetadata(
+                name=field.name,
+                data_type=standard_sql_type(field),
+                is_nullable="YES" if field.mode == "NULLABLE" else "NO",
+                is_partitioning_column="YES"
+                if field.name in partitioning_columns
+                else "NO",
+            )
+            for field in table.schema
+        ),
+    )
 
 
 @dataclass(frozen=True)
@@ -33,20 +100,22 @@ class BigQueryRelation(BaseRelation):
         return f"`{self.database}.{self.schema}.{self.identifier}`"
 
 
-class RelationHelper:
-    def __init__(self, client: bigquery.client.Client):
-        self._client = client
+class BaseRelationHelper:
+    """
+    Answers the questions asked by the materialization macros about existing relations,
+    based on the metadata returned by `get_relations_metadata`
+    """
 
-    def check_relation_exists(self, relation: BaseRelation):
-        query = f"""
-        SELECT * FROM {relation.database}.{relation.schema}.INFORMATION_SCHEMA.TABLES
-        WHERE table_name = '{relation.identifier}';
-"""
+    def get_relations_metadata(
+        self, relations: List[BaseRelation]
+    ) -> Dict[BaseRelation, RelationMetadata]:
+        raise NotImplementedError
 
-        for _ in self._client.query(query=query):
-            return True
+    def get_relation_metadata(self, relation: BaseRelation) -> RelationMetadata:
+        return self.get_relations_metadata(relations=[relation])[relation]
 
-        return False
+    def check_relation_exists(self, relation: BaseRelation):
+        return self.get_relation_metadata(relation=relation).exists
 
     def has_same_partition_definition(
         self, partition_config: PartitionConfig, relation: BaseRelation
@@ -64,41 +133,304 @@ class RelationHelper:
             return False
 
     def partition_definition(self, relation: BaseRelation):
-        query = f"""
-        SELECT column_name, data_type FROM {relation.database}.{relation.schema}.INFORMATION_SCHEMA.COLUMNS
-        WHERE table_name = '{relation.identifier}' AND is_partitioning_column='YES' LIMIT 1;
-"""
-
-        for row in self._client.query(query=query):
-            return {"column_name": row["column_name"], "data_type": row["data_type"]}
+        for column in self.get_relation_metadata(relation=relation).columns:
+            if column.is_partitioning_column == "YES":
+                return {"column_name": column.name, "data_type": column.data_type}
 
         return None
 
     def check_if_schemas_match(
         self, tmp_relation: BaseRelation, relation: BaseRelation
     ):
-        query_template = """
-                SELECT CONCAT(coalesce(column_name,''),coalesce(is_nullable,''),coalesce(data_type,''), coalesce(is_partitioning_column, '')) as col_schema_idendifer
-                FROM {r.database}.{r.schema}.INFORMATION_SCHEMA.COLUMNS
-                WHERE table_name = '{r.identifier}' ORDER BY ordinal_position;
-"""
-        tmp_schema = [
-            x["col_schema_idendifer"]
-            for x in self._client.query(query=query_template.format(r=tmp_relation))
-        ]
-        target_schema = [
-            x["col_schema_idendifer"]
-            for x in self._client.query(query=query_template.format(r=relation))
-        ]
+        metadata = self.get_relations_metadata(relations=[tmp_relation, relation])
+        tmp_schema = [c.schema_identifier for c in metadata[tmp_relation].columns]
+        target_schema = [c.schema_identifier for c in metadata[relation].columns]
 
         if tmp_schema == target_schema:
             return True
         return False
 
     def get_columns_of_relation(self, relation: BaseRelation):
+        return [c.name for c in self.get_relation_metadata(relation=relation).columns]
+
+
+class RelationMetadataSnapshot(BaseRelationHelper):
+    """
+    Metadata of a set of relations fetched at once, relations outside the snapshot are
+    looked up with the relation helper that took it
+    """
+
+    def __init__(
+        self,
+        metadata: Dict[BaseRelation, RelationMetadata],
+        relation_helper: BaseRelationHelper,
+    ):
+        self._metadata = metadata
+        self._relation_helper = relation_helper
+
+    def get_relations_metadata(
+        self, relations: List[BaseRelation]
+    ) -> Dict[BaseRelation, RelationMetadata]:
+        missing = [r for r in relations if r not in self._metadata]
+        if missing:
+            self._metadata.update(
+                self._relation_helper.get_relations_metadata(relations=missing)
+            )
+
+        return {r: self._metadata[r] for r in relations}
+
+
+class RelationMetadataCache:
+    """
+    Thread safe cache of relation metadata. Entries are kept until they are invalidated or,
+    when a TTL is set, until they expire
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self._ttl = ttl
+        self._entries: Dict[BaseRelation, Tuple[float, RelationMetadata]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, relation: BaseRelation) -> Optional[RelationMetadata]:
+        with self._lock:
+            entry = self._entries.get(relation)
+            if entry is not None and (
+                self._ttl is None or time.monotonic() - entry[0] < self._ttl
+            ):
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            return None
+
+    def set(self, relation: BaseRelation, metadata: RelationMetadata):
+        with self._lock:
+            self._entries[relation] = (time.monotonic(), metadata)
+
+    def invalidate(self, relations: List[BaseRelation]):
+        with self._lock:
+            for relation in relations:
+                if self._entries.pop(relation, None) is not None:
+                    self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+_shared_metadata_caches: Dict[float, RelationMetadataCache] = {}
+_shared_metadata_caches_lock = threading.Lock()
+
+
+def get_shared_metadata_cache(ttl: float) -> RelationMetadataCache:
+    """
+    A process level metadata cache, used to share metadata across tasks of the same DAG run.
+    Invalidation only covers DDL run from this process, hence the TTL is mandatory
+    """
+    with _shared_metadata_caches_lock:
+        if ttl not in _shared_metadata_caches:
+            _shared_metadata_caches[ttl] = RelationMetadataCache(ttl=ttl)
+
+        return _shared_metadata_caches[ttl]
+
+
+class RelationHelper(BaseRelationHelper):
+    def __init__(
+        self,
+        client: bigquery.client.Client,
+        metadata_cache: Optional[RelationMetadataCache] = None,
+        metadata_backend: str = METADATA_BACKEND_INFORMATION_SCHEMA,
+    ):
+        if metadata_backend not in METADATA_BACKENDS:
+            raise ValueError(
+                f"Metadata backend must be one of {METADATA_BACKENDS}, `{metadata_backend}` supplied"
+            )
+
+        self._client = client
+        self._metadata_cache = (
+            metadata_cache if metadata_cache is not None else RelationMetadataCache()
+        )
+        self._metadata_backend = metadata_backend
+
+    @property
+    def metadata_cache(self) -> RelationMetadataCache:
+        return self._metadata_cache
+
+    def invalidate(self, relations: List[BaseRelation]):
+        """
+        Must be called for every relation a statement may have created, altered or dropped
+        """
+        self._metadata_cache.invalidate(relations=relations)
+
+    def get_relations_metadata(
+        self, relations: List[BaseRelation]
+    ) -> Dict[BaseRelation, RelationMetadata]:
+        metadata = {}
+        missing = []
+        for relation in relations:
+            cached = self._metadata_cache.get(relation=relation)
+            if cached is None:
+                missing.append(relation)
+            else:
+                metadata[relation] = cached
+
+        if missing:
+            fetched = self.fetch_relations_metadata(relations=missing)
+            for relation, relation_metadata in fetched.items():
+                self._metadata_cache.set(relation=relation, metadata=relation_metadata)
+            metadata.update(fetched)
+
+        return metadata
+
+    def fetch_relations_metadata(
+        self, relations: List[BaseRelation]
+    ) -> Dict[BaseRelation, RelationMetadata]:
+        if self._metadata_backend == METADATA_BACKEND_TABLES_API:
+            metadata = self.fetch_relations_metadata_from_tables_api(
+                relations=relations
+            )
+            if metadata is not None:
+                return metadata
+
+        return self.fetch_relations_metadata_from_information_schema(
+            relations=relations
+        )
+
+    def fetch_relations_metadata_from_tables_api(
+        self, relations: List[BaseRelation]
+    ) -> Optional[Dict[BaseRelation, RelationMetadata]]:
+        """
+        Fetch the metadata of all relations with `tables.get`, one lightweight API call per
+        relation rather than a query job.
+
+        Ingestion time partitioned tables only expose their `_PARTITIONTIME` pseudo column
+        in INFORMATION_SCHEMA, when one is found or an API call fails, None is returned so
+        that the whole batch is fetched from INFORMATION_SCHEMA instead and all relations
+        are compared on the same basis
+
+        :param relations: Relations to be looked up
+        :return: Metadata by relation or None
+        """
+        metadata = {}
+        for relation in relations:
+            table_id = f"{relation.database}.{relation.schema}.{relation.identifier}"
+            try:
+                table = self._client.get_table(table_id)
+            except NotFound:
+                metadata[relation] = RelationMetadata(exists=False)
+                continue
+            except GoogleAPICallError as e:
+                logging.warning(
+                    f"Unable to get `{table_id}` from the tables API, "
+                    f"falling back to INFORMATION_SCHEMA: {e}"
+                )
+                return None
+
+            if (
+                table.time_partitioning is not None
+                and table.time_partitioning.field is None
+            ):
+                return None
+
+            metadata[relation] = relation_metadata_from_table(table=table)
+
+        return metadata
+
+    def fetch_relations_metadata_from_information_schema(
+        self, relations: List[BaseRelation]
+    ) -> Dict[BaseRelation, RelationMetadata]:
+        """
+        Fetch the TABLES and COLUMNS metadata of all relations, using one query per dataset
+
+        :param relations: Relations to be looked up
+        :return: Metadata by relation, relations not found are returned with `exists=False`
+        """
+        relations_by_dataset = defaultdict(list)
+        for relation in relations:
+            relations_by_dataset[(relation.database, relation.schema)].append(relation)
+
+        metadata = {}
+        for (database, schema), dataset_relations in relations_by_dataset.items():
+            query = f"""
+        SELECT t.table_name, c.column_name, c.is_nullable, c.data_type, c.is_partitioning_column
+        FROM {database}.{schema}.INFORMATION_SCHEMA.TABLES AS t
+        LEFT JOIN {database}.{schema}.INFORMATION_SCHEMA.COLUMNS AS c
+        ON c.table_name = t.table_name
+        WHERE t.table_name IN UNNEST(@table_names)
+        ORDER BY t.table_name, c.ordinal_position;
+"""
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ArrayQueryParameter(
+                        "table_names",
+                        "STRING",
+                        sorted({r.identifier for r in dataset_relations}),
+                    )
+                ]
+            )
+
+            existing_tables = set()
+            columns = defaultdict(list)
+            for row in self._client.query(query=query, job_config=job_config):
+                existing_tables.add(row["table_name"])
+                if row["column_name"] is not None:
+                    columns[row["table_name"]].append(
+                        ColumnMetadata(
+                            name=row["column_name"],
+                            data_type=row["data_type"],
+                            is_nullable=row["is_nullable"],
+                            is_partitioning_column=row["is_partitioning_column"],
+                        )
+                    )
+
+            for relation in dataset_relations:
+                metadata[relation] = RelationMetadata(
+                    exists=relation.identifier in existing_tables,
+                    columns=tuple(columns[relation.identifier]),
+                )
+
+        return metadata
+
+    def fetch_partition_ids(self, relation: BaseRelation) -> List[str]:
+        """
+        Fetch the ids of the partitions of `relation` holding rows, i.e. `20210101` for a
+        daily partition or `__NULL__`. Partitions are read from INFORMATION_SCHEMA, the
+        table itself is not scanned
+
+        :param relation: A partitioned relation
+        :return: Sorted partition ids
+        """
         query = f"""
-                SELECT column_name FROM {relation.database}.{relation.schema}.INFORMATION_SCHEMA.COLUMNS
-                WHERE table_name = '{relation.identifier}' ORDER BY ordinal_position;
+        SELECT partition_id
+        FROM {relation.database}.{relation.schema}.INFORMATION_SCHEMA.PARTITIONS
+        WHERE table_name = @table_name AND total_rows > 0
+        ORDER BY partition_id;
 """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter(
+                    "table_name", "STRING", relation.identifier
+                )
+            ]
+        )
+
+        return [
+            row["partition_id"]
+            for row in self._client.query(query=query, job_config=job_config)
+        ]
 
-        return [x["column_name"] for x in self._client.query(query=query)]
+    def snapshot(self, relations: List[BaseRelation]) -> RelationMetadataSnapshot:
+        """
+        Take a snapshot of the metadata of all relations, so that the materialization macros
+        can be rendered without querying INFORMATION_SCHEMA again
+        """
+        return RelationMetadataSnapshot(
+            metadata=self.get_relations_metadata(relations=relations),
+            relation_helper=self,
+        )
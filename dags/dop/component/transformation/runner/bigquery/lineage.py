@@ -0,0 +1,147 @@
+import dataclasses
+
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from dop.component.transformation.common.adapter import schema
+from dop.component.transformation.runner.bigquery.adapter.relation import (
+    BigQueryRelation as Relation,
+)
+from dop.component.transformation.runner.bigquery.task_runner import (
+    create_relation_from_task,
+)
+
+# Targets of materializations which can be read by other tasks
+READABLE_TARGETS = ["table", "view"]
+
+
+@dataclasses.dataclass(frozen=True)
+class TaskReference:
+    transformation: str
+    identifier: str
+
+
+class LineageIndex:
+    """
+    Which task materializes each relation and which relations each task reads, across all
+    valid and enabled transformations
+    """
+
+    def __init__(self, transformations: List[Dict[str, Any]]):
+        """
+        :param transformations: Transformations as returned by `load_transformations`
+        """
+        self.producers: Dict[Relation, List[TaskReference]] = defaultdict(list)
+        self.reads: Dict[TaskReference, List[Relation]] = {}
+        self.dag_configs: Dict[str, schema.DagConfig] = {}
+
+        for details in transformations:
+            if "error" in details or not details["dag_config"].enabled:
+                continue
+
+            transformation = details["transformation"]
+            dag_config = details["dag_config"]
+            self.dag_configs[transformation] = dag_config
+            for task in dag_config.tasks:
+                reference = TaskReference(
+                    transformation=transformation, identifier=task.identifier
+                )
+                if (
+                    task.kind.action == schema.TASK_KIND_MATERI
+                    and task.kind.target in READABLE_TARGETS
+                ):
+                    self.producers[create_relation_from_task(task=task)].append(
+                        reference
+                    )
+
+                self.reads[reference] = [
+                    Relation(database=database, schema=schema_, identifier=identifier)
+                    for database, schema_, identifier in details.get(
+                        "references", {}
+                    ).get(task.identifier, [])
+                ]
+
+    def upstream_tasks(self, transformation, identifier) -> List[TaskReference]:
+        """
+        Tasks materializing the relations read by a task, other than the task itself
+        """
+        reference = TaskReference(transformation=transformation, identifier=identifier)
+        upstream = []
+        for relation in self.reads.get(reference, []):
+            for producer in self.producers.get(relation, []):
+                if producer != reference and producer not in upstream:
+                    upstream.append(producer)
+
+        return upstream
+
+    def inferred_dependencies(self, transformation) -> Dict[str, List[str]]:
+        """
+        Dependencies between tasks of the same transformation which are not declared
+        """
+        inferred = {}
+        for task in self.dag_configs[transformation].tasks:
+            dependencies = [
+                upstream.identifier
+                for upstream in self.upstream_tasks(transformation, task.identifier)
+                if upstream.transformation == transformation
+                and upstream.identifier not in task.dependencies
+            ]
+            if dependencies:
+                inferred[task.identifier] = dependencies
+
+        return inferred
+
+    def external_dependencies(self, transformation) -> Dict[str, List[TaskReference]]:
+        """
+        Tasks of other transformations materializing relations read by each task
+        """
+        external = {}
+        for task in self.dag_configs[transformation].tasks:
+            upstream = [
+                upstream
+                for upstream in self.upstream_tasks(transformation, task.identifier)
+                if upstream.transformation != transformation
+            ]
+            if upstream:
+                external[task.identifier] = upstream
+
+        return external
+
+    def is_aligned(self, transformation, other_transformation) -> bool:
+        """
+        Runs of two transformations can be matched by execution date when they are
+        scheduled at the same time
+        """
+        dag_config = self.dag_configs[transformation]
+        other_dag_config = self.dag_configs[other_transformation]
+        schedule = (dag_config.schedule_interval, dag_config.timezone)
+        other_schedule = (other_dag_config.schedule_interval, other_dag_config.timezone)
+
+        return dag_config.schedule_interval is not None and schedule == other_schedule
+
+
+def with_inferred_dependencies(
+    dag_config: schema.DagConfig, inferred: Dict[str, List[str]]
+) -> schema.DagConfig:
+    """
+    Add inferred dependencies to the tasks of a DAG config, which is validated again
+
+    :raises InvalidDagConfig: if the dependencies can't be added, i.e. they introduce a cycle
+    """
+    if not inferred:
+        return dag_config
+
+    dag_config = dataclasses.replace(
+        dag_config,
+        tasks=[
+            dataclasses.replace(
+                task, dependencies=task.dependencies + inferred.get(task.identifier, [])
+            )
+            for task in dag_config.tasks
+        ],
+    )
+    schema.dependency_validation_func(dag_config)
+    if dag_config.grouped_execution is not None:
+        schema.grouped_execution_validation_func(dag_config)
+
+    return dag_config
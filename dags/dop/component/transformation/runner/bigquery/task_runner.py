@@ -0,0 +1,183 @@
+import logging
+
+from typing import Any, Dict
+
+from dop.component.transformation.common.adapter import schema
+from dop.component.transformation.runner.bigquery.adapter.impl import QueryRunner
+from dop.component.transformation.runner.bigquery.adapter.relation import (
+    BigQueryRelation as Relation,
+)
+
+
+def create_relation_from_task(task):
+    relation = Relation(
+        database=task.database, schema=task.schema, identifier=task.identifier
+    )
+
+    return relation
+
+
+def get_dag_run_conf(airflow_context) -> Dict[str, Any]:
+    dag_run = airflow_context.get("dag_run")
+    return dag_run.conf if dag_run is not None and dag_run.conf else {}
+
+
+def get_boolean_conf(airflow_context, key) -> bool:
+    value = get_dag_run_conf(airflow_context).get(key, False)
+
+    if type(value) != bool:
+        raise RuntimeError(
+            f"Dag config `{key}` must be set to either `true` or `false` (as a boolean value)."
+        )
+
+    return value
+
+
+def template_task(task: schema.Task) -> Dict[str, Any]:
+    """
+    Attributes of a task available as `task` when its SQL is rendered, the same as the
+    ones of the Airflow operator running the task
+    """
+    return {
+        **task.__dict__,
+        "action": task.kind.action,
+        "target": task.kind.target,
+        "arguments": task.options.get("arguments"),
+    }
+
+
+def exec_replace_or_upsert(task: schema.Task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    relation = create_relation_from_task(task=task)
+    sql = airflow_context["templates_dict"]["sql"]
+
+    full_refresh = get_boolean_conf(airflow_context, key="full_refresh")
+
+    logging.info(f"### IS FULL REFRESH ENABLED: {full_refresh}")
+
+    runner.replace_or_upsert(
+        query=sql,
+        relation=relation,
+        options={
+            "partition_key": task.partitioning.field if task.partitioning else None,
+            "partition_data_type": task.partitioning.data_type
+            if task.partitioning
+            else None,
+            "full_refresh": full_refresh,
+            "incremental_strategy": task.options.get("incremental_strategy"),
+        },
+    )
+
+
+def exec_recreate_stored_procedure(task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    relation = create_relation_from_task(task=task)
+    sql = airflow_context["templates_dict"]["sql"]
+
+    arguments = task.options.get("arguments", [])
+    runner.recreate_stored_procedure(arguments=arguments, query=sql, relation=relation)
+
+
+def exec_recreate_udf(task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    relation = create_relation_from_task(task=task)
+    sql = airflow_context["templates_dict"]["sql"]
+
+    arguments = task.options.get("arguments", [])
+    runner.recreate_udf(arguments=arguments, query=sql, relation=relation)
+
+
+def exec_recreate_view(task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    relation = create_relation_from_task(task=task)
+    sql = airflow_context["templates_dict"]["sql"]
+
+    runner.recreate_view(query=sql, relation=relation)
+
+
+def exec_call_stored_procedure(task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    sql = airflow_context["templates_dict"]["sql"]
+
+    runner.call_stored_procedure(query=sql)
+
+
+def assertion_options(task) -> Dict[str, Any]:
+    return {
+        key: task.options[key]
+        for key in schema.ASSERTION_OPTIONS
+        if task.options.get(key) is not None
+    }
+
+
+def exec_assertion(task, runner: QueryRunner, **kwargs):
+    airflow_context = kwargs["airflow_context"]
+    sql = airflow_context["templates_dict"]["sql"]
+
+    runner.assertion(query=sql, options=assertion_options(task=task))
+
+
+def poke_assertion(task, runner: QueryRunner, sql) -> bool:
+    """
+    Evaluate the assertion of an assertion sensor once
+
+    :return: True if every row of the assertion succeeded
+    """
+    max_bytes_per_poke = task.options.get("max_bytes_per_poke")
+    estimated_bytes = runner.estimate_bytes(query=sql)
+    logging.info(f"Each poke processes an estimated {estimated_bytes} bytes")
+
+    if max_bytes_per_poke and estimated_bytes > max_bytes_per_poke:
+        raise RuntimeError(
+            f"Assertion sensor `{task.identifier}` would process {estimated_bytes} bytes "
+            f"per poke, more than `max_bytes_per_poke` ({max_bytes_per_poke})"
+        )
+
+    summary = runner.evaluate_assertion(query=sql, options=assertion_options(task=task))
+
+    return summary is None or not summary.failed
+
+
+def exec_create_schema(task, runner: QueryRunner, **kwargs):
+    runner.create_schema(project_id=task.database, dataset_id=task.schema)
+
+
+def runner_caller(runner: QueryRunner, task: schema.Task, **kwargs):
+    func = None
+
+    if task.kind.action == schema.TASK_KIND_MATERI:
+        if task.kind.target == "table":
+            func = exec_replace_or_upsert
+        elif task.kind.target == "stored_procedure":
+            func = exec_recreate_stored_procedure
+        elif task.kind.target == "view":
+            func = exec_recreate_view
+        elif task.kind.target == "udf":
+            func = exec_recreate_udf
+        elif task.kind.target == "schema":
+            func = exec_create_schema
+        else:
+            raise NotImplementedError(
+                f"Task Kind: {task.kind.__dict__} is not supported"
+            )
+
+    elif task.kind.action == schema.TASK_KIND_INVOKE:
+        if task.kind.target == "stored_procedure":
+            func = exec_call_stored_procedure
+        else:
+            raise NotImplementedError(
+                f"Task Kind: {task.kind.__dict__} is not supported"
+            )
+
+    elif task.kind.action == schema.TASK_KIND_ASSERT:
+        # A sensor is evaluated once when run outside of Airflow, i.e. in a dry run
+        if task.kind.target in ("assertion", schema.ASSERTION_SENSOR_TARGET):
+            func = exec_assertion
+        else:
+            raise NotImplementedError(
+                f"Task Kind: {task.kind.__dict__} is not supported"
+            )
+    else:
+        raise NotImplementedError(f"Task Kind: {task.kind.__dict__} is not supported")
+
+    func(task=task, runner=runner, **kwargs)
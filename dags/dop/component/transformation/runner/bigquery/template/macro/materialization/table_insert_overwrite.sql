@@ -0,0 +1,41 @@
+{% import 'adapter.sql' as adapter %}
+
+{% macro insert_overwrite(query, relation_helper, options) %}
+    {%- set relation = options['relation'] -%}
+    {%- set tmp_relation = options['tmp_relation'] -%}
+    {%- set relation_exists = relation_helper.check_relation_exists(relation) -%}
+    {%- set tmp_relation_exists = relation_helper.check_relation_exists(tmp_relation) -%}
+    {%- set columns_of_relation = relation_helper.get_columns_of_relation(relation) -%}
+    {%- set partition_config = options['partition_config'] -%}
+    {%- set partitions = options['partitions'] -%}
+    {%- set full_refresh = options['full_refresh'] -%}
+
+    {# -- Only replace partitions if tmp relation is produced and we already have an existing relation. This is not applicable for full refresh #}
+    {%- if tmp_relation_exists and relation_exists and not full_refresh -%}
+        {%- if partition_config is none -%}
+            {{ raise('`insert_overwrite` requires the relation to be partitioned') }}
+        {%- endif -%}
+
+        {%- if not relation_helper.check_if_schemas_match(tmp_relation, relation) -%}
+            {{ raise('Schema is backwards incompatible, when making schema changes, a full refresh is required') }}
+        {%- endif -%}
+
+        {# -- Partitions are filtered with literals so only the replaced partitions are touched #}
+        {%- if partitions -%}
+            begin transaction;
+
+            delete from {{ relation }}
+            where {{ partition_config.render_partition_filter(partitions) }};
+
+            insert into {{ relation }}
+            ({% for col in columns_of_relation %}`{{ col }}`{{ "," if not loop.last }}{% endfor %})
+            select {% for col in columns_of_relation %}`{{ col }}`{{ "," if not loop.last }}{% endfor %}
+            from {{ tmp_relation }};
+
+            commit transaction;
+        {%- endif -%}
+
+    {%- endif -%}
+    {# -- Always try to drop the tmp table #}
+    drop table if exists {{ tmp_relation }};
+{% endmacro %}
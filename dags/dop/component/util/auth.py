@@ -1,4 +1,31 @@
+import datetime
+import threading
+
 from google.auth import impersonated_credentials, default
+from google.auth.transport.requests import Request
+
+# Credentials are refreshed when they are due to expire within this period
+REFRESH_MARGIN = datetime.timedelta(seconds=120)
+
+_target_credentials = {}
+_target_credentials_lock = threading.Lock()
+
+
+def refresh_if_expiring(credentials, margin: datetime.timedelta = REFRESH_MARGIN):
+    """
+    Refresh credentials that are invalid or about to expire, rather than letting the first
+    request after expiry pay for it
+    """
+    if credentials is None or not hasattr(credentials, "refresh"):
+        return
+
+    expiry = getattr(credentials, "expiry", None)
+    if credentials.valid and (
+        expiry is None or expiry - datetime.datetime.utcnow() > margin
+    ):
+        return
+
+    credentials.refresh(Request())
 
 
 class ServiceAccountImpersonationCredentialManager:
@@ -9,17 +36,26 @@ class ServiceAccountImpersonationCredentialManager:
         self._project_id = project_id
 
     def get_target_credentials(self):
+        """
+        Impersonated credentials are created once per service account and process,
+        and refreshed by their users when they are about to expire
+        """
         impersonated_sa = (
             f"{self._source_sa_name}@{self._project_id}.iam.gserviceaccount.com"
         )
-        source_credentials, _ = default()
-
-        target_credentials = impersonated_credentials.Credentials(
-            source_credentials=source_credentials,
-            target_principal=impersonated_sa,
-            target_scopes=self.target_scopes,
-            delegates=[],
-            lifetime=500,
-        )
 
-        return target_credentials
+        with _target_credentials_lock:
+            if impersonated_sa not in _target_credentials:
+                source_credentials, _ = default()
+
+                _target_credentials[
+                    impersonated_sa
+                ] = impersonated_credentials.Credentials(
+                    source_credentials=source_credentials,
+                    target_principal=impersonated_sa,
+                    target_scopes=self.target_scopes,
+                    delegates=[],
+                    lifetime=500,
+                )
+
+            return _target_credentials[impersonated_sa]
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery, storage
+from requests.adapters import HTTPAdapter
+
+from dop.component.util import auth
+
+# Connections kept alive per host, BigQuery clients may be shared by many threads
+HTTP_POOL_MAXSIZE = 32
+
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+_clients_pid = os.getpid()
+
+
+def credential_identity(credentials) -> str:
+    """
+    Identity of the principal behind a set of credentials, used to key cached clients
+    """
+    if credentials is None:
+        return "default"
+
+    service_account_email = getattr(credentials, "service_account_email", None)
+    if service_account_email:
+        return service_account_email
+
+    return f"{type(credentials).__name__}:{id(credentials)}"
+
+
+def get_authorized_session(credentials, scopes) -> AuthorizedSession:
+    """
+    An HTTP session refreshing `credentials` when required, with a connection pool large
+    enough to be shared across threads
+    """
+    if credentials is None:
+        credentials, _ = google.auth.default(scopes=scopes)
+
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def _get_or_create(key: Tuple, factory: Callable[[], Any]):
+    global _clients_pid
+
+    with _clients_lock:
+        # Connections must not be shared with a forked process
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+
+        if key not in _clients:
+            logging.info(f"Creating a new client for {key}")
+            _clients[key] = factory()
+
+        return _clients[key]
+
+
+def get_bigquery_client(
+    project_id, location=None, credentials=None
+) -> bigquery.client.Client:
+    """
+    A BigQuery client shared by every caller of the process using the same project,
+    location and principal
+    """
+    auth.refresh_if_expiring(credentials=credentials)
+
+    return _get_or_create(
+        key=("bigquery", project_id, location, credential_identity(credentials)),
+        factory=lambda: bigquery.client.Client(
+            project=project_id,
+            location=location,
+            credentials=credentials,
+            _http=get_authorized_session(
+                credentials=credentials, scopes=bigquery.client.Client.SCOPE
+            ),
+        ),
+    )
+
+
+def get_storage_client(project_id=None, credentials=None) -> storage.Client:
+    """
+    A Cloud Storage client shared by every caller of the process using the same project
+    and principal
+    """
+    auth.refresh_if_expiring(credentials=credentials)
+
+    return _get_or_create(
+        key=("storage", project_id, None, credential_identity(credentials)),
+        factory=lambda: storage.Client(
+            project=project_id,
+            credentials=credentials,
+            _http=get_authorized_session(
+                credentials=credentials, scopes=storage.Client.SCOPE
+            ),
+        ),
+    )
+
+
+def clear(key: Optional[Tuple] = None):
+    """
+    Drop one or all cached clients
+    """
+    with _clients_lock:
+        if key is None:
+            _clients.clear()
+        else:
+            _clients.pop(key, None)
@@ -0,0 +1,147 @@
+import codecs
+import json
+import re
+
+from typing import Any, BinaryIO, Dict, Iterator, List
+
+# Characters read from an artifact at a time, JSON values are decoded one at a time so the
+# memory used is bounded by the largest value streamed rather than by the artifact size
+CHUNK_SIZE = 1024 * 1024
+WHITESPACE = " \t\n\r"
+# Characters which may follow a value, a number is only complete once one is buffered
+DELIMITER = re.compile(r"[,}\]\s]")
+
+
+class _JsonScanner:
+    """
+    Decode the top-level fields of a JSON object one at a time from a byte stream, the items
+    of streamed array fields being decoded one at a time as well
+    """
+
+    def __init__(self, fp: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self._reader = codecs.getreader("utf-8")(fp)
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        Read more characters, at least as many as already buffered so that a value spanning
+        many chunks is only decoded a logarithmic number of times
+
+        :return: False at the end of the stream
+        """
+        if self._eof:
+            return False
+
+        remaining = self._buffer[self._pos :]
+        chunk = self._reader.read(max(self._chunk_size, len(remaining)))
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = remaining + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos : self._pos + 1]
+
+    def _expect(self, characters) -> str:
+        character = self._peek()
+        if not character or character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r}, got {character!r} in JSON artifact"
+            )
+
+        self._pos += 1
+        return character
+
+    def value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+
+            # A number may continue in the next chunk, i.e. `12` of `12.5`
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and not DELIMITER.search(self._buffer, end)
+                and self._fill()
+            ):
+                continue
+
+            self._pos = end
+            return value
+
+    def _items(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self.value()
+            if self._expect(",]") == "]":
+                return
+
+    def fields(self, streamed_keys: List[str]) -> Iterator:
+        """
+        :return: (key, value) pairs, the values of `streamed_keys` being iterators over
+        their items when they are arrays, exhausted before the next field is decoded
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            key = self.value()
+            self._expect(":")
+            if key in streamed_keys and self._peek() == "[":
+                items = self._items()
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, self.value()
+
+            if self._expect(",}") == "}":
+                return
+
+
+def iter_items(fp: BinaryIO, key, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Items of a top-level array field of a JSON artifact, i.e. `results` of
+    `run_results.json`, decoded lazily
+    """
+    for field, value in _JsonScanner(fp, chunk_size=chunk_size).fields([key]):
+        if field == key:
+            yield from value
+            return
+
+
+def read_fields(
+    fp: BinaryIO, skipped_keys: List[str], chunk_size: int = CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Top-level fields of a JSON artifact other than `skipped_keys`, skipped arrays are read
+    through without being held in memory
+    """
+    return {
+        field: value
+        for field, value in _JsonScanner(fp, chunk_size=chunk_size).fields(skipped_keys)
+        if field not in skipped_keys
+    }
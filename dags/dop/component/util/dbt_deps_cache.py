@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+
+from typing import List, Optional
+
+import yaml
+
+from dop.component.util import files
+
+# Only the standard library and PyYAML are used by this module and `files`, it is also used
+# when the DBT executor image is built
+PACKAGE_FILES = ["packages.yml", "package-lock.yml"]
+KEY_FILE = ".dop-deps-key"
+TARBALL_SUFFIX = ".tar.gz"
+
+
+def packages_install_path(project_path, dbt_version) -> str:
+    """
+    Where `dbt deps` installs packages, `dbt_modules` before DBT 1.0 and `dbt_packages` since,
+    unless set in `dbt_project.yml`
+    """
+    with open(os.path.join(project_path, "dbt_project.yml")) as fp:
+        dbt_project = yaml.safe_load(fp) or {}
+
+    major_version = int(dbt_version.split(".")[0])
+    install_path = dbt_project.get("packages-install-path") or dbt_project.get(
+        "modules-path"
+    )
+
+    return os.path.join(
+        project_path,
+        install_path or ("dbt_packages" if major_version >= 1 else "dbt_modules"),
+    )
+
+
+def deps_key(project_path, dbt_version) -> Optional[str]:
+    """
+    :return: The cache key of the packages of a project, None if it has no packages
+    """
+    digest = hashlib.sha256(f"dbt=={dbt_version}".encode())
+    has_packages = False
+    for package_file in PACKAGE_FILES:
+        package_file_path = os.path.join(project_path, package_file)
+        if os.path.isfile(package_file_path):
+            has_packages = True
+            digest.update(package_file.encode())
+            with open(package_file_path, "rb") as fp:
+                digest.update(hashlib.sha256(fp.read()).digest())
+
+    return digest.hexdigest() if has_packages else None
+
+
+def installed_key(project_path, dbt_version) -> Optional[str]:
+    key_file = os.path.join(packages_install_path(project_path, dbt_version), KEY_FILE)
+    if not os.path.isfile(key_file):
+        return None
+
+    with open(key_file) as fp:
+        return fp.read().strip()
+
+
+def is_up_to_date(project_path, dbt_version) -> bool:
+    """
+    Packages installed in the project are the ones of its current `packages.yml`
+    """
+    key = deps_key(project_path, dbt_version)
+    return key is None or installed_key(project_path, dbt_version) == key
+
+
+def restore(project_path, dbt_version, cache_paths: List[str]) -> bool:
+    """
+    Install the packages of a project from the first cache holding them, without network
+    access. Packages are extracted next to the project and then moved in place
+
+    :param cache_paths: Directories holding cached packages, i.e. a local cache and a
+    directory baked into an image
+    :return: True if the packages are up to date
+    """
+    if is_up_to_date(project_path, dbt_version):
+        return True
+
+    key = deps_key(project_path, dbt_version)
+    install_path = packages_install_path(project_path, dbt_version)
+    for cache_path in cache_paths:
+        tarball = os.path.join(cache_path, key + TARBALL_SUFFIX)
+        if not os.path.isfile(tarball):
+            continue
+
+        tmp_path = tempfile.mkdtemp(dir=project_path, prefix=".dop_deps")
+        try:
+            with tarfile.open(tarball) as tar:
+                tar.extractall(tmp_path)
+            with open(os.path.join(tmp_path, KEY_FILE), "w") as fp:
+                fp.write(key)
+
+            shutil.rmtree(install_path, ignore_errors=True)
+            os.replace(tmp_path, install_path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        logging.info(f"Restored DBT packages from {tarball}")
+        return True
+
+    return False
+
+
+def store(project_path, dbt_version, cache_path) -> Optional[str]:
+    """
+    Add the packages installed in a project by `dbt deps` to a cache, and flag them as
+    installed for the current `packages.yml`
+
+    :return: The path of the cached tarball, None if the project has no packages
+    """
+    key = deps_key(project_path, dbt_version)
+    install_path = packages_install_path(project_path, dbt_version)
+    if key is None or not os.path.isdir(install_path):
+        return None
+
+    with open(os.path.join(install_path, KEY_FILE), "w") as fp:
+        fp.write(key)
+
+    os.makedirs(cache_path, exist_ok=True)
+    tarball = os.path.join(cache_path, key + TARBALL_SUFFIX)
+    with files.atomic_write(tarball) as fp:
+        with tarfile.open(fileobj=fp, mode="w:gz") as tar:
+            for name in sorted(os.listdir(install_path)):
+                if name != KEY_FILE:
+                    tar.add(os.path.join(install_path, name), arcname=name)
+
+    logging.info(f"Stored DBT packages in {tarball}")
+    return tarball
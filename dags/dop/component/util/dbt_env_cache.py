@@ -0,0 +1,196 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from contextlib import contextmanager
+from typing import List, Optional
+
+from dop.component.util import files
+
+READY_FILE = ".dop-ready"
+LOCK_SUFFIX = ".lock"
+# An environment handed out within this period may still be in use, it is never evicted
+IN_USE_GRACE_PERIOD = 6 * 60 * 60
+
+
+def environment_name(dbt_version: str, python_version: Optional[str] = None) -> str:
+    """
+    Name of the environment of a DBT version, environments built with another version of
+    Python are not shared
+    """
+    python_version = python_version or "{}.{}".format(*sys.version_info[:2])
+    digest = hashlib.sha256(f"dbt=={dbt_version}|python{python_version}".encode())
+
+    return f"dbt-{dbt_version}-{digest.hexdigest()[:12]}"
+
+
+def directory_size(path) -> int:
+    size = 0
+    for root, _, file_names in os.walk(path):
+        for file in file_names:
+            file_path = os.path.join(root, file)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+
+    return size
+
+
+@contextmanager
+def file_lock(lock_path, shared=False, blocking=True):
+    """
+    Hold an flock on `lock_path`, which is shared with other processes of the same host
+
+    :return: True if the lock is held, False if it is held by another process and
+    `blocking` is False
+    """
+    with open(lock_path, "a") as fp:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fp, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+def install_environment(path, dbt_version):
+    # The output of the installation goes to stderr, the caller reads the path of the
+    # environment from stdout
+    subprocess.check_call(["virtualenv", "-p", "python3", path], stdout=sys.stderr)
+    subprocess.check_call(
+        [os.path.join(path, "bin", "pip"), "install", f"dbt=={dbt_version}"],
+        stdout=sys.stderr,
+    )
+
+
+class DbtEnvCache:
+    """
+    Virtual environments with DBT installed, shared by all DBT tasks run on a host.
+
+    Each DBT version has its own environment, built once under an exclusive file lock so
+    that concurrent tasks wait for it rather than building it too. An environment is only
+    used once it is complete, which is flagged by a file written atomically at the end of
+    the build (virtual environments can't be moved once built). The least recently used
+    environments are removed when the cache is over its size budget.
+    """
+
+    def __init__(self, cache_path, max_size: int):
+        """
+        :param cache_path: Directory of the environments
+        :param max_size: Size budget of the cache in bytes
+        """
+        self._cache_path = cache_path
+        self._max_size = max_size
+
+    def _path(self, name) -> str:
+        return os.path.join(self._cache_path, name)
+
+    def _is_ready(self, name) -> bool:
+        return os.path.isfile(os.path.join(self._path(name), READY_FILE))
+
+    def _touch(self, name):
+        os.utime(os.path.join(self._path(name), READY_FILE))
+
+    def get(self, dbt_version) -> str:
+        """
+        :return: The path of the environment of `dbt_version`, built if needed
+        """
+        # Environments are executed, they must not be writable by other users
+        files.private_directory(self._cache_path)
+        name = environment_name(dbt_version=dbt_version)
+        path = self._path(name)
+
+        if not self._is_ready(name):
+            started_at = time.monotonic()
+            with file_lock(path + LOCK_SUFFIX):
+                # Another process may have built it while this one was waiting
+                if not self._is_ready(name):
+                    self._build(name=name, dbt_version=dbt_version)
+                    logging.info(
+                        f"Built DBT {dbt_version} environment in "
+                        f"{time.monotonic() - started_at:.1f}s"
+                    )
+
+            self.evict(keep=name)
+
+        self._touch(name)
+
+        return path
+
+    def _build(self, name, dbt_version):
+        path = self._path(name)
+        # Left over by an interrupted build
+        shutil.rmtree(path, ignore_errors=True)
+
+        try:
+            install_environment(path=path, dbt_version=dbt_version)
+
+            with files.atomic_write(os.path.join(path, READY_FILE), mode="w") as fp:
+                fp.write(str(directory_size(path)))
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+    def _size(self, name) -> int:
+        with open(os.path.join(self._path(name), READY_FILE)) as fp:
+            return int(fp.read() or 0)
+
+    def environments(self) -> List[str]:
+        """
+        Complete environments, least recently used first
+        """
+        names = [
+            name
+            for name in os.listdir(self._cache_path)
+            if not name.endswith(LOCK_SUFFIX) and self._is_ready(name)
+        ]
+
+        return sorted(
+            names,
+            key=lambda name: os.path.getmtime(
+                os.path.join(self._path(name), READY_FILE)
+            ),
+        )
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Remove the least recently used environments until the cache fits its size budget.
+        Environments being built or handed out recently are kept
+
+        :return: The names of the removed environments
+        """
+        names = self.environments()
+        sizes = {name: self._size(name) for name in names}
+        total_size = sum(sizes.values())
+        evicted = []
+
+        for name in names:
+            if total_size <= self._max_size:
+                break
+
+            last_used = os.path.getmtime(os.path.join(self._path(name), READY_FILE))
+            if name == keep or time.time() - last_used < IN_USE_GRACE_PERIOD:
+                continue
+
+            with file_lock(self._path(name) + LOCK_SUFFIX, blocking=False) as locked:
+                if not locked:
+                    continue
+
+                # The environment is not usable anymore as soon as the flag is removed
+                os.remove(os.path.join(self._path(name), READY_FILE))
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+            total_size -= sizes[name]
+            evicted.append(name)
+            logging.info(f"Evicted DBT environment {name}")
+
+        return evicted
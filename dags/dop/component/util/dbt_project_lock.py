@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from dop.component.transformation.common.adapter import schema
+
+
+def dbt_dags_by_project(transformations: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """
+    DAGs running DBT tasks in each DBT project, i.e.
+    {
+        "project1": {"dag1", "dag2"},
+        "project2": {"dag3"}
+    }
+    """
+    dbt_dags = defaultdict(set)
+    for details in transformations:
+        if "error" in details or not details["dag_config"].enabled:
+            continue
+
+        for task in details["dag_config"].tasks:
+            if task.kind.action == schema.TASK_KIND_DBT:
+                dbt_dags[task.options["project"]].add(
+                    "dop__{}".format(details["transformation"])
+                )
+
+    return dbt_dags
+
+
+def sibling_dag_ids(
+    dbt_dags: Dict[str, Set[str]], dag_id, dbt_projects: Iterable[str]
+) -> Set[str]:
+    """
+    Other DAGs running DBT tasks in any of the DBT projects of a DAG
+    """
+    return {
+        sibling_dag_id
+        for project in dbt_projects
+        for sibling_dag_id in dbt_dags.get(project, set())
+        if sibling_dag_id != dag_id
+    }
+
+
+def run_order(dag_run) -> Tuple:
+    """
+    DAG runs are ordered by start date, runs without a start date first. Ties are broken by
+    DAG and run id, so that of two runs exactly one is earlier than the other
+    """
+    return (
+        dag_run.start_date is not None,
+        dag_run.start_date.timestamp() if dag_run.start_date is not None else 0,
+        dag_run.dag_id,
+        dag_run.run_id,
+    )
+
+
+def earlier_runs(running, dag_run) -> List[str]:
+    """
+    :param running: Running DAG runs of the sibling DAGs
+    :param dag_run: The current DAG run
+    :return: The running DAG runs the current one waits for, as `<dag id>.<run id>`
+    """
+    return [
+        f"{run.dag_id}.{run.run_id}"
+        for run in running
+        if run_order(run) < run_order(dag_run)
+    ]
@@ -0,0 +1,68 @@
+import logging
+import os
+import shutil
+
+from typing import Optional
+
+from dop.component.util import files
+
+TARGET_FOLDER = "target"
+MANIFEST_FILE = "manifest.json"
+PARTIAL_PARSE_FILE = "partial_parse.msgpack"
+STATE_FILES = [MANIFEST_FILE, PARTIAL_PARSE_FILE]
+# Models modified since the previous successful run and their children, unmodified
+# parents are read from the relations of the previous run with `--defer`
+MODIFIED_SELECTOR = "state:modified+"
+
+
+def state_path(cache_path, project_name, target) -> str:
+    """
+    Each DBT command has its own state, i.e. `dbt test` selects the models modified since
+    the previous successful `dbt test` rather than since the previous `dbt run`
+    """
+    return os.path.join(cache_path, project_name, target.replace(" ", "_"))
+
+
+def restore(project_path, state_path, partial_parse: bool) -> Optional[str]:
+    """
+    Copy the parse results of the previous successful run to the project, unless it already
+    holds parse results of its own, so that DBT only parses the files changed since
+
+    :param partial_parse: If the parse results are restored
+    :return: The path of the state of the previous successful run, None if there is none
+    """
+    target_path = os.path.join(project_path, TARGET_FOLDER)
+    partial_parse_path = os.path.join(state_path, PARTIAL_PARSE_FILE)
+    if (
+        partial_parse
+        and os.path.isfile(partial_parse_path)
+        and not os.path.isfile(os.path.join(target_path, PARTIAL_PARSE_FILE))
+    ):
+        os.makedirs(target_path, exist_ok=True)
+        shutil.copyfile(
+            partial_parse_path, os.path.join(target_path, PARTIAL_PARSE_FILE)
+        )
+        logging.info(f"Restored DBT parse results from {partial_parse_path}")
+
+    if not os.path.isfile(os.path.join(state_path, MANIFEST_FILE)):
+        return None
+
+    return state_path
+
+
+def store(project_path, state_path):
+    """
+    Keep the manifest and parse results of a successful run, a concurrent run may be
+    reading the previous ones
+    """
+    os.makedirs(state_path, exist_ok=True)
+    for state_file in STATE_FILES:
+        file_path = os.path.join(project_path, TARGET_FOLDER, state_file)
+        if not os.path.isfile(file_path):
+            continue
+
+        with open(file_path, "rb") as source:
+            with files.atomic_write(os.path.join(state_path, state_file)) as fp:
+                shutil.copyfileobj(source, fp)
+
+    logging.info(f"Stored DBT state in {state_path}")
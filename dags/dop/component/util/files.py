@@ -0,0 +1,58 @@
+import os
+import stat
+import tempfile
+
+from contextlib import contextmanager
+
+
+def is_private(path) -> bool:
+    """
+    A file or directory can only be modified by the current user if it is owned by them
+    and not writable by anyone else. Cached files are loaded (i.e. unpickled) or executed,
+    so they must not be writable by other users of the host
+    """
+    path_stat = os.lstat(path)
+
+    return (
+        not stat.S_ISLNK(path_stat.st_mode)
+        and path_stat.st_uid == os.getuid()
+        and not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    )
+
+
+def private_directory(path) -> str:
+    """
+    Create a directory only accessible by the current user, an existing directory must be
+    private too
+
+    :raises PermissionError: If the directory is not private, i.e. it was created by
+    another user
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not os.path.isdir(path) or not is_private(path):
+        raise PermissionError(
+            f"`{path}` must be a directory owned by the current user and not writable "
+            f"by others"
+        )
+
+    return path
+
+
+@contextmanager
+def atomic_write(path, mode="wb"):
+    """
+    Write a file next to `path` and move it in place once complete, so that a concurrent
+    reader sees either the previous or the new file. Nothing is written on error
+
+    :return: The file object to write to
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}")
+    try:
+        with os.fdopen(fd, mode) as fp:
+            yield fp
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
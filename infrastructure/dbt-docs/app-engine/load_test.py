@@ -0,0 +1,213 @@
+"""
+Load test of the dbt docs app against a local stand-in of the docs bucket.
+
+The bucket is a local folder holding a synthetic manifest, downloads from it are slowed
+down to simulate GCS latency and bandwidth. Each scenario sends requests from several
+threads and reports latencies, the size of the responses and the bytes read from the
+bucket.
+
+    python load_test.py [--app=main.py] [--manifest_mb=50] [--requests=200]
+"""
+import argparse
+import concurrent.futures
+import importlib.util
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from unittest import mock
+
+WORDS = ["select", "from", "where", "join", "order_id", "customer_id", "amount", "date"]
+
+
+class LocalBlob:
+    def __init__(self, bucket, path):
+        self._bucket = bucket
+        self._path = os.path.join(bucket.root, path)
+
+    @property
+    def generation(self):
+        return os.stat(self._path).st_mtime_ns
+
+    @property
+    def size(self):
+        return os.path.getsize(self._path)
+
+    def download_as_bytes(self, start=None, end=None, **kwargs):
+        with open(self._path, "rb") as fp:
+            fp.seek(start or 0)
+            content = fp.read() if end is None else fp.read(end - (start or 0) + 1)
+
+        self._bucket.record(len(content))
+        return content
+
+
+class LocalBucket:
+    def __init__(self, root, latency, bandwidth):
+        self.root = root
+        self._latency = latency
+        self._bandwidth = bandwidth
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.downloaded = 0
+
+    def record(self, size):
+        with self._lock:
+            self.calls += 1
+            self.downloaded += size
+        time.sleep(self._latency + size / self._bandwidth)
+
+    def blob(self, path):
+        return LocalBlob(self, path)
+
+    def get_blob(self, path):
+        if not os.path.exists(os.path.join(self.root, path)):
+            return None
+
+        self.record(0)
+        return LocalBlob(self, path)
+
+
+def generate_docs(root, manifest_mb):
+    random.seed(0)
+    with open(os.path.join(root, "manifest.json"), "w") as fp:
+        fp.write('{"nodes": {')
+        i = 0
+        while fp.tell() < manifest_mb * 1024 * 1024:
+            node = {
+                "unique_id": f"model.dbt_start.model_{i}",
+                "raw_sql": " ".join(random.choice(WORDS) for _ in range(200)),
+                "columns": {f"column_{c}": {"name": f"column_{c}"} for c in range(10)},
+            }
+            fp.write(("," if i else "") + f'"model_{i}": {json.dumps(node)}')
+            i += 1
+        fp.write("}}")
+
+    with open(os.path.join(root, "catalog.json"), "w") as fp:
+        json.dump({"nodes": {}}, fp)
+    with open(os.path.join(root, "index.html"), "w") as fp:
+        fp.write("<html>" + "<div>dbt docs</div>" * 10000 + "</html>")
+
+
+def load_app(app_path, local_bucket):
+    client = mock.Mock()
+    client.bucket.return_value = local_bucket
+    os.environ["DBT_BUCKET_NAME"] = "local-stand-in"
+    with mock.patch("google.cloud.storage.Client", return_value=client):
+        spec = importlib.util.spec_from_file_location("docs_app", app_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+    return module
+
+
+def run_scenario(module, local_bucket, name, requests, threads, headers):
+    local_bucket.calls = local_bucket.downloaded = 0
+    clients = threading.local()
+
+    def send(_):
+        if not hasattr(clients, "client"):
+            clients.client = module.app.test_client()
+        started_at = time.monotonic()
+        response = clients.client.get("/manifest.json", headers=headers)
+        size = len(response.get_data())
+        return time.monotonic() - started_at, response.status_code, size
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(send, range(requests)))
+
+    latencies = sorted(latency * 1000 for latency, _, _ in results)
+    print(
+        f"{name:<24} status {sorted(set(status for _, status, _ in results))}"
+        f"  p50 {statistics.median(latencies):8.1f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95) - 1]:8.1f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99) - 1]:8.1f} ms"
+        f"  response {statistics.mean(size for _, _, size in results) / 1024:9.1f} KB"
+        f"  bucket calls {local_bucket.calls:4d}"
+        f"  bucket read {local_bucket.downloaded / 1024 / 1024:8.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the dbt docs app")
+    parser.add_argument(
+        "--app",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"),
+    )
+    parser.add_argument("--manifest_mb", default=50, type=int)
+    parser.add_argument("--requests", default=200, type=int)
+    parser.add_argument("--threads", default=8, type=int)
+    parser.add_argument("--latency_ms", default=30, type=int)
+    parser.add_argument("--bandwidth_mbps", default=400, type=int)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_docs(root, manifest_mb=args.manifest_mb)
+        local_bucket = LocalBucket(
+            root,
+            latency=args.latency_ms / 1000,
+            bandwidth=args.bandwidth_mbps * 1024 * 1024 / 8,
+        )
+        module = load_app(args.app, local_bucket)
+        print(f"App: {args.app}, manifest: {args.manifest_mb} MB")
+
+        browser = {"Accept-Encoding": "gzip, deflate, br"}
+        # Concurrent requests for a file which is not cached yet
+        run_scenario(module, local_bucket, "cold", args.threads, args.threads, browser)
+        run_scenario(
+            module, local_bucket, "cached", args.requests, args.threads, browser
+        )
+
+        headers = (
+            module.app.test_client().get("/manifest.json", headers=browser).headers
+        )
+        if "ETag" in headers:
+            run_scenario(
+                module,
+                local_bucket,
+                "if-none-match",
+                args.requests,
+                args.threads,
+                {**browser, "If-None-Match": headers["ETag"]},
+            )
+
+        # Every request finds the cache expired while the manifest has not changed
+        module.CACHE_MAX_AGE_IN_SECONDS = -1
+        run_scenario(
+            module,
+            local_bucket,
+            "expired, unchanged",
+            max(args.requests // 10, 1),
+            args.threads,
+            browser,
+        )
+
+        # The manifest has changed when requests find the cache expired
+        os.utime(os.path.join(root, "manifest.json"))
+        run_scenario(
+            module,
+            local_bucket,
+            "expired, changed",
+            args.requests,
+            args.threads,
+            browser,
+        )
+
+        if hasattr(module, "STREAM_THRESHOLD_IN_BYTES"):
+            if hasattr(module, "revalidation_executor"):
+                # Wait for revalidations started by the previous scenarios
+                module.revalidation_executor.submit(int).result()
+            module.STREAM_THRESHOLD_IN_BYTES = 0
+            module.cache.clear()
+            run_scenario(
+                module,
+                local_bucket,
+                "streamed",
+                max(args.requests // 10, 1),
+                args.threads,
+                browser,
+            )
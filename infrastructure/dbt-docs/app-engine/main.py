@@ -1,10 +1,22 @@
+import dataclasses
+import gzip
 import os
+import threading
 import time
-from functools import lru_cache
+import zlib
 
-from flask import Flask
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
+
+from flask import Flask, Response, abort, request
 from google.cloud import storage
 
+# Brotli is preferred to gzip by browsers supporting it if installed, bodies are smaller
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
 
 # Bucket where dbt docs are stored
@@ -20,13 +32,46 @@ if not DBT_BUCKET_NAME:
 # Path in the bucket where dbt docs are stored
 DBT_BUCKET_PATH = os.getenv("DBT_BUCKET_PATH", "")
 
-# Bucket files will be cached during this period
-CACHE_MAX_AGE_IN_SECONDS = os.getenv("CACHE_MAX_AGE_IN_SECONDS", 300)
+# Cached files are revalidated against the bucket by a background thread at this interval
+REFRESH_INTERVAL_IN_SECONDS = int(os.getenv("REFRESH_INTERVAL_IN_SECONDS", 60))
+
+# Cached files not revalidated for this period, i.e. when the instance was idle, are still
+# served while they are revalidated in the background
+CACHE_MAX_AGE_IN_SECONDS = int(os.getenv("CACHE_MAX_AGE_IN_SECONDS", 300))
+
+# Files larger than this are streamed from the bucket rather than cached in memory
+STREAM_THRESHOLD_IN_BYTES = int(
+    os.getenv("STREAM_THRESHOLD_IN_BYTES", 256 * 1024 * 1024)
+)
+STREAM_CHUNK_SIZE_IN_BYTES = 8 * 1024 * 1024
+
+MIME_TYPES = {
+    "index.html": "text/html",
+    "catalog.json": "application/json",
+    "manifest.json": "application/json",
+}
+IDENTITY = "identity"
 
 storage_client = storage.Client()
 bucket = storage_client.bucket(DBT_BUCKET_NAME)
-# Used for cache expiration
-last_cache_reload = time.time()
+
+
+@dataclasses.dataclass
+class CachedBlob:
+    generation: int
+    size: int
+    # Used for cache expiration
+    checked_at: float
+    # Body by content encoding, None when the blob is streamed
+    bodies: Optional[Dict[str, bytes]]
+
+
+cache: Dict[str, CachedBlob] = {}
+# Reads of the bucket in progress, by blob name
+inflight: Dict[str, Future] = {}
+cache_lock = threading.Lock()
+revalidation_executor = ThreadPoolExecutor(max_workers=1)
+refresher: Optional[threading.Thread] = None
 
 
 @app.route("/")
@@ -34,7 +79,7 @@ def index():
     """
     Read index.html file from GCS bucket
     """
-    return read_gcs_blob("index.html")
+    return serve_gcs_blob("index.html")
 
 
 @app.route("/catalog.json")
@@ -42,7 +87,7 @@ def catalog():
     """
     Read catalog.json file from GCS bucket
     """
-    return read_gcs_blob("catalog.json")
+    return serve_gcs_blob("catalog.json")
 
 
 @app.route("/manifest.json")
@@ -50,32 +95,187 @@ def manifest():
     """
     Read manifest.json file from GCS bucket
     """
-    return read_gcs_blob("manifest.json")
+    return serve_gcs_blob("manifest.json")
+
+
+def blob_path(name):
+    return f"{DBT_BUCKET_PATH}/{name}" if DBT_BUCKET_PATH else name
+
+
+def compress(content: bytes) -> Dict[str, bytes]:
+    """
+    Compress a blob once for every request serving it
+    """
+    bodies = {IDENTITY: content, "gzip": gzip.compress(content, compresslevel=6)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(content)
+
+    return bodies
+
+
+def load_gcs_blob(name, cached: Optional[CachedBlob]) -> Optional[CachedBlob]:
+    """
+    Revalidate a cached blob against its generation in GCS, the blob is only downloaded
+    again if it has changed
+
+    :param name: blob to be read from GCS
+    :param cached: the cached blob, if any
+    :return: the up to date blob, None if it does not exist
+    """
+    now = time.monotonic()
+    # Metadata only, the content is not downloaded
+    blob = bucket.get_blob(blob_path(name))
+    if blob is None:
+        return None
+
+    if cached and cached.generation == blob.generation:
+        return dataclasses.replace(cached, checked_at=now)
+
+    print(f"Reading {name}, generation {blob.generation}")
+    return CachedBlob(
+        generation=blob.generation,
+        size=blob.size,
+        checked_at=now,
+        bodies=None
+        if blob.size > STREAM_THRESHOLD_IN_BYTES
+        else compress(blob.download_as_bytes(if_generation_match=blob.generation)),
+    )
+
+
+def fetch_gcs_blob(name) -> Optional[CachedBlob]:
+    """
+    Revalidate a blob and swap it in the cache. Concurrent calls for the same blob are
+    coalesced, only the first one reads the bucket and the others wait for its result
+    """
+    with cache_lock:
+        future = inflight.get(name)
+        is_owner = future is None
+        if is_owner:
+            future = inflight[name] = Future()
+            cached = cache.get(name)
+
+    if is_owner:
+        try:
+            fetched = load_gcs_blob(name, cached=cached)
+            with cache_lock:
+                if fetched is None:
+                    cache.pop(name, None)
+                else:
+                    cache[name] = fetched
+            future.set_result(fetched)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with cache_lock:
+                inflight.pop(name, None)
+
+    return future.result()
+
+
+def refresh_gcs_blobs():
+    """
+    Revalidate every cached blob at a regular interval, so that requests don't wait for
+    GCS when a blob has changed. A blob which can't be revalidated stays in the cache
+    """
+    while True:
+        time.sleep(REFRESH_INTERVAL_IN_SECONDS)
+        for name in list(cache):
+            try:
+                fetch_gcs_blob(name)
+            except Exception as e:
+                print(f"Error refreshing {name}: {e}")
+
+
+def start_refresher():
+    """
+    Start the refresher thread in the process serving requests, once
+    """
+    global refresher
+    with cache_lock:
+        if refresher is None:
+            refresher = threading.Thread(target=refresh_gcs_blobs, daemon=True)
+            refresher.start()
 
 
-@lru_cache(maxsize=3)
-def read_gcs_blob(name):
+def read_gcs_blob(name) -> CachedBlob:
     """
-    Read a blob from GCS
+    Read a blob from the cache. A blob which is not cached is read from GCS, a blob which
+    has not been revalidated for too long is served stale and revalidated in the background
 
     :param name: blob to be read from GCS
-    :return: blob content
+    :return: cached blob
     """
-    path = f"{DBT_BUCKET_PATH}/{name}" if DBT_BUCKET_PATH else name
-    blob = bucket.blob(path)
-    return blob.download_as_bytes().decode("utf-8")
+    start_refresher()
+    with cache_lock:
+        cached = cache.get(name)
+        is_inflight = name in inflight
 
+    if cached is None:
+        cached = fetch_gcs_blob(name)
+        if cached is None:
+            abort(404)
+    elif (
+        time.monotonic() - cached.checked_at >= CACHE_MAX_AGE_IN_SECONDS
+        and not is_inflight
+    ):
+        revalidation_executor.submit(fetch_gcs_blob, name)
 
-@app.before_request
-def before_request():
+    return cached
+
+
+def stream_gcs_blob(name, cached: CachedBlob, encoding) -> Iterator[bytes]:
+    """
+    Stream a blob too large to be cached in chunks, gzip compressed on the fly if requested.
+    Every chunk is read from the same generation
+    """
+    blob = bucket.blob(blob_path(name))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for start in range(0, cached.size, STREAM_CHUNK_SIZE_IN_BYTES):
+        chunk = blob.download_as_bytes(
+            start=start,
+            end=min(start + STREAM_CHUNK_SIZE_IN_BYTES, cached.size) - 1,
+            if_generation_match=cached.generation,
+        )
+        yield compressor.compress(chunk) if encoding == "gzip" else chunk
+
+    if encoding == "gzip":
+        yield compressor.flush()
+
+
+def serve_gcs_blob(name) -> Response:
     """
-    function to run before each request. Clear the cache if expired
+    Serve a blob with the best encoding accepted by the client. The ETag of a response is
+    the generation of the blob in GCS, so that browsers revalidate their copy and get a
+    304 response without body while it has not changed
     """
-    global last_cache_reload
-    if time.time() - last_cache_reload > CACHE_MAX_AGE_IN_SECONDS:
-        print("Clearing cache")
-        read_gcs_blob.cache_clear()
-        last_cache_reload = time.time()
+    cached = read_gcs_blob(name)
+    encodings = list(cached.bodies) if cached.bodies else [IDENTITY, "gzip"]
+    encoding = next(
+        (
+            encoding
+            for encoding in ["br", "gzip"]
+            if encoding in encodings and request.accept_encodings[encoding]
+        ),
+        IDENTITY,
+    )
+
+    if cached.bodies:
+        response = Response(cached.bodies[encoding], mimetype=MIME_TYPES[name])
+    else:
+        response = Response(
+            stream_gcs_blob(name, cached=cached, encoding=encoding),
+            mimetype=MIME_TYPES[name],
+        )
+        if encoding == IDENTITY:
+            response.content_length = cached.size
+
+    if encoding != IDENTITY:
+        response.content_encoding = encoding
+    response.set_etag(f"{cached.generation}-{encoding}")
+    response.vary.add("Accept-Encoding")
+    response.cache_control.no_cache = True
+
+    return response.make_conditional(request)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,12 @@ import yaml
 import json
 import shutil
 import subprocess
+import sys
 
 DOP_DBT_USER = "dop-dbt-user"
+DEPS_CACHE_PATH = os.path.sep.join(
+    ["embedded_dop", "executor_config", "dbt", "deps_cache"]
+)
 
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
@@ -114,7 +118,40 @@ with open(dop_config_path) as fp_config:
 
         save_profile_yml(dbt_home=dbt_home, file_content=file_content)
 
+    # Packages are restored from a cache when one holds the packages of the same
+    # packages.yml and DBT version, so the image can be built without network access
+    sys.path.append(os.path.sep.join([build_dir, "embedded_dop", "source", "dags"]))
+    from dop.component.util import dbt_deps_cache
+
+    dbt_version = (
+        subprocess.check_output(
+            [
+                "pipenv",
+                "run",
+                "python",
+                "-c",
+                "from dbt.version import __version__; print(__version__)",
+            ],
+            cwd=dbt_home,
+        )
+        .decode()
+        .strip()
+    )
+    deps_cache_paths = [
+        os.path.sep.join([build_dir, DEPS_CACHE_PATH]),
+        os.path.sep.join([dbt_home, DEPS_CACHE_PATH]),
+    ]
+    print(f"DBT version: {dbt_version}")
+
     for dbt_project_path in dbt_projects_path:
+        if dbt_deps_cache.restore(
+            project_path=dbt_project_path,
+            dbt_version=dbt_version,
+            cache_paths=deps_cache_paths,
+        ):
+            print(f"DBT packages of {dbt_project_path} restored from cache")
+            continue
+
         for dbt_cmd in ["clean", "deps"]:
             proc = subprocess.Popen(
                 ["pipenv", "run", "dbt", dbt_cmd],
@@ -126,3 +163,11 @@ with open(dop_config_path) as fp_config:
                 if not line:
                     break
                 print(line.rstrip())
+
+        # Stored in the image, it can be copied to the service project to seed the cache
+        tarball = dbt_deps_cache.store(
+            project_path=dbt_project_path,
+            dbt_version=dbt_version,
+            cache_path=os.path.sep.join([dbt_home, DEPS_CACHE_PATH]),
+        )
+        print(f"DBT packages of {dbt_project_path} stored in {tarball}")
@@ -0,0 +1,127 @@
+"""
+Benchmark of reading a large `run_results.json`.
+
+Compares loading the whole artifact with `json.load` (the behaviour before artifacts were
+streamed) with streaming its results, on a synthetic artifact. Each mode is run in its own
+process and reports its peak memory.
+
+    python tests/benchmarks/bench_dbt_artifact.py [--size_mb=500]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "dags"
+    )
+)
+
+from dop.component.util import dbt_artifact  # noqa: E402
+
+MODES = ["json", "stream"]
+
+
+def generate_run_results(path, size_mb: int):
+    """
+    Write a synthetic `run_results.json` of about `size_mb` MB, made of results similar to
+    the ones of `dbt run`
+    """
+    target_size = size_mb * 1024 * 1024
+    with open(path, "w") as fp:
+        fp.write('{"metadata": {"dbt_version": "0.19.1", "env": {}}, "results": [')
+        i = 0
+        while fp.tell() < target_size:
+            result = {
+                "status": "success",
+                "timing": [
+                    {
+                        "name": "execute",
+                        "started_at": "2021-08-11T09:59:58.000000Z",
+                        "completed_at": "2021-08-11T09:59:59.000000Z",
+                    }
+                ],
+                "thread_id": f"Thread-{i % 8}",
+                "execution_time": 1.5,
+                "message": "CREATE TABLE (10.0 rows, 1.2 KB processed)",
+                "adapter_response": {"code": "CREATE TABLE", "rows_affected": 10},
+                "unique_id": f"model.dbt_start.model_{i}",
+            }
+            fp.write(("," if i else "") + json.dumps(result))
+            i += 1
+        fp.write('], "elapsed_time": 3.2, "args": {"which": "run"}}')
+
+
+def measure(path, mode):
+    """
+    Read the invocation fields and serialise every result to NDJSON, as the run results
+    ingestion does
+    """
+    started_at = time.monotonic()
+    row_count = 0
+    with open(path, "rb") as fp, open(os.devnull, "w") as devnull:
+        if mode == "json":
+            run_results = json.load(fp)
+            results = run_results.pop("results")
+        else:
+            run_results = dbt_artifact.read_fields(fp, skipped_keys=["results"])
+            fp.seek(0)
+            results = dbt_artifact.iter_items(fp, "results")
+
+        for result in results:
+            devnull.write(json.dumps({**run_results, **result}) + "\n")
+            row_count += 1
+
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "rows": row_count,
+                "seconds": round(time.monotonic() - started_at, 1),
+                # kilobytes on Linux
+                "peak_rss_mb": round(
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                ),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the memory used to read DBT run results with and without streaming"
+    )
+    parser.add_argument(
+        "--size_mb", default=500, type=int, help="the size of the synthetic artifact"
+    )
+    parser.add_argument(
+        "--path", default=None, type=str, help="an artifact to read instead"
+    )
+    parser.add_argument("--modes", default=MODES, nargs="+", choices=MODES)
+    parser.add_argument(
+        "--measure", default=None, choices=MODES, help=argparse.SUPPRESS
+    )
+
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(path=args.path, mode=args.measure)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.path
+        if not path:
+            path = os.path.join(tmp_dir, "run_results.json")
+            generate_run_results(path=path, size_mb=args.size_mb)
+        print(f"Artifact: {path}, {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+        # Each mode is measured in its own process so that peak memory is not shared
+        for mode in args.modes:
+            subprocess.check_call(
+                [sys.executable, __file__, f"--path={path}", f"--measure={mode}"]
+            )
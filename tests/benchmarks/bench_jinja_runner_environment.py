@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of rendering the table materialization templates.
+
+Compares creating a new runner environment and compiling the wrapper templates for every
+render (the behaviour before environments were memoized) with the memoized environment
+and precompiled templates.
+
+    python tests/benchmarks/bench_jinja_runner_environment.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "dags"
+    )
+)
+
+from dop.component.transformation.common.templating import jinja  # noqa: E402
+from dop.component.transformation.runner.bigquery.adapter.model import (  # noqa: E402
+    PartitionConfig,
+    TableOptionsConfig,
+)
+
+# The wrapper templates rendered by table materializations
+try:
+    from dop.component.transformation.runner.bigquery.adapter.impl import (  # noqa: E402
+        TEMPLATE_TABLE_CREATE_OR_REPLACE,
+        TEMPLATE_TABLE_UPSERT,
+    )
+except ImportError as e:
+    sys.exit(
+        f"The BigQuery runner can't be imported, is google-cloud-bigquery installed? {e}"
+    )
+
+
+class Relation:
+    def __init__(self, identifier):
+        self.identifier = identifier
+
+    def __repr__(self):
+        return f"`project.dataset.{self.identifier}`"
+
+
+class RelationHelper:
+    def check_relation_exists(self, relation):
+        return True
+
+    def has_same_partition_definition(self, partition_config, relation):
+        return True
+
+    def check_if_schemas_match(self, tmp_relation, relation):
+        return True
+
+    def get_columns_of_relation(self, relation):
+        return ["date", "value"]
+
+
+OPTIONS = {
+    "relation": Relation("table"),
+    "tmp_relation": Relation("_tmp_table"),
+    "table_options_config": TableOptionsConfig(options={"expiration_timestamp": "1"}),
+    "partition_config": PartitionConfig(field="date", data_type="date"),
+    "full_refresh": False,
+}
+
+
+def render(environment, get_template):
+    for source in [TEMPLATE_TABLE_CREATE_OR_REPLACE, TEMPLATE_TABLE_UPSERT]:
+        get_template(environment, source).render(
+            query="SELECT 1", relation_helper=RelationHelper(), options=OPTIONS
+        )
+
+
+def render_without_caching():
+    environment = jinja.RunnerEnvironment(runner="bigquery").get_env()
+    render(environment, lambda env, source: env.from_string(source))
+
+
+def render_with_caching():
+    environment = jinja.get_runner_environment(runner="bigquery")
+    render(
+        environment,
+        lambda env, source: jinja.get_template_from_string(
+            environment=env, source=source
+        ),
+    )
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    for name, func in [
+        ("new environment per render", render_without_caching),
+        ("memoized environment", render_with_caching),
+    ]:
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        print(f"{name:>28}: {seconds / iterations * 1000:.3f} ms per task")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# DOP modules import each other from the `dags` folder, the same way they do in Airflow
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dags")
+)
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from dop.airflow_module.operator import dbt_operator_helper  # noqa: E402
+
+RUN_RESULTS = {
+    "metadata": {
+        "dbt_schema_version": "https://schemas.getdbt.com/dbt/run-results/v1.json",
+        "dbt_version": "0.19.1",
+        "generated_at": "2021-08-11T10:00:00.000000Z",
+        "invocation_id": "a1b2c3",
+        "env": {},
+    },
+    "results": [
+        {
+            "status": "success",
+            "timing": [
+                {
+                    "name": "execute",
+                    "started_at": "2021-08-11T09:59:58.000000Z",
+                    "completed_at": "2021-08-11T09:59:59.000000Z",
+                }
+            ],
+            "thread_id": "Thread-1",
+            "execution_time": 1.5,
+            "message": "CREATE TABLE (10 rows, 1.2 KB processed)",
+            "adapter_response": {"code": "CREATE TABLE", "rows_affected": 10},
+            "unique_id": "model.dbt_start.my_first_dbt_model",
+        },
+        {
+            "status": "pass",
+            "timing": [],
+            "thread_id": "Thread-2",
+            "execution_time": 0.5,
+            "message": 0,
+            "adapter_response": {},
+            "unique_id": "test.dbt_start.not_null_my_first_dbt_model_id",
+        },
+    ],
+    "elapsed_time": 3.2,
+    "args": {"which": "run", "models": ["tag:daily"]},
+}
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    loads = []
+
+    def load_run_result_rows(project_id, table_id, fp, row_count):
+        rows = [json.loads(line) for line in fp.read().splitlines()]
+        assert len(rows) == row_count
+        loads.append((table_id, rows))
+        return row_count
+
+    monkeypatch.setattr(
+        dbt_operator_helper, "load_run_result_rows", load_run_result_rows
+    )
+    return loads
+
+
+def test_run_result_rows():
+    rows = list(
+        dbt_operator_helper.run_result_rows(
+            RUN_RESULTS, results=RUN_RESULTS["results"], dbt_project_name="dbt_start"
+        )
+    )
+
+    assert [row["unique_id"] for row in rows] == [
+        "model.dbt_start.my_first_dbt_model",
+        "test.dbt_start.not_null_my_first_dbt_model_id",
+    ]
+    assert rows[0]["invocation_id"] == rows[1]["invocation_id"] == "a1b2c3"
+    assert rows[0]["env"] is None
+    assert json.loads(rows[0]["args"]) == RUN_RESULTS["args"]
+    assert rows[1]["message"] == "0"
+    assert rows[1]["adapter_response"] is None
+
+
+def test_buffer_flushes_one_load_per_table(loads):
+    buffer = dbt_operator_helper.RunResultsBuffer(max_rows=10)
+    rows = list(
+        dbt_operator_helper.run_result_rows(
+            RUN_RESULTS, results=RUN_RESULTS["results"], dbt_project_name="dbt_start"
+        )
+    )
+
+    assert buffer.add("project", "project.dbt_start.run_result_nodes", rows) == 2
+    buffer.add("project", "project.dbt_start.run_result_nodes", rows)
+    buffer.add("project", "project.dbt_start_two.run_result_nodes", rows)
+    assert loads == []
+
+    assert buffer.flush() == 6
+    assert sorted((table_id, len(rows)) for table_id, rows in loads) == [
+        ("project.dbt_start.run_result_nodes", 4),
+        ("project.dbt_start_two.run_result_nodes", 2),
+    ]
+    assert buffer.flush() == 0
+
+
+def test_buffer_flushes_when_full(loads):
+    buffer = dbt_operator_helper.RunResultsBuffer(max_rows=3)
+    rows = list(
+        dbt_operator_helper.run_result_rows(
+            RUN_RESULTS, results=RUN_RESULTS["results"], dbt_project_name="dbt_start"
+        )
+    )
+
+    buffer.add("project", "project.dbt_start.run_result_nodes", rows)
+    assert loads == []
+    buffer.add("project", "project.dbt_start.run_result_nodes", rows)
+    assert len(loads) == 1 and len(loads[0][1]) == 4
+
+
+def test_save_run_results_in_bq(loads, tmp_path):
+    run_results_path = tmp_path / "run_results.json"
+    run_results_path.write_text(json.dumps(RUN_RESULTS))
+
+    dbt_operator_helper.save_run_results_in_bq(
+        "project", "dbt_start", str(run_results_path)
+    )
+
+    assert [(table_id, len(rows)) for table_id, rows in loads] == [
+        ("project.dbt_start.run_result_nodes", 2)
+    ]
+    dbt_operator_helper.save_run_results_in_bq(
+        "project", "dbt_start", str(tmp_path / "missing.json")
+    )
+    assert len(loads) == 1
+
+
+def test_buffer_discards_rows_of_a_failed_artifact(loads):
+    buffer = dbt_operator_helper.RunResultsBuffer(max_rows=10)
+
+    def rows():
+        yield {"unique_id": "model.dbt_start.a"}
+        raise ValueError("Truncated artifact")
+
+    buffer.add("project", "project.dbt_start.run_result_nodes", [{"unique_id": "b"}])
+    with pytest.raises(ValueError):
+        buffer.add("project", "project.dbt_start.run_result_nodes", rows())
+
+    assert buffer.flush() == 1
+    assert loads[0][1] == [{"unique_id": "b"}]
@@ -0,0 +1,80 @@
+import datetime
+import os
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+pytest.importorskip("jinja2")
+
+from dop.component.helper import dry_run  # noqa: E402
+
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    *[os.pardir] * 4,
+    "examples",
+    "service_project",
+    "embedded_dop",
+    "orchestration",
+)
+
+
+class FakeRunner:
+    def __init__(self):
+        self.total_bytes_processed = 0
+        self.queries = []
+
+    def __getattr__(self, name):
+        def run(**kwargs):
+            if kwargs.get("query") is not None:
+                self.queries.append(kwargs["query"])
+                self.total_bytes_processed += 1024
+
+        return run
+
+
+@pytest.fixture
+def runners(monkeypatch):
+    monkeypatch.setenv("DOP_PROJECT_ID", "sandbox")
+    monkeypatch.setenv("DOP_LOCATION", "US")
+    runners = []
+
+    def get_query_runner(options):
+        assert options["dry_run"]
+        runners.append(FakeRunner())
+        return runners[-1]
+
+    monkeypatch.setattr(dry_run.impl, "get_query_runner", get_query_runner)
+    return runners
+
+
+def test_dry_run_transformations(runners):
+    results = dry_run.dry_run_transformations(
+        path_to_dags=EXAMPLES_PATH,
+        execution_date=datetime.datetime(2021, 1, 2),
+        dag_run_conf={},
+        dag_ids=["dop__example_covid19"],
+        workers=4,
+    )
+
+    assert results
+    assert all(result.dag_id == "dop__example_covid19" for result in results)
+    assert all(result.error is None for result in results)
+    queries = [query for runner in runners for query in runner.queries]
+    assert any('DATE("2021-01-02")' in query for query in queries)
+    assert all("{{" not in query for query in queries)
+
+    report = dry_run.format_report(results=results)
+    assert "dop__example_covid19" in report
+    assert "TOTAL" in report
+
+
+def test_full_refresh_is_rendered_from_the_dag_run_conf(runners):
+    dry_run.dry_run_transformations(
+        path_to_dags=EXAMPLES_PATH,
+        execution_date=datetime.datetime(2021, 1, 2),
+        dag_run_conf={"full_refresh": True},
+        dag_ids=["dop__example_covid19"],
+    )
+
+    queries = [query for runner in runners for query in runner.queries]
+    assert all('DATE("2021-01-02")' not in query for query in queries)
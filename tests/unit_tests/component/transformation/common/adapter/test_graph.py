@@ -0,0 +1,61 @@
+import pytest
+
+from dop.component.transformation.common.adapter.graph import (
+    CyclicDependencyError,
+    TaskGraph,
+)
+
+DEPENDENCIES = {
+    "stg_a": [],
+    "stg_b": ["outside_of_the_graph"],
+    "mart": ["stg_a", "stg_b", "stg_a"],
+    "report": ["mart"],
+    "export": ["stg_b"],
+}
+
+
+def test_adjacency_index():
+    task_graph = TaskGraph(DEPENDENCIES)
+
+    assert task_graph.upstream["mart"] == ["stg_a", "stg_b"]
+    assert task_graph.downstream["stg_b"] == ["mart", "export"]
+    assert task_graph.missing == {"stg_b": ["outside_of_the_graph"]}
+    assert task_graph.descendants(["stg_a"]) == {"mart", "report"}
+
+
+def test_topological_levels():
+    assert TaskGraph(DEPENDENCIES).topological_levels() == [
+        ["stg_a", "stg_b"],
+        ["mart", "export"],
+        ["report"],
+    ]
+
+
+def test_cycles_are_detected():
+    task_graph = TaskGraph(dict(DEPENDENCIES, stg_a=["report"]))
+
+    assert task_graph.find_cycle() == ["stg_a", "mart", "report", "stg_a"]
+    with pytest.raises(CyclicDependencyError) as e:
+        task_graph.topological_levels()
+
+    assert e.value.cycle == ["stg_a", "mart", "report", "stg_a"]
+    assert TaskGraph({"a": ["a"]}).find_cycle() == ["a", "a"]
+    assert TaskGraph(DEPENDENCIES).find_cycle() is None
+
+
+def test_critical_path():
+    task_graph = TaskGraph(DEPENDENCIES)
+
+    # Without durations the longest chain of tasks is the critical path
+    assert task_graph.critical_path() == (["stg_a", "mart", "report"], 3)
+
+    durations = {"stg_a": 10, "stg_b": 60, "mart": 5, "report": 1, "export": 120}
+    assert task_graph.critical_path(durations=durations) == (["stg_b", "export"], 180)
+    assert task_graph.remaining_durations(durations=durations) == {
+        "stg_a": 16,
+        "stg_b": 180,
+        "mart": 6,
+        "report": 1,
+        "export": 120,
+    }
+    assert TaskGraph({}).critical_path() == ([], 0)
@@ -154,6 +154,140 @@ def test_schema_deserialization():
     assert dag_config.tasks[0].dependencies == ["a", "b", "c"]
 
 
+def test_incremental_strategy_validation():
+    payload = generate_valid_schema()
+    payload["tasks"][0]["options"] = {"incremental_strategy": "insert_overwrite"}
+
+    dag_config = transformation_schema.load_dag_schema(payload)
+    assert dag_config.tasks[0].options["incremental_strategy"] == "insert_overwrite"
+
+    payload["tasks"][0]["options"] = {"incremental_strategy": "unknown"}
+    with pytest.raises(transformation_schema.MaterializationTaskException):
+        transformation_schema.load_dag_schema(payload)
+
+
+def test_insert_overwrite_requires_partitioning():
+    payload = generate_valid_schema()
+    del payload["tasks"][0]["partitioning"]
+    payload["tasks"][0]["options"] = {"incremental_strategy": "insert_overwrite"}
+
+    with pytest.raises(transformation_schema.MaterializationTaskException):
+        transformation_schema.load_dag_schema(payload)
+
+
+def test_assertion_options_validation():
+    payload = generate_valid_schema()
+    payload["tasks"] = [
+        {
+            "identifier": "data_quality_checks",
+            "kind": {"action": "assertion", "target": "assertion"},
+            "options": {"max_failures": 10, "sample_size": 5, "aggregate": True},
+        }
+    ]
+    transformation_schema.load_dag_schema(payload)
+
+    for options in [{"max_failures": 0}, {"sample_size": "5"}, {"aggregate": "yes"}]:
+        payload["tasks"][0]["options"] = options
+        with pytest.raises(transformation_schema.AssertionTaskException):
+            transformation_schema.load_dag_schema(payload)
+
+
+def test_assertion_sensor_options_validation():
+    payload = generate_valid_schema()
+    payload["tasks"] = [
+        {
+            "identifier": "upstream_is_ready",
+            "kind": {"action": "assertion", "target": "assertion_sensor"},
+            "options": {"mode": "reschedule", "poke_interval": 60, "backoff": 1.5},
+        }
+    ]
+    transformation_schema.load_dag_schema(payload)
+
+    for options in [{"mode": "wait"}, {"poke_interval": 0}, {"backoff": 0.5}]:
+        payload["tasks"][0]["options"] = options
+        with pytest.raises(transformation_schema.AssertionTaskException):
+            transformation_schema.load_dag_schema(payload)
+
+
+def test_grouped_execution_excludes_sensors():
+    payload = generate_grouped_schema()
+    payload["tasks"].append(
+        {
+            "identifier": "upstream_is_ready",
+            "kind": {"action": "assertion", "target": "assertion_sensor"},
+        }
+    )
+    payload["grouped_execution"] = {}
+
+    dag_config = transformation_schema.load_dag_schema(payload)
+    assert "upstream_is_ready" not in dag_config.grouped_execution.tasks
+
+    payload["grouped_execution"] = {"tasks": ["upstream_is_ready"]}
+    with pytest.raises(transformation_schema.GroupedExecutionException):
+        transformation_schema.load_dag_schema(payload)
+
+
+def test_grouped_execution_defaults_to_all_native_tasks():
+    payload = generate_grouped_schema()
+    payload["grouped_execution"] = {}
+
+    dag_config = transformation_schema.load_dag_schema(payload)
+
+    assert dag_config.grouped_execution.max_workers == 4
+    assert dag_config.grouped_execution.tasks == ["stg_a", "stg_b", "mart"]
+
+
+def test_grouped_execution_only_accepts_native_tasks():
+    payload = generate_grouped_schema()
+    payload["grouped_execution"] = {"tasks": ["stg_a", "dbt_run"]}
+
+    with pytest.raises(transformation_schema.GroupedExecutionException):
+        transformation_schema.load_dag_schema(payload)
+
+
+def test_grouped_execution_rejects_tasks_between_grouped_tasks():
+    payload = generate_grouped_schema()
+    # `dbt_run` depends on `stg_a` and `mart` depends on `dbt_run`
+    payload["tasks"][3]["dependencies"] = ["stg_a"]
+    payload["tasks"][2]["dependencies"] = ["dbt_run"]
+    payload["grouped_execution"] = {"tasks": ["stg_a", "mart"]}
+
+    with pytest.raises(transformation_schema.GroupedExecutionException):
+        transformation_schema.load_dag_schema(payload)
+
+
+def test_cyclic_dependencies_are_rejected():
+    payload = generate_grouped_schema()
+    payload["tasks"][0]["dependencies"] = ["dbt_run"]
+
+    with pytest.raises(transformation_schema.DependencyException) as e:
+        transformation_schema.load_dag_schema(payload)
+
+    assert "stg_a -> mart -> dbt_run -> stg_a" in str(e.value)
+
+
+def generate_grouped_schema():
+    payload = generate_valid_schema()
+    materialization = {"action": "materialization", "target": "table"}
+    payload["tasks"] = [
+        {"identifier": "stg_a", "kind": materialization},
+        {"identifier": "stg_b", "kind": materialization},
+        {
+            "identifier": "mart",
+            "kind": materialization,
+            "dependencies": ["stg_a", "stg_b"],
+        },
+        {
+            "identifier": "dbt_run",
+            "kind": {"action": "dbt", "target": "run"},
+            "options": {"project": "dbt_start", "version": "0.19.1"},
+            "dependencies": ["mart"],
+        },
+    ]
+
+    return payload
+
+
 def generate_valid_schema():
     return {
         "schedule_interval": "0 1 * * *",
@@ -171,3 +305,36 @@ def generate_valid_schema():
             }
         ],
     }
+
+
+def test_dbt_only_modified_validation():
+    payload = generate_grouped_schema()
+    dbt_task = payload["tasks"][3]
+    dbt_task["options"]["partial_parse"] = True
+    dbt_task["options"]["only_modified"] = True
+    schema = transformation_schema.DagConfigSchema()
+
+    assert schema.load(payload).data.tasks[3].options["only_modified"]
+
+    dbt_task["options"]["arguments"] = [{"option": "-m", "value": "tag:daily"}]
+    with pytest.raises(transformation_schema.DbtTaskException) as e:
+        schema.load(payload)
+    assert "['-m']" in str(e.value)
+
+    dbt_task["options"]["only_modified"] = "yes"
+    with pytest.raises(transformation_schema.DbtTaskException):
+        schema.load(payload)
+
+
+def test_dbt_select_requires_dbt_0_21():
+    payload = generate_grouped_schema()
+    dbt_task = payload["tasks"][3]
+    dbt_task["options"]["arguments"] = [{"option": "--select", "value": "tag:daily"}]
+    schema = transformation_schema.DagConfigSchema()
+
+    with pytest.raises(transformation_schema.DbtTaskException) as e:
+        schema.load(payload)
+    assert "0.21.0" in str(e.value)
+
+    dbt_task["options"]["version"] = "0.21.0"
+    assert schema.load(payload).data.tasks[3].options["arguments"]
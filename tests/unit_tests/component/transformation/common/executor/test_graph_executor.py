@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from dop.component.transformation.common.executor.graph_executor import (
+    GraphExecutor,
+    TaskExecutionError,
+)
+
+
+def test_tasks_run_after_their_dependencies():
+    completed = []
+    lock = threading.Lock()
+
+    def run(identifier):
+        with lock:
+            completed.append(identifier)
+
+    dependencies = {
+        "stg_a": [],
+        "stg_b": ["outside_of_the_graph"],
+        "mart": ["stg_a", "stg_b"],
+        "report": ["mart"],
+    }
+    GraphExecutor(dependencies=dependencies, max_workers=2).run(run)
+
+    assert sorted(completed[:2]) == ["stg_a", "stg_b"]
+    assert completed[2:] == ["mart", "report"]
+
+
+def test_independent_tasks_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    GraphExecutor(dependencies={"a": [], "b": [], "c": []}, max_workers=3).run(
+        lambda identifier: barrier.wait()
+    )
+
+
+def test_no_task_is_started_after_a_failure():
+    started = []
+
+    def run(identifier):
+        started.append(identifier)
+        if identifier == "stg_a":
+            raise RuntimeError("Query failed")
+
+    dependencies = {"stg_a": [], "mart": ["stg_a"], "report": ["mart"]}
+    with pytest.raises(TaskExecutionError) as e:
+        GraphExecutor(dependencies=dependencies, max_workers=1).run(run)
+
+    assert started == ["stg_a"]
+    assert list(e.value.failures) == ["stg_a"]
+    assert sorted(e.value.not_run) == ["mart", "report"]
+
+
+def test_ready_tasks_run_by_priority():
+    started = []
+
+    def run(identifier):
+        started.append(identifier)
+
+    dependencies = {"short": [], "long": [], "after_long": ["long"]}
+    durations = GraphExecutor(
+        dependencies=dependencies,
+        max_workers=1,
+        priorities={"short": 1, "long": 10, "after_long": 5},
+    ).run(run)
+
+    assert started == ["long", "after_long", "short"]
+    assert sorted(durations) == ["after_long", "long", "short"]
@@ -0,0 +1,108 @@
+import os
+import shutil
+
+import pytest
+
+from dop.component.transformation.common.adapter import schema
+from dop.component.transformation.common.parser import dag_artifact
+
+CONFIG = """
+schedule_interval: "0 4 * * *"
+timezone: "Europe/London"
+schema: dop_sandbox_us
+tasks:
+  - identifier: stg_table
+    kind:
+      action: materialization
+      target: table
+"""
+
+
+@pytest.fixture
+def service_project_path(tmp_path):
+    transformation_path = (
+        tmp_path / "build" / "embedded_dop" / "orchestration" / "example"
+    )
+    (transformation_path / "sql").mkdir(parents=True)
+    (transformation_path / "config.yaml").write_text(CONFIG)
+    (transformation_path / "sql" / "stg_table.sql").write_text("SELECT 1 AS a")
+    (tmp_path / "build" / ".commit-hash").write_text("abc123-20210101")
+
+    return str(tmp_path / "build")
+
+
+def build(service_project_path, database="sandbox"):
+    return dag_artifact.build_artifact(
+        path_to_dags=os.path.join(
+            service_project_path, "embedded_dop", "orchestration"
+        ),
+        database=database,
+        commit_hash=dag_artifact.read_commit_hash(service_project_path),
+        artifact_path=os.path.join(service_project_path, dag_artifact.ARTIFACT_FILE),
+    )
+
+
+def load(service_project_path, database="sandbox", commit_hash="abc123-20210101"):
+    return dag_artifact.load_artifact(
+        artifact_path=os.path.join(service_project_path, dag_artifact.ARTIFACT_FILE),
+        path_to_dags=os.path.join(
+            service_project_path, "embedded_dop", "orchestration"
+        ),
+        database=database,
+        commit_hash=commit_hash,
+    )
+
+
+def test_read_commit_hash(service_project_path, tmp_path):
+    assert dag_artifact.read_commit_hash(service_project_path) == "abc123-20210101"
+    assert dag_artifact.read_commit_hash(str(tmp_path / "missing")) is None
+
+
+def test_load_artifact_from_another_path(service_project_path, tmp_path):
+    build(service_project_path)
+
+    # i.e. built in Cloud Build and loaded from the Composer bucket
+    deployed_path = str(tmp_path / "deployed")
+    shutil.copytree(service_project_path, deployed_path)
+    shutil.rmtree(service_project_path)
+    transformations = load(deployed_path)
+
+    assert len(transformations) == 1
+    assert transformations[0]["path_to_transformation"] == os.path.join(
+        deployed_path, "embedded_dop", "orchestration", "example"
+    )
+    assert isinstance(transformations[0]["dag_config"], schema.DagConfig)
+    assert transformations[0]["sql"]["stg_table"].endswith("SELECT 1 AS a")
+
+
+def test_load_artifact_with_errors(service_project_path):
+    config_file = os.path.join(
+        service_project_path, "embedded_dop", "orchestration", "example", "config.yaml"
+    )
+    with open(config_file, "w") as fp:
+        fp.write("tasks: []")
+
+    build(service_project_path)
+    transformations = load(service_project_path)
+
+    assert isinstance(transformations[0]["error"], schema.InvalidDagConfig)
+
+
+def test_stale_artifact_is_not_loaded(service_project_path):
+    assert load(service_project_path) is None
+
+    build(service_project_path)
+
+    assert load(service_project_path, commit_hash="def456-20210102") is None
+    assert load(service_project_path, commit_hash=None) is None
+    assert load(service_project_path, database="another") is None
+    assert load(service_project_path) is not None
+
+
+def test_corrupted_artifact_is_not_loaded(service_project_path):
+    with open(
+        os.path.join(service_project_path, dag_artifact.ARTIFACT_FILE), "w"
+    ) as fp:
+        fp.write("not a pickle")
+
+    assert load(service_project_path) is None
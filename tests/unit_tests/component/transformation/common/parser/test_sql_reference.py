@@ -0,0 +1,23 @@
+from dop.component.transformation.common.parser.sql_reference import extract_relations
+
+
+def test_extract_relations():
+    sql = """
+    {% from 'global.sql' import is_incremental with context %}
+    {% set source = 'project.ignored.source' %}
+    with cte as (
+        select * from `project.dataset.a`  -- from commented.out
+        join dataset.b using (id)
+        left join `other-project`.dataset.`c` on true
+        cross join unnest(cte.values)
+    )
+    select extract(day from created_at), 'from quoted.string'
+    from cte, `{{ source }}`
+    where id in (select id from dataset.udf_filter(1))
+    """
+
+    assert extract_relations(sql=sql, default_database="project") == [
+        ("other-project", "dataset", "c"),
+        ("project", "dataset", "a"),
+        ("project", "dataset", "b"),
+    ]
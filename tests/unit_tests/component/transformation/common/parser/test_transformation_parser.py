@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from dop.component.transformation.common.adapter import schema
+from dop.component.transformation.common.parser import transformation_parser
+from dop.component.transformation.common.parser.parse_cache import ParseCache
+
+CONFIG = """
+schedule_interval: "0 4 * * *"
+timezone: "Europe/London"
+schema: dop_sandbox_us
+tasks:
+  - identifier: create_schema
+    kind:
+      action: materialization
+      target: schema
+  - identifier: stg_table
+    kind:
+      action: materialization
+      target: table
+    dependencies:
+      - create_schema
+"""
+
+
+@pytest.fixture
+def path_to_dags(tmp_path):
+    transformation_path = tmp_path / "orchestration" / "example"
+    (transformation_path / "sql").mkdir(parents=True)
+    (transformation_path / "config.yaml").write_text(CONFIG)
+    (transformation_path / "sql" / "stg_table.sql").write_text("SELECT 1 AS a")
+    # directories with a `.` and without a config file are ignored
+    (tmp_path / "orchestration" / ".hidden").mkdir()
+    (tmp_path / "orchestration" / "no_config").mkdir()
+
+    return str(tmp_path / "orchestration")
+
+
+def test_load_transformations(path_to_dags):
+    transformations = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database="sandbox"
+    )
+
+    assert len(transformations) == 1
+    assert transformations[0]["transformation"] == "example"
+    assert isinstance(transformations[0]["dag_config"], schema.DagConfig)
+    assert transformations[0]["dag_config"].database == "sandbox"
+    assert list(transformations[0]["sql"]) == ["stg_table"]
+    assert transformations[0]["sql"]["stg_table"].endswith("SELECT 1 AS a")
+
+
+def test_load_transformations_with_invalid_config(path_to_dags):
+    with open(os.path.join(path_to_dags, "example", "config.yaml"), "w") as fp:
+        fp.write("tasks: []")
+
+    transformations = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database="sandbox"
+    )
+
+    assert isinstance(transformations[0]["error"], schema.InvalidDagConfig)
+
+
+def test_parse_cache_hits_and_misses(path_to_dags, tmp_path):
+    cache_path = str(tmp_path / "cache" / "parse_cache.pickle")
+
+    def load(database="sandbox"):
+        parse_cache = ParseCache(cache_path=cache_path)
+        transformations = transformation_parser.load_transformations(
+            path_to_dags=path_to_dags, database=database, parse_cache=parse_cache
+        )
+        return parse_cache, transformations
+
+    parse_cache, _ = load()
+    assert (parse_cache.hits, parse_cache.misses) == (0, 1)
+    assert os.path.isfile(cache_path)
+
+    parse_cache, transformations = load()
+    assert (parse_cache.hits, parse_cache.misses) == (1, 0)
+    assert transformations[0]["sql"]["stg_table"].endswith("SELECT 1 AS a")
+
+    # touched but unchanged files are still a hit
+    sql_file = os.path.join(path_to_dags, "example", "sql", "stg_table.sql")
+    os.utime(sql_file, ns=(0, 0))
+    parse_cache, _ = load()
+    assert (parse_cache.hits, parse_cache.misses) == (1, 0)
+
+    with open(sql_file, "w") as fp:
+        fp.write("SELECT 2 AS a")
+    parse_cache, transformations = load()
+    assert (parse_cache.hits, parse_cache.misses) == (0, 1)
+    assert transformations[0]["sql"]["stg_table"].endswith("SELECT 2 AS a")
+
+    # a different default database is never served from the cache
+    parse_cache, transformations = load(database="another")
+    assert (parse_cache.hits, parse_cache.misses) == (0, 1)
+    assert transformations[0]["dag_config"].database == "another"
+
+
+def test_parse_cache_ignores_corrupted_file(tmp_path):
+    cache_path = tmp_path / "parse_cache.pickle"
+    cache_path.write_bytes(b"not a pickle")
+
+    parse_cache = ParseCache(cache_path=str(cache_path))
+
+    assert parse_cache.get(key="a", files=[str(cache_path)], salt="") is None
+
+
+@pytest.mark.parametrize("shared", ["directory", "file"])
+def test_parse_cache_written_by_other_users_is_ignored(tmp_path, shared):
+    cache_dir = tmp_path / "cache"
+    cache_path = str(cache_dir / "parse_cache.pickle")
+    parse_cache = ParseCache(cache_path=cache_path)
+    parse_cache.set(key="a", files=[], salt="", value="parsed")
+    parse_cache.save()
+    assert ParseCache(cache_path=cache_path).get(key="a", files=[], salt="") == "parsed"
+
+    os.chmod(cache_dir if shared == "directory" else cache_path, 0o777)
+
+    assert ParseCache(cache_path=cache_path).get(key="a", files=[], salt="") is None
+
+
+def test_parallel_parsing_matches_serial_parsing(path_to_dags):
+    for name in ["b_example", "a_example"]:
+        os.makedirs(os.path.join(path_to_dags, name, "sql"))
+        with open(os.path.join(path_to_dags, name, "config.yaml"), "w") as fp:
+            fp.write(CONFIG if name == "a_example" else "tasks: []")
+        with open(os.path.join(path_to_dags, name, "sql", "stg_table.sql"), "w") as fp:
+            fp.write(f"SELECT '{name}' AS a")
+
+    serial = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database="sandbox"
+    )
+    parallel = transformation_parser.load_transformations(
+        path_to_dags=path_to_dags, database="sandbox", workers=2
+    )
+
+    assert [t["transformation"] for t in parallel] == [
+        "a_example",
+        "b_example",
+        "example",
+    ]
+    assert [t["transformation"] for t in parallel] == [
+        t["transformation"] for t in serial
+    ]
+    assert parallel[0]["dag_config"] == serial[0]["dag_config"]
+    assert parallel[0]["sql"] == serial[0]["sql"]
+    assert isinstance(parallel[1]["error"], schema.InvalidDagConfig)
+    assert str(parallel[1]["error"]) == str(serial[1]["error"])
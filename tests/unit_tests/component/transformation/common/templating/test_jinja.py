@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+from dop.component.transformation.common.templating import jinja  # noqa: E402
+
+
+def test_runner_environment_is_memoized():
+    environment = jinja.get_runner_environment(runner="bigquery")
+
+    assert environment is jinja.get_runner_environment(runner="bigquery")
+    assert isinstance(environment.bytecode_cache, jinja.RunnerBytecodeCache)
+
+    template = jinja.get_template_from_string(environment=environment, source="{{ a }}")
+    assert template is jinja.get_template_from_string(
+        environment=environment, source="{{ a }}"
+    )
+    assert template.render(a=1) == "1"
+
+
+def test_bytecode_is_shared_through_the_filesystem(tmp_path):
+    directory = str(tmp_path / "bytecode")
+
+    def render():
+        environment = jinja.RunnerEnvironment(runner="bigquery").get_env(
+            bytecode_cache=jinja.RunnerBytecodeCache(directory=directory)
+        )
+        return environment.get_template("adapter.sql").module
+
+    render()
+    assert len(os.listdir(directory)) == 1
+
+    render()
+    assert len(os.listdir(directory)) == 1
+
+
+def test_shared_bytecode_directory_is_not_used(tmp_path):
+    os.chmod(str(tmp_path), 0o777)
+
+    bytecode_cache = jinja.RunnerBytecodeCache(directory=str(tmp_path))
+
+    assert bytecode_cache._filesystem_cache is None
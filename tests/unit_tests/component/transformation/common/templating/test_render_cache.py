@@ -0,0 +1,196 @@
+import os
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+from jinja2 import DictLoader, Environment  # noqa: E402
+
+from dop.component.transformation.common.adapter import schema  # noqa: E402
+from dop.component.transformation.common.templating.render_cache import (  # noqa: E402
+    RENDERED_FOLDER,
+    RenderCache,
+    execution_fingerprint,
+    get_render_cache,
+)
+
+GLOBAL_SQL = """{% macro is_incremental() -%}
+    {% if not dag_run.conf or dag_run.conf.get('full_refresh') != true %}true{% endif %}
+{%- endmacro -%}"""
+SQL = (
+    "{% from 'global.sql' import is_incremental with context %}"
+    "SELECT '{{ ds }}' AS ds, '{{ params.project }}' AS project"
+    "{% if is_incremental() %} WHERE incremental{% endif %}"
+)
+
+
+class DagRun:
+    def __init__(self, run_id, conf=None, start_date="2021-01-01T00:05:00+00:00"):
+        self.run_id = run_id
+        self.conf = conf
+        self.execution_date = "2021-01-01T00:00:00+00:00"
+        self.start_date = start_date
+
+    def get_state(self):
+        return "running"
+
+
+class Operator:
+    def __init__(self, retries=0):
+        self.task_id = "table"
+        self.retries = retries
+
+
+@pytest.fixture
+def templates():
+    return {"global.sql": GLOBAL_SQL}
+
+
+@pytest.fixture
+def environment(templates):
+    return Environment(loader=DictLoader(templates), extensions=["jinja2.ext.do"])
+
+
+def render(cache, environment, source, **context):
+    renders = []
+
+    def render_template():
+        renders.append(source)
+        return environment.from_string(source).render(**context)
+
+    rendered = cache.render(
+        environment=environment,
+        source=source,
+        context=context,
+        render=render_template,
+    )
+    return rendered, len(renders)
+
+
+def context(**kwargs):
+    return dict(
+        {"ds": "2021-01-01", "params": {"project": "p"}, "dag_run": DagRun("r")},
+        **kwargs,
+    )
+
+
+def test_rendered_sql_is_reused_across_processes(tmp_path, environment):
+    rendered, renders = render(
+        RenderCache(str(tmp_path)), environment, SQL, **context()
+    )
+    assert rendered == "SELECT '2021-01-01' AS ds, 'p' AS project WHERE incremental"
+    assert renders == 1
+
+    cache = RenderCache(str(tmp_path))
+    assert render(cache, environment, SQL, **context()) == (rendered, 0)
+    assert cache.hits == 1
+    assert len(os.listdir(tmp_path / RENDERED_FOLDER)) == 1
+
+
+def test_key_depends_on_referenced_context_only(tmp_path, environment):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key(environment, SQL, context())
+
+    assert key == cache.key(environment, SQL, context(ti="another try"))
+    assert key != cache.key(environment, SQL, context(ds="2021-01-02"))
+    assert key != cache.key(environment, SQL, context(params={"project": "q"}))
+    assert key != cache.key(
+        environment, SQL, context(dag_run=DagRun("r", conf={"full_refresh": True}))
+    )
+    assert key != cache.key(environment, "-- " + SQL, context())
+
+
+def test_key_depends_on_read_attributes(tmp_path, environment):
+    cache = RenderCache(str(tmp_path))
+    source = "SELECT '{{ dag_run.start_date }}', {{ task.retries }}"
+    key = cache.key(environment, source, context(task=Operator()))
+
+    assert key is not None
+    assert key == cache.key(environment, source, context(task=Operator(), ti="try"))
+    assert key != cache.key(
+        environment,
+        source,
+        context(dag_run=DagRun("r", start_date="2021-01-02"), task=Operator()),
+    )
+    assert key != cache.key(environment, source, context(task=Operator(retries=1)))
+    # Grouped tasks are rendered with the attributes of the task as a dict
+    assert cache.key(
+        environment, "{{ task['schema'] }}", context(task={"schema": "a"})
+    ) != cache.key(environment, "{{ task['schema'] }}", context(task={"schema": "b"}))
+
+
+def test_imported_template_changes_invalidate_entries(tmp_path, templates):
+    cache = RenderCache(str(tmp_path))
+    environment = Environment(loader=DictLoader(templates))
+    key = cache.key(environment, SQL, context())
+
+    templates["global.sql"] = GLOBAL_SQL.replace("true", "false")
+    assert cache.key(environment, SQL, context()) != key
+    assert RenderCache(str(tmp_path)).key(environment, SQL, context()) != key
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "SELECT '{{ macros.datetime.now() }}'",
+        "SELECT '{{ var.value.project }}'",
+        "SELECT {{ [1, 2] | random }}",
+        "{% include table ~ '.sql' %}",
+        "SELECT '{{ dag_run }}'",
+        "SELECT '{{ task[field] }}'",
+        "SELECT '{{ dag_run.get_state() }}'",
+    ],
+)
+def test_non_deterministic_templates_are_not_cached(tmp_path, environment, source):
+    cache = RenderCache(str(tmp_path))
+
+    assert cache.key(environment, source, context()) is None
+    assert not os.path.exists(tmp_path / RENDERED_FOLDER)
+
+
+def test_prune_removes_old_entries(tmp_path, environment):
+    cache = RenderCache(str(tmp_path))
+    render(cache, environment, SQL, **context())
+
+    cache.prune(max_age=3600)
+    assert len(os.listdir(tmp_path / RENDERED_FOLDER)) == 1
+
+    cache.prune(max_age=-1)
+    assert not os.listdir(tmp_path / RENDERED_FOLDER)
+
+
+def test_executions_are_recorded_by_dag_run(tmp_path):
+    task = schema.Task(
+        kind=schema.Kind(action="materialization", target="table"),
+        database="project",
+        schema="dataset",
+        identifier="table",
+        partitioning=None,
+        dependencies=[],
+        options={},
+    )
+    execution = execution_fingerprint(sql="SELECT 1", task=task, full_refresh=False)
+    cache = RenderCache(str(tmp_path))
+    cache.record_execution("dag", "table", "2021-01-01", execution=execution)
+
+    assert cache.get_execution("dag", "table", "2021-01-01") == execution
+    assert cache.get_execution("dag", "table", "2021-01-02") is None
+    assert execution != execution_fingerprint(
+        sql="SELECT 1", task=task, full_refresh=True
+    )
+    assert execution != execution_fingerprint(
+        sql="SELECT 2", task=task, full_refresh=False
+    )
+
+
+def test_shared_cache_directory_is_not_used(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOP_RENDER_CACHE_PATH", str(tmp_path))
+    get_render_cache.cache_clear()
+    try:
+        assert isinstance(get_render_cache(), RenderCache)
+
+        os.chmod(str(tmp_path), 0o777)
+        get_render_cache.cache_clear()
+        assert get_render_cache() is None
+    finally:
+        get_render_cache.cache_clear()
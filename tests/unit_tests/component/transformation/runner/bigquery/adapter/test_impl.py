@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from dop.component.transformation.runner.bigquery.adapter.impl import (  # noqa: E402
+    QueryRunner,
+    summarise_aggregated_assertion,
+    summarise_assertion,
+)
+
+
+def assertion_rows(consumed):
+    for i in itertools.count():
+        consumed.append(i)
+        yield {"success": i % 2 == 0, "description": "even", "value": i}
+
+
+def test_summarise_assertion_stops_at_max_failures():
+    consumed = []
+
+    summary = summarise_assertion(
+        rows=assertion_rows(consumed), max_failures=3, sample_size=2
+    )
+
+    assert summary.failed == 3
+    assert summary.passed == 3
+    assert summary.truncated
+    assert len(consumed) == 6
+    assert [r["other_asserted_values"]["value"] for r in summary.failed_sample] == [
+        1,
+        3,
+    ]
+    assert len(summary.passed_sample) == 2
+
+
+def test_summarise_assertion_reads_every_row():
+    rows = [
+        {"success": True, "description": "a"},
+        {"success": None, "description": "b"},
+    ]
+
+    summary = summarise_assertion(rows=rows, sample_size=0)
+
+    assert (summary.passed, summary.failed, summary.truncated) == (1, 1, False)
+    assert summary.failed_sample == []
+
+
+def test_summarise_aggregated_assertion():
+    summary = summarise_aggregated_assertion(
+        rows=[
+            {
+                "passed": 10,
+                "failed": 1,
+                "failed_sample": [{"success": False, "description": "a", "x": 1}],
+            }
+        ]
+    )
+
+    assert (summary.passed, summary.failed) == (10, 1)
+    assert summary.failed_sample[0]["other_asserted_values"] == {"x": 1}
+
+
+def test_render_aggregate_assertion_query():
+    query = QueryRunner.render_aggregate_assertion_query(
+        query="SELECT TRUE AS success, 'a' AS description", sample_size=5
+    )
+
+    assert "IGNORE NULLS LIMIT 5" in query
+    assert "SELECT TRUE AS success, 'a' AS description" in query
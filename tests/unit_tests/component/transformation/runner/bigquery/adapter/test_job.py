@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from dop.component.transformation.runner.bigquery.adapter.job import (  # noqa: E402
+    gather_with_limit,
+    run_coroutine,
+    wait_for_job,
+)
+
+
+class FakeJob:
+    dry_run = False
+
+    def __init__(self, polls_until_done):
+        self.polls_until_done = polls_until_done
+        self.reloads = 0
+        self.state = "RUNNING"
+
+    def reload(self):
+        self.reloads += 1
+        if self.reloads >= self.polls_until_done:
+            self.state = "DONE"
+
+
+def test_wait_for_job_polls_until_done():
+    job = FakeJob(polls_until_done=3)
+
+    run_coroutine(wait_for_job(job=job, initial_delay=0.001, max_delay=0.002))
+
+    assert job.state == "DONE"
+    assert job.reloads == 3
+
+
+def test_dry_run_jobs_are_not_polled():
+    job = FakeJob(polls_until_done=1)
+    job.dry_run = True
+
+    run_coroutine(wait_for_job(job=job))
+
+    assert job.reloads == 0
+
+
+def test_many_jobs_are_polled_from_one_event_loop():
+    jobs = [FakeJob(polls_until_done=i % 3 + 1) for i in range(100)]
+
+    completed = run_coroutine(
+        gather_with_limit(
+            [wait_for_job(job=job, initial_delay=0.001) for job in jobs],
+            max_in_flight=10,
+        )
+    )
+
+    assert completed == jobs
+    assert all(job.state == "DONE" for job in jobs)
+
+
+def test_gather_with_limit_bounds_in_flight_awaitables():
+    in_flight = []
+    max_in_flight = []
+
+    async def task():
+        in_flight.append(1)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.001)
+        in_flight.pop()
+
+    run_coroutine(gather_with_limit([task() for _ in range(20)], max_in_flight=4))
+
+    assert max(max_in_flight) == 4
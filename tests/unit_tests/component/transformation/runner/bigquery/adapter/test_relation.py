@@ -0,0 +1,236 @@
+import time
+
+import pytest
+
+bigquery = pytest.importorskip("google.cloud.bigquery")
+
+from google.api_core.exceptions import Forbidden, NotFound  # noqa: E402
+
+from dop.component.transformation.runner.bigquery.adapter.model import (  # noqa: E402
+    PartitionConfig,
+)
+from dop.component.transformation.runner.bigquery.adapter.relation import (  # noqa: E402
+    BigQueryRelation,
+    RelationHelper,
+    RelationMetadataCache,
+    METADATA_BACKEND_TABLES_API,
+)
+
+RELATION = BigQueryRelation(database="project", schema="dataset", identifier="table")
+TMP_RELATION = BigQueryRelation(
+    database="project", schema="dataset", identifier="_tmp_table"
+)
+
+
+def column(table_name, column_name, data_type, is_partitioning_column="NO"):
+    return {
+        "table_name": table_name,
+        "column_name": column_name,
+        "is_nullable": "YES",
+        "data_type": data_type,
+        "is_partitioning_column": is_partitioning_column,
+    }
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, query, job_config=None):
+        self.queries.append(query)
+        table_names = job_config.query_parameters[0].values
+        return [row for row in self.rows if row["table_name"] in table_names]
+
+
+@pytest.fixture
+def client():
+    return FakeClient(
+        rows=[
+            column("table", "date", "DATE", "YES"),
+            column("table", "value", "INT64"),
+            column("_tmp_table", "date", "DATE", "YES"),
+            column("_tmp_table", "value", "STRING"),
+        ]
+    )
+
+
+def test_relation_helper(client):
+    helper = RelationHelper(client=client)
+    missing_relation = BigQueryRelation(
+        database="project", schema="dataset", identifier="missing"
+    )
+
+    assert helper.check_relation_exists(RELATION)
+    assert not helper.check_relation_exists(missing_relation)
+    assert helper.get_columns_of_relation(RELATION) == ["date", "value"]
+    assert helper.partition_definition(RELATION) == {
+        "column_name": "date",
+        "data_type": "DATE",
+    }
+    assert helper.partition_definition(missing_relation) is None
+    assert not helper.check_if_schemas_match(TMP_RELATION, RELATION)
+
+
+def test_snapshot_uses_one_query_per_dataset(client):
+    other_relation = BigQueryRelation(
+        database="project", schema="other_dataset", identifier="table"
+    )
+    snapshot = RelationHelper(client=client).snapshot(
+        relations=[RELATION, TMP_RELATION, other_relation]
+    )
+    assert len(client.queries) == 2
+
+    assert snapshot.check_relation_exists(RELATION)
+    assert snapshot.check_relation_exists(TMP_RELATION)
+    assert snapshot.get_columns_of_relation(TMP_RELATION) == ["date", "value"]
+    assert snapshot.has_same_partition_definition(
+        PartitionConfig(field="date", data_type="DATE"), RELATION
+    )
+    assert not snapshot.check_if_schemas_match(TMP_RELATION, RELATION)
+    assert len(client.queries) == 2
+
+
+def test_metadata_is_cached_until_invalidated(client):
+    helper = RelationHelper(client=client)
+
+    helper.snapshot(relations=[RELATION, TMP_RELATION])
+    assert helper.check_relation_exists(RELATION)
+    assert helper.get_columns_of_relation(TMP_RELATION) == ["date", "value"]
+    assert len(client.queries) == 1
+
+    helper.invalidate(relations=[TMP_RELATION])
+    helper.snapshot(relations=[RELATION, TMP_RELATION])
+    assert len(client.queries) == 2
+    assert helper.metadata_cache.stats() == {
+        "hits": 3,
+        "misses": 3,
+        "invalidations": 1,
+    }
+
+
+def test_metadata_cache_ttl(client, monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    helper = RelationHelper(client=client, metadata_cache=RelationMetadataCache(ttl=60))
+
+    helper.check_relation_exists(RELATION)
+    monkeypatch.setattr(time, "monotonic", lambda: now + 59)
+    helper.check_relation_exists(RELATION)
+    assert len(client.queries) == 1
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    helper.check_relation_exists(RELATION)
+    assert len(client.queries) == 2
+
+
+class FakeTablesClient(FakeClient):
+    def __init__(self, rows, tables):
+        super(FakeTablesClient, self).__init__(rows=rows)
+        self.tables = tables
+        self.table_ids = []
+
+    def get_table(self, table_id):
+        self.table_ids.append(table_id)
+        table = self.tables.get(table_id)
+        if isinstance(table, Exception):
+            raise table
+        if table is None:
+            raise NotFound(table_id)
+        return table
+
+
+def partitioned_table(table_id, schema, partition_field="date"):
+    table = bigquery.Table(table_id, schema=schema)
+    table.time_partitioning = bigquery.TimePartitioning(field=partition_field)
+    return table
+
+
+def test_tables_api_backend(client):
+    schema = [
+        bigquery.SchemaField("date", "DATE"),
+        bigquery.SchemaField("value", "INTEGER", mode="REQUIRED"),
+        bigquery.SchemaField(
+            "items",
+            "RECORD",
+            mode="REPEATED",
+            fields=[
+                bigquery.SchemaField("name", "STRING"),
+                bigquery.SchemaField("price", "FLOAT"),
+            ],
+        ),
+    ]
+    client = FakeTablesClient(
+        rows=client.rows,
+        tables={
+            "project.dataset.table": partitioned_table("project.dataset.table", schema),
+            "project.dataset._tmp_table": partitioned_table(
+                "project.dataset._tmp_table", schema
+            ),
+        },
+    )
+    helper = RelationHelper(client=client, metadata_backend=METADATA_BACKEND_TABLES_API)
+    missing_relation = BigQueryRelation(
+        database="project", schema="dataset", identifier="missing"
+    )
+
+    metadata = helper.get_relations_metadata(
+        relations=[RELATION, TMP_RELATION, missing_relation]
+    )
+
+    assert not client.queries
+    assert not metadata[missing_relation].exists
+    assert [
+        (c.name, c.data_type, c.is_nullable) for c in metadata[RELATION].columns
+    ] == [
+        ("date", "DATE", "YES"),
+        ("value", "INT64", "NO"),
+        ("items", "ARRAY<STRUCT<name STRING, price FLOAT64>>", "NO"),
+    ]
+    assert helper.partition_definition(RELATION) == {
+        "column_name": "date",
+        "data_type": "DATE",
+    }
+    assert helper.check_if_schemas_match(TMP_RELATION, RELATION)
+
+
+def test_tables_api_backend_falls_back_to_information_schema(client):
+    schema = [bigquery.SchemaField("value", "INTEGER")]
+    for tables in [
+        {"project.dataset.table": Forbidden("project.dataset.table")},
+        {
+            "project.dataset.table": partitioned_table(
+                "project.dataset.table", schema, partition_field=None
+            )
+        },
+    ]:
+        fake_client = FakeTablesClient(rows=client.rows, tables=tables)
+        helper = RelationHelper(
+            client=fake_client, metadata_backend=METADATA_BACKEND_TABLES_API
+        )
+
+        assert helper.get_columns_of_relation(RELATION) == ["date", "value"]
+        assert len(fake_client.queries) == 1
+
+
+def test_unknown_metadata_backend(client):
+    with pytest.raises(ValueError):
+        RelationHelper(client=client, metadata_backend="unknown")
+
+
+def test_partition_filter_is_rendered_with_literals():
+    partition_ids = ["20210101", "20210102", "__NULL__", "__UNPARTITIONED__"]
+
+    assert (
+        PartitionConfig(field="date", data_type="date").render_partition_filter(
+            partition_ids
+        )
+        == "date in (date '2021-01-01', date '2021-01-02') or date is null"
+    )
+    assert (
+        PartitionConfig(field="ts", data_type="timestamp").render_partition_filter(
+            ["20210101"], alias="target"
+        )
+        == "timestamp_trunc(target.ts, day) in (timestamp '2021-01-01')"
+    )
+    assert PartitionConfig(field="date").render_partition_filter([]) == "false"
@@ -0,0 +1,86 @@
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from dop.component.transformation.common.adapter import schema  # noqa: E402
+from dop.component.transformation.runner.bigquery import lineage  # noqa: E402
+
+TABLE = {"action": "materialization", "target": "table"}
+
+
+def parse(transformation, schedule_interval, tasks, references):
+    dag_config = schema.load_dag_schema(
+        payload={
+            "schedule_interval": schedule_interval,
+            "timezone": "Europe/London",
+            "database": "project",
+            "schema": "dataset",
+            "tasks": tasks,
+        }
+    )
+    return {
+        "transformation": transformation,
+        "dag_config": dag_config,
+        "references": references,
+    }
+
+
+@pytest.fixture
+def lineage_index():
+    return lineage.LineageIndex(
+        transformations=[
+            parse(
+                "upstream",
+                "0 4 * * *",
+                tasks=[{"identifier": "stg", "kind": TABLE}],
+                references={"stg": [("public", "source", "table")]},
+            ),
+            parse(
+                "downstream",
+                "0 4 * * *",
+                tasks=[
+                    {"identifier": "mart", "kind": TABLE},
+                    {"identifier": "report", "kind": TABLE},
+                ],
+                references={
+                    "mart": [
+                        ("project", "dataset", "stg"),
+                        ("project", "dataset", "mart"),
+                    ],
+                    "report": [("project", "dataset", "mart")],
+                },
+            ),
+            parse(
+                "hourly",
+                "0 * * * *",
+                tasks=[{"identifier": "hourly_report", "kind": TABLE}],
+                references={"hourly_report": [("project", "dataset", "report")]},
+            ),
+        ]
+    )
+
+
+def test_dependencies_are_inferred_from_references(lineage_index):
+    assert lineage_index.inferred_dependencies("downstream") == {"report": ["mart"]}
+    assert lineage_index.external_dependencies("downstream") == {
+        "mart": [lineage.TaskReference(transformation="upstream", identifier="stg")]
+    }
+    assert lineage_index.external_dependencies("hourly") == {
+        "hourly_report": [
+            lineage.TaskReference(transformation="downstream", identifier="report")
+        ]
+    }
+    assert lineage_index.is_aligned("downstream", "upstream")
+    assert not lineage_index.is_aligned("hourly", "downstream")
+
+
+def test_inferred_dependencies_are_validated(lineage_index):
+    dag_config = lineage_index.dag_configs["downstream"]
+
+    assert lineage.with_inferred_dependencies(
+        dag_config=dag_config, inferred={"report": ["mart"]}
+    ).tasks[1].dependencies == ["mart"]
+    with pytest.raises(schema.DependencyException):
+        lineage.with_inferred_dependencies(
+            dag_config=dag_config, inferred={"report": ["mart"], "mart": ["report"]}
+        )
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from dop.component.transformation.common.adapter import schema  # noqa: E402
+from dop.component.transformation.runner.bigquery import task_runner  # noqa: E402
+from dop.component.transformation.runner.bigquery.adapter.model import (  # noqa: E402
+    AssertionSummary,
+)
+
+
+class FakeRunner:
+    def __init__(self, estimated_bytes, failed):
+        self.estimated_bytes = estimated_bytes
+        self.failed = failed
+        self.evaluated = []
+
+    def estimate_bytes(self, query):
+        return self.estimated_bytes
+
+    def evaluate_assertion(self, query, options=None):
+        self.evaluated.append((query, options))
+        return AssertionSummary(passed=1, failed=self.failed)
+
+
+def assertion_sensor(options):
+    return schema.Task(
+        identifier="upstream_is_ready",
+        kind=schema.Kind(action="assertion", target="assertion_sensor"),
+        dependencies=[],
+        database="project",
+        schema="dataset",
+        partitioning=None,
+        options=options,
+    )
+
+
+def test_poke_assertion():
+    task = assertion_sensor(options={"aggregate": True, "poke_interval": 30})
+
+    runner = FakeRunner(estimated_bytes=10, failed=0)
+    assert task_runner.poke_assertion(task=task, runner=runner, sql="SELECT 1")
+    assert runner.evaluated == [("SELECT 1", {"aggregate": True})]
+
+    assert not task_runner.poke_assertion(
+        task=task, runner=FakeRunner(estimated_bytes=10, failed=1), sql="SELECT 1"
+    )
+
+
+def test_poke_assertion_above_max_bytes_per_poke():
+    task = assertion_sensor(options={"max_bytes_per_poke": 100})
+    runner = FakeRunner(estimated_bytes=101, failed=0)
+
+    with pytest.raises(RuntimeError):
+        task_runner.poke_assertion(task=task, runner=runner, sql="SELECT 1")
+
+    assert runner.evaluated == []
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+from google.auth.credentials import AnonymousCredentials  # noqa: E402
+
+from dop.component.util import auth, client_registry  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    client_registry.clear()
+    yield
+    client_registry.clear()
+
+
+def test_clients_are_shared_by_project_location_and_identity():
+    credentials = AnonymousCredentials()
+
+    client = client_registry.get_bigquery_client(
+        project_id="project", location="EU", credentials=credentials
+    )
+
+    assert client is client_registry.get_bigquery_client(
+        project_id="project", location="EU", credentials=credentials
+    )
+    assert client is not client_registry.get_bigquery_client(
+        project_id="project", location="US", credentials=credentials
+    )
+    assert client is not client_registry.get_bigquery_client(
+        project_id="project", location="EU", credentials=AnonymousCredentials()
+    )
+
+
+def test_clients_are_not_shared_with_forked_processes(monkeypatch):
+    credentials = AnonymousCredentials()
+    client = client_registry.get_bigquery_client(
+        project_id="project", location="EU", credentials=credentials
+    )
+
+    monkeypatch.setattr(client_registry.os, "getpid", lambda: -1)
+
+    assert client is not client_registry.get_bigquery_client(
+        project_id="project", location="EU", credentials=credentials
+    )
+
+
+class FakeCredentials:
+    def __init__(self, expires_in):
+        self.valid = True
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=expires_in
+        )
+        self.refreshed = False
+
+    def refresh(self, request):
+        self.refreshed = True
+
+
+def test_credentials_are_refreshed_before_expiry():
+    credentials = FakeCredentials(expires_in=600)
+    auth.refresh_if_expiring(credentials=credentials)
+    assert not credentials.refreshed
+
+    credentials = FakeCredentials(expires_in=60)
+    auth.refresh_if_expiring(credentials=credentials)
+    assert credentials.refreshed
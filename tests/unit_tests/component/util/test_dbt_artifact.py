@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from dop.component.util import dbt_artifact
+
+ARTIFACT = {
+    "metadata": {"dbt_version": "0.19.1", "env": {}},
+    "results": [
+        {"unique_id": f"model.dbt_start.model_{i}", "execution_time": i / 3}
+        for i in range(50)
+    ],
+    "elapsed_time": 12345.678,
+    "args": {"which": "run", "models": ["tag:daily"], "threads": 4},
+    "empty": [],
+    "unicode": "été ✓",
+}
+
+
+def artifact_file(indent=None):
+    return io.BytesIO(json.dumps(ARTIFACT, indent=indent, ensure_ascii=False).encode())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, dbt_artifact.CHUNK_SIZE])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_items(chunk_size, indent):
+    items = dbt_artifact.iter_items(
+        artifact_file(indent=indent), "results", chunk_size=chunk_size
+    )
+
+    assert list(items) == ARTIFACT["results"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, dbt_artifact.CHUNK_SIZE])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_fields(chunk_size, indent):
+    fields = dbt_artifact.read_fields(
+        artifact_file(indent=indent), skipped_keys=["results"], chunk_size=chunk_size
+    )
+
+    assert fields == {key: value for key, value in ARTIFACT.items() if key != "results"}
+
+
+def test_empty_and_missing_arrays():
+    assert list(dbt_artifact.iter_items(artifact_file(), "empty")) == []
+    assert list(dbt_artifact.iter_items(artifact_file(), "missing")) == []
+
+
+def test_items_are_decoded_lazily():
+    # The artifact is truncated in the third result
+    content = json.dumps(ARTIFACT).encode()
+    truncated = content[: content.index(b"model_2") + 5]
+
+    items = dbt_artifact.iter_items(io.BytesIO(truncated), "results", chunk_size=16)
+
+    assert next(items) == ARTIFACT["results"][0]
+    assert next(items) == ARTIFACT["results"][1]
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_numbers_split_across_chunks():
+    artifact = {
+        "results": [{"execution_time": 0.25}, {"execution_time": 3e-05}],
+        "elapsed_time": 12.5,
+        "small": 1e-05,
+        "large": -1.5e3,
+        "count": 1024,
+    }
+    content = json.dumps(artifact).replace("-1500.0", "-1.5E+3").encode()
+
+    for chunk_size in range(1, len(content) + 1):
+        assert dbt_artifact.read_fields(
+            io.BytesIO(content), skipped_keys=["results"], chunk_size=chunk_size
+        ) == {key: value for key, value in artifact.items() if key != "results"}
+        assert (
+            list(
+                dbt_artifact.iter_items(
+                    io.BytesIO(content), "results", chunk_size=chunk_size
+                )
+            )
+            == artifact["results"]
+        )
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from dop.component.util import dbt_deps_cache
+
+
+@pytest.fixture
+def project_path(tmp_path):
+    project_path = tmp_path / "project"
+    project_path.mkdir()
+    (project_path / "dbt_project.yml").write_text("name: project\n")
+    (project_path / "packages.yml").write_text(
+        "packages:\n  - package: dbt-labs/dbt_utils\n    version: 0.7.0\n"
+    )
+    return str(project_path)
+
+
+def install_packages(project_path, dbt_version="0.19.1"):
+    install_path = dbt_deps_cache.packages_install_path(project_path, dbt_version)
+    os.makedirs(os.path.join(install_path, "dbt_utils"))
+    with open(os.path.join(install_path, "dbt_utils", "dbt_project.yml"), "w") as fp:
+        fp.write("name: dbt_utils\n")
+
+
+def test_packages_install_path(project_path):
+    assert dbt_deps_cache.packages_install_path(project_path, "0.19.1").endswith(
+        "dbt_modules"
+    )
+    assert dbt_deps_cache.packages_install_path(project_path, "1.0.0").endswith(
+        "dbt_packages"
+    )
+
+    with open(os.path.join(project_path, "dbt_project.yml"), "a") as fp:
+        fp.write("packages-install-path: vendor\n")
+    assert dbt_deps_cache.packages_install_path(project_path, "1.0.0").endswith(
+        "vendor"
+    )
+
+
+def test_deps_key(project_path, tmp_path):
+    key = dbt_deps_cache.deps_key(project_path, "0.19.1")
+
+    assert key == dbt_deps_cache.deps_key(project_path, "0.19.1")
+    assert key != dbt_deps_cache.deps_key(project_path, "0.20.0")
+
+    with open(os.path.join(project_path, "packages.yml"), "a") as fp:
+        fp.write("  - package: dbt-labs/codegen\n    version: 0.4.0\n")
+    assert key != dbt_deps_cache.deps_key(project_path, "0.19.1")
+
+    os.remove(os.path.join(project_path, "packages.yml"))
+    assert dbt_deps_cache.deps_key(project_path, "0.19.1") is None
+    assert dbt_deps_cache.is_up_to_date(project_path, "0.19.1")
+
+
+def test_store_and_restore(project_path, tmp_path):
+    cache_path = str(tmp_path / "cache")
+    install_packages(project_path)
+
+    assert not dbt_deps_cache.is_up_to_date(project_path, "0.19.1")
+    tarball = dbt_deps_cache.store(project_path, "0.19.1", cache_path=cache_path)
+    assert os.path.isfile(tarball)
+    assert dbt_deps_cache.is_up_to_date(project_path, "0.19.1")
+
+    # i.e. after `dbt clean`
+    install_path = dbt_deps_cache.packages_install_path(project_path, "0.19.1")
+    os.rename(install_path, install_path + ".old")
+    assert dbt_deps_cache.restore(
+        project_path, "0.19.1", cache_paths=[str(tmp_path / "missing"), cache_path]
+    )
+    assert os.path.isfile(os.path.join(install_path, "dbt_utils", "dbt_project.yml"))
+    assert dbt_deps_cache.is_up_to_date(project_path, "0.19.1")
+    assert [
+        name for name in os.listdir(project_path) if name.startswith(".dop_deps")
+    ] == []
+
+
+def test_restore_misses_when_packages_change(project_path, tmp_path):
+    cache_path = str(tmp_path / "cache")
+    install_packages(project_path)
+    dbt_deps_cache.store(project_path, "0.19.1", cache_path=cache_path)
+
+    assert not dbt_deps_cache.restore(project_path, "0.20.0", cache_paths=[cache_path])
+
+    with open(os.path.join(project_path, "packages.yml"), "a") as fp:
+        fp.write("  - package: dbt-labs/codegen\n    version: 0.4.0\n")
+    assert not dbt_deps_cache.restore(project_path, "0.19.1", cache_paths=[cache_path])
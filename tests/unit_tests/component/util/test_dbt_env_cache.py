@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from dop.component.util import dbt_env_cache
+from dop.component.util.dbt_env_cache import DbtEnvCache
+
+
+@pytest.fixture
+def installs(monkeypatch):
+    installs = []
+
+    def install_environment(path, dbt_version):
+        installs.append(dbt_version)
+        os.makedirs(os.path.join(path, "bin"))
+        with open(os.path.join(path, "bin", "dbt"), "w") as fp:
+            fp.write("x" * 100)
+
+    monkeypatch.setattr(dbt_env_cache, "install_environment", install_environment)
+    return installs
+
+
+def age(cache_path, name, seconds):
+    ready_file = os.path.join(cache_path, name, dbt_env_cache.READY_FILE)
+    os.utime(ready_file, (time.time() - seconds, time.time() - seconds))
+
+
+def test_environment_is_built_once(installs, tmp_path):
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=10000)
+
+    threads = [
+        threading.Thread(target=cache.get, kwargs={"dbt_version": "0.19.1"})
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    path = cache.get(dbt_version="0.19.1")
+    assert installs == ["0.19.1"]
+    assert os.path.isfile(os.path.join(path, "bin", "dbt"))
+    assert cache.environments() == [os.path.basename(path)]
+
+
+def test_incomplete_environment_is_rebuilt(installs, tmp_path):
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=10000)
+    name = dbt_env_cache.environment_name(dbt_version="0.19.1")
+    os.makedirs(str(tmp_path / name / "bin"))
+
+    cache.get(dbt_version="0.19.1")
+
+    assert installs == ["0.19.1"]
+
+
+def test_least_recently_used_environments_are_evicted(installs, tmp_path):
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=250)
+    for version in ["0.19.0", "0.19.1"]:
+        cache.get(dbt_version=version)
+
+    old = dbt_env_cache.environment_name(dbt_version="0.19.0")
+    older = dbt_env_cache.environment_name(dbt_version="0.19.1")
+    age(str(tmp_path), old, dbt_env_cache.IN_USE_GRACE_PERIOD + 10)
+    age(str(tmp_path), older, dbt_env_cache.IN_USE_GRACE_PERIOD + 20)
+
+    cache.get(dbt_version="0.20.0")
+
+    assert cache.environments() == [
+        old,
+        dbt_env_cache.environment_name(dbt_version="0.20.0"),
+    ]
+    assert not os.path.exists(str(tmp_path / older))
+
+
+def test_recently_used_environments_are_not_evicted(installs, tmp_path):
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=0)
+    for version in ["0.19.0", "0.19.1"]:
+        cache.get(dbt_version=version)
+
+    assert cache.evict() == []
+    assert len(cache.environments()) == 2
+
+
+def test_installation_output_is_not_written_to_stdout(monkeypatch, capfd, tmp_path):
+    check_call = subprocess.check_call
+
+    def install(command, **kwargs):
+        # Stands for virtualenv and pip, which print their progress
+        path = command[-1] if command[0] == "virtualenv" else None
+        script = f"print('Installing'); path = {path!r}; path and os.makedirs(path)"
+        return check_call([sys.executable, "-c", "import os; " + script], **kwargs)
+
+    monkeypatch.setattr(dbt_env_cache.subprocess, "check_call", install)
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=10000)
+
+    print(cache.get(dbt_version="0.19.1"))
+
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        os.path.join(
+            str(tmp_path), dbt_env_cache.environment_name(dbt_version="0.19.1")
+        )
+    ]
+    assert "Installing" in err
+
+
+def test_shared_cache_directory_is_rejected(installs, tmp_path):
+    os.chmod(str(tmp_path), 0o777)
+    cache = DbtEnvCache(cache_path=str(tmp_path), max_size=10000)
+
+    with pytest.raises(PermissionError):
+        cache.get(dbt_version="0.19.1")
+    assert installs == []
@@ -0,0 +1,99 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from dop.component.transformation.common.adapter import schema
+from dop.component.util import dbt_project_lock
+
+Run = namedtuple("Run", ["dag_id", "run_id", "start_date"])
+
+T0 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+T1 = datetime(2021, 1, 1, 0, 5, tzinfo=timezone.utc)
+
+
+def transformation(name, projects, enabled=True):
+    tasks = [
+        schema.Task(
+            kind=schema.Kind(action=schema.TASK_KIND_DBT, target="run"),
+            database=None,
+            schema=None,
+            identifier=f"dbt_{project}",
+            partitioning=None,
+            dependencies=[],
+            options={"project": project, "version": "0.19.1"},
+        )
+        for project in projects
+    ]
+    return {
+        "transformation": name,
+        "dag_config": SimpleNamespace(enabled=enabled, tasks=tasks),
+    }
+
+
+def test_dbt_dags_by_project():
+    dbt_dags = dbt_project_lock.dbt_dags_by_project(
+        [
+            transformation("a", ["project1", "project2"]),
+            transformation("b", ["project2"]),
+            transformation("c", ["project1"], enabled=False),
+            {"transformation": "d", "error": RuntimeError()},
+        ]
+    )
+
+    assert dbt_dags == {"project1": {"dop__a"}, "project2": {"dop__a", "dop__b"}}
+
+
+def test_siblings_of_a_dag_sharing_several_projects():
+    dbt_dags = {
+        "project1": {"dop__a", "dop__b"},
+        "project2": {"dop__a", "dop__c"},
+        "project3": {"dop__d"},
+    }
+
+    assert dbt_project_lock.sibling_dag_ids(
+        dbt_dags=dbt_dags, dag_id="dop__a", dbt_projects=["project1", "project2"]
+    ) == {"dop__b", "dop__c"}
+    assert (
+        dbt_project_lock.sibling_dag_ids(
+            dbt_dags=dbt_dags, dag_id="dop__d", dbt_projects=["project3"]
+        )
+        == set()
+    )
+
+
+def test_runs_wait_for_runs_started_earlier():
+    current = Run("dop__b", "run", T1)
+    running = [Run("dop__a", "earlier", T0), Run("dop__c", "later", T1.replace(hour=1))]
+
+    assert dbt_project_lock.earlier_runs(running=running, dag_run=current) == [
+        "dop__a.earlier"
+    ]
+
+
+def test_runs_started_at_the_same_time_never_wait_for_each_other():
+    runs = [Run("dop__a", "run", T0), Run("dop__b", "run", T0)]
+
+    waits = [
+        dbt_project_lock.earlier_runs(running=[other], dag_run=run)
+        for run, other in [(runs[0], runs[1]), (runs[1], runs[0])]
+    ]
+
+    assert waits == [[], ["dop__a.run"]]
+
+
+def test_runs_without_start_date_come_first():
+    current = Run("dop__b", "run", T0)
+    not_started = [Run("dop__c", "run", None), Run("dop__a", "run", None)]
+
+    assert dbt_project_lock.earlier_runs(running=not_started, dag_run=current) == [
+        "dop__c.run",
+        "dop__a.run",
+    ]
+    # Of two runs without a start date, only one waits for the other
+    assert (
+        dbt_project_lock.earlier_runs(running=[not_started[0]], dag_run=not_started[1])
+        == []
+    )
+    assert dbt_project_lock.earlier_runs(
+        running=[not_started[1]], dag_run=not_started[0]
+    ) == ["dop__a.run"]
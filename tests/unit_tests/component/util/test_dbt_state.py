@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from dop.component.util import dbt_state
+
+
+@pytest.fixture
+def project_path(tmp_path):
+    target_path = tmp_path / "project" / dbt_state.TARGET_FOLDER
+    target_path.mkdir(parents=True)
+    (target_path / dbt_state.MANIFEST_FILE).write_text('{"nodes": {}}')
+    (target_path / dbt_state.PARTIAL_PARSE_FILE).write_bytes(b"parsed")
+    (target_path / "run_results.json").write_text("{}")
+    return str(tmp_path / "project")
+
+
+def test_state_path_by_target(tmp_path):
+    assert dbt_state.state_path(str(tmp_path), "dbt_start", "run") != (
+        dbt_state.state_path(str(tmp_path), "dbt_start", "test")
+    )
+    assert dbt_state.state_path(str(tmp_path), "dbt_start", "docs generate").endswith(
+        os.path.join("dbt_start", "docs_generate")
+    )
+
+
+def test_restore_without_previous_state(project_path, tmp_path):
+    state_path = str(tmp_path / "state")
+
+    assert (
+        dbt_state.restore(project_path, state_path=state_path, partial_parse=True)
+        is None
+    )
+
+
+def test_store_and_restore(project_path, tmp_path):
+    state_path = str(tmp_path / "state")
+    dbt_state.store(project_path, state_path=state_path)
+
+    assert sorted(os.listdir(state_path)) == sorted(dbt_state.STATE_FILES)
+
+    # i.e. a new checkout of the project
+    target_path = os.path.join(project_path, dbt_state.TARGET_FOLDER)
+    os.remove(os.path.join(target_path, dbt_state.PARTIAL_PARSE_FILE))
+
+    assert (
+        dbt_state.restore(project_path, state_path=state_path, partial_parse=False)
+        == state_path
+    )
+    assert not os.path.exists(os.path.join(target_path, dbt_state.PARTIAL_PARSE_FILE))
+
+    assert (
+        dbt_state.restore(project_path, state_path=state_path, partial_parse=True)
+        == state_path
+    )
+    with open(os.path.join(target_path, dbt_state.PARTIAL_PARSE_FILE), "rb") as fp:
+        assert fp.read() == b"parsed"
+
+
+def test_restore_keeps_parse_results_of_the_project(project_path, tmp_path):
+    state_path = str(tmp_path / "state")
+    dbt_state.store(project_path, state_path=state_path)
+
+    partial_parse_path = os.path.join(
+        project_path, dbt_state.TARGET_FOLDER, dbt_state.PARTIAL_PARSE_FILE
+    )
+    with open(partial_parse_path, "wb") as fp:
+        fp.write(b"newer")
+    dbt_state.restore(project_path, state_path=state_path, partial_parse=True)
+
+    with open(partial_parse_path, "rb") as fp:
+        assert fp.read() == b"newer"
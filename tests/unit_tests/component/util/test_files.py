@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from dop.component.util import files
+
+
+def test_private_directory_is_only_accessible_by_its_owner(tmp_path):
+    path = files.private_directory(str(tmp_path / "cache"))
+
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    assert files.private_directory(path) == path
+
+
+def test_shared_directory_is_rejected(tmp_path):
+    path = tmp_path / "cache"
+    path.mkdir()
+    os.chmod(str(path), 0o777)
+
+    with pytest.raises(PermissionError):
+        files.private_directory(str(path))
+
+
+def test_symlink_is_not_private(tmp_path):
+    (tmp_path / "cache").mkdir()
+    os.symlink(str(tmp_path / "cache"), str(tmp_path / "link"))
+
+    assert files.is_private(str(tmp_path / "cache"))
+    assert not files.is_private(str(tmp_path / "link"))
+
+
+def test_atomic_write_keeps_previous_file_on_error(tmp_path):
+    path = str(tmp_path / "file")
+    with files.atomic_write(path, mode="w") as fp:
+        fp.write("previous")
+
+    with pytest.raises(RuntimeError):
+        with files.atomic_write(path, mode="w") as fp:
+            fp.write("partial")
+            raise RuntimeError()
+
+    with open(path) as fp:
+        assert fp.read() == "previous"
+    assert os.listdir(str(tmp_path)) == ["file"]